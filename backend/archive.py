@@ -0,0 +1,454 @@
+# insightlens/backend/archive.py
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import logging
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fastapi import APIRouter, HTTPException, Query
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is needed once the archive is in use; check_archive_support() enforces that
+    pa = None
+
+try:
+    import duckdb
+except ImportError:  # duckdb is optional; pyarrow runs the analytics scans without it
+    duckdb = None
+
+from .db import DB_PATH, init_db, get_conn, read_conn, unindex_bodies, CONTENT_FIELDS
+from .logs import configure_logging
+from .text import decompress_text, parse_query
+from .timestamps import parse_date_range
+from .topics import UNCLUSTERED
+from .metrics import timed
+
+log = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Insights published more than this many days ago move out of SQLite into
+# Parquet files under ARCHIVE_DIR; 0 keeps everything in SQLite.
+ARCHIVE_AFTER_DAYS = int(os.getenv("INSIGHTLENS_ARCHIVE_AFTER_DAYS", "0"))
+ARCHIVE_DIR = Path(os.getenv("INSIGHTLENS_ARCHIVE_DIR", str(DB_PATH.parent / "archive")))
+# Rows moved per transaction; a batch writes one part per month it spans
+ARCHIVE_BATCH = int(os.getenv("INSIGHTLENS_ARCHIVE_BATCH", "20000"))
+
+# Layout: Hive-style month partitions (by publication date), every part
+# written as two files of the same name, one per column group, so scans of
+# metadata never read body text:
+#
+#     archive/meta/month=2024-03/part-<uuid>.parquet      id, source, title, url, … published_ts
+#     archive/content/month=2024-03/part-<uuid>.parquet   id, content, clean_text (same row order)
+#
+# The archive_parts table lists committed parts with their id and
+# published_ts ranges. Readers pick their files from it (partition pruning)
+# instead of listing directories, so a part left by a run that died before
+# its commit is never read; the next run deletes it.
+META_COLUMNS = (
+    "id", "source", "title", "url", "canonical_url", "published_at", "published_ts",
+    "inserted_at", "simhash", "cluster_id", "topic_id",
+)
+# What search results carry, as search.SELECT_COLUMNS does for live rows
+RESULT_COLUMNS = ("id", "source", "title", "url", "published_at", "published_ts", "inserted_at")
+
+if pa is not None:
+    META_SCHEMA = pa.schema([
+        ("id", pa.int64()), ("source", pa.string()), ("title", pa.string()), ("url", pa.string()),
+        ("canonical_url", pa.string()), ("published_at", pa.string()), ("published_ts", pa.int64()),
+        ("inserted_at", pa.string()), ("simhash", pa.int64()), ("cluster_id", pa.int64()), ("topic_id", pa.int64()),
+    ])
+    CONTENT_SCHEMA = pa.schema([("id", pa.int64()), ("content", pa.string()), ("clean_text", pa.string())])
+
+_MIN_TS, _MAX_TS = -(2 ** 62), 2 ** 62
+
+
+def _month(ts: int) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m")
+
+
+def _file(group: str, path: str) -> Path:
+    return ARCHIVE_DIR / group / path
+
+
+# -------------------------------
+# Moving rows out of SQLite
+# -------------------------------
+def _write_part(month: str, rows: List[tuple]) -> tuple:
+    """Write one month's rows as a meta + content part; its archive_parts row."""
+    path = f"month={month}/part-{uuid.uuid4().hex}.parquet"
+    columns = list(zip(*rows))
+    meta = pa.Table.from_arrays(
+        [pa.array(values, type=field.type) for values, field in zip(columns, META_SCHEMA)], schema=META_SCHEMA
+    )
+    content = pa.Table.from_arrays([
+        pa.array(columns[0], type=pa.int64()),
+        pa.array([decompress_text(blob) for blob in columns[-2]], type=pa.string()),
+        pa.array([decompress_text(blob) for blob in columns[-1]], type=pa.string()),
+    ], schema=CONTENT_SCHEMA)
+    # Bodies are read rarely and are most of the bytes, compress them harder
+    for group, table, level in (("meta", meta, 3), ("content", content, 9)):
+        target = _file(group, path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(".tmp")
+        pq.write_table(table, tmp, compression="zstd", compression_level=level)
+        os.replace(tmp, target)
+    published = columns[META_COLUMNS.index("published_ts")]
+    return (path, month, len(rows), min(published), max(published), min(columns[0]), max(columns[0]))
+
+
+def _drop_orphans(conn):
+    """Delete part files that never made it into archive_parts (a crashed run)."""
+    known = {row[0] for row in conn.execute("SELECT path FROM archive_parts")}
+    for group in ("meta", "content"):
+        root = ARCHIVE_DIR / group
+        for path in list(root.glob("month=*/part-*.parquet")) + list(root.glob("month=*/part-*.tmp")):
+            if path.relative_to(root).as_posix() not in known:
+                log.warning(f"⚠️ Removing uncommitted archive part {path}")
+                path.unlink()
+
+
+def archive_insights(older_than_days: int = ARCHIVE_AFTER_DAYS, batch_size: int = ARCHIVE_BATCH) -> int:
+    """
+    Move insights published more than `older_than_days` ago into the Parquet
+    archive and delete them from SQLite; their FTS entries (unindex_bodies)
+    and bodies (insights_content_bd) go with them. Topic counts and rollups
+    are kept.
+    Returns the number of insights moved.
+    """
+    if older_than_days <= 0:
+        return 0
+    if pa is None:
+        raise RuntimeError("Archiving needs pyarrow: pip install pyarrow")
+    cutoff = int(time.time()) - older_than_days * 86400
+    moved = 0
+    conn = get_conn()
+    try:
+        _drop_orphans(conn)
+        while True:
+            with timed("archive"):
+                # Oldest first, so a batch spans few months and parts stay large
+                rows = conn.execute(f"""
+                    SELECT {", ".join("i." + name for name in META_COLUMNS)}, b.content, COALESCE(b.clean_text, b.content)
+                    FROM insights i LEFT JOIN insight_content b ON b.id = i.id
+                    WHERE i.published_ts < ?
+                    ORDER BY i.published_ts, i.id
+                    LIMIT ?
+                """, (cutoff, batch_size)).fetchall()
+                if not rows:
+                    break
+                by_month = {}
+                for row in rows:
+                    by_month.setdefault(_month(row[META_COLUMNS.index("published_ts")]), []).append(row)
+                parts = [_write_part(month, month_rows) for month, month_rows in by_month.items()]
+                ids = json.dumps([row[0] for row in rows])
+                # The files are in place; one transaction makes them the copy of record
+                with conn:
+                    conn.executemany("""
+                        INSERT INTO archive_parts (path, month, rows, min_ts, max_ts, min_id, max_id)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """, parts)
+                    conn.execute("""
+                        INSERT OR IGNORE INTO archived_urls (url)
+                        SELECT url FROM insights WHERE id IN (SELECT value FROM json_each(?))
+                    """, (ids,))
+                    conn.execute("DELETE FROM insight_bands WHERE insight_id IN (SELECT value FROM json_each(?))", (ids,))
+                    unindex_bodies(conn, [row[0] for row in rows])
+                    conn.execute("DELETE FROM insights WHERE id IN (SELECT value FROM json_each(?))", (ids,))
+            moved += len(rows)
+            log.info(
+                f"🗄️ Archived {len(rows)} insights into {len(parts)} parts ({', '.join(sorted(by_month))})",
+                extra={"count": len(rows), "parts": len(parts)},
+            )
+    finally:
+        conn.close()
+    if moved:
+        log.info(f"✅ Archive: moved {moved} insights published before {_month(cutoff)}", extra={"count": moved})
+    return moved
+
+
+def check_archive_support():
+    """
+    Fail at startup when the archive is turned on, or already holds parts,
+    but pyarrow is missing: nothing would be archived, and searches and
+    analytics would leave the archived insights out without a word.
+    """
+    if pa is not None:
+        return
+    if ARCHIVE_AFTER_DAYS > 0:
+        raise RuntimeError("INSIGHTLENS_ARCHIVE_AFTER_DAYS is set but pyarrow is not installed: pip install pyarrow")
+    with read_conn() as conn:
+        if conn.execute("SELECT 1 FROM archive_parts LIMIT 1").fetchone():
+            raise RuntimeError("The database has archived insights but pyarrow is not installed: pip install pyarrow")
+
+
+# -------------------------------
+# Reading
+# -------------------------------
+def _parts(start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> List[Tuple[str, int]]:
+    """(path, max_ts) of the parts overlapping [start_ts, end_ts), newest first."""
+    with read_conn() as conn:
+        return conn.execute(
+            "SELECT path, max_ts FROM archive_parts WHERE max_ts >= ? AND min_ts < ? ORDER BY max_ts DESC",
+            (_MIN_TS if start_ts is None else start_ts, _MAX_TS if end_ts is None else end_ts),
+        ).fetchall()
+
+
+def archive_horizon() -> Optional[int]:
+    """published_ts of the newest archived insight, None while the archive is empty (or unreadable)."""
+    if pa is None:
+        return None
+    with read_conn() as conn:
+        return conn.execute("SELECT MAX(max_ts) FROM archive_parts").fetchone()[0]
+
+
+def _phrase_pattern(node) -> str:
+    _, words, prefix = node
+    return r"\b" + r"\W+".join(re.escape(word) for word in words) + (r"\w*" if prefix else "") + r"\b"
+
+
+def _near_patterns(node) -> List[str]:
+    """NEAR as regexes: each pair of its phrases in either order, at most `distance` tokens apart."""
+    _, phrases, distance = node
+    gap = r"(?:\W+\w+){0,%d}\W+" % distance
+    patterns = [_phrase_pattern(phrase) for phrase in phrases]
+    if len(patterns) == 1:
+        return patterns
+    # Exact for two phrases; with more, every pair within the distance (a superset of FTS5's window)
+    return [
+        f"{a}{gap}{b}|{b}{gap}{a}"
+        for n, a in enumerate(patterns) for b in patterns[n + 1:]
+    ]
+
+
+def _query_mask(table, node, columns: Sequence[str] = ("title", "clean_text")):
+    """Rows matching the parse_query() tree `node`, case-insensitively, as MATCH would on the live index."""
+    kind = node[0]
+    if kind in ("phrase", "near"):
+        mask = None
+        for pattern in ([_phrase_pattern(node)] if kind == "phrase" else _near_patterns(node)):
+            found = None
+            for column in columns:
+                hit = pc.match_substring_regex(table[column], pattern, ignore_case=True)
+                found = hit if found is None else pc.or_kleene(found, hit)
+            mask = found if mask is None else pc.and_kleene(mask, found)
+        return pc.fill_null(mask, False)
+    if kind == "column":
+        return _query_mask(table, node[2], (node[1],))
+    left, right = _query_mask(table, node[1], columns), _query_mask(table, node[2], columns)
+    if kind == "and":
+        return pc.and_(left, right)
+    if kind == "or":
+        return pc.or_(left, right)
+    return pc.and_(left, pc.invert(right))
+
+
+def _attach_bodies(rows: List[Dict], fields: Sequence[str]):
+    """Fill `fields` from the content files into rows carrying their part "_path" and "_row"."""
+    fields = [f for f in fields if f in CONTENT_FIELDS]
+    by_path = {}
+    for row in rows:
+        by_path.setdefault(row.pop("_path"), []).append(row)
+    for path, part_rows in by_path.items():
+        if not fields:
+            continue
+        bodies = pq.read_table(_file("content", path), columns=fields).take([row["_row"] for row in part_rows])
+        for row, body in zip(part_rows, bodies.to_pylist()):
+            row.update({name: body[name] or "" for name in fields})
+    for row in rows:
+        row.pop("_row", None)
+    return rows
+
+
+def search_archive(
+    query: str,
+    limit: int,
+    start_ts: Optional[int] = None,
+    end_ts: Optional[int] = None,
+    before: Optional[Tuple[int, int]] = None,
+    content_fields: Sequence[str] = CONTENT_FIELDS,
+) -> List[Dict]:
+    """
+    Newest-first archived insights published in [start_ts, end_ts) (and
+    before the (published_ts, id) keyset position `before`) that match
+    `query` with the live index's FTS5 semantics (parse_query: implicit AND,
+    OR, NOT, phrases, prefixes), so both tiers of a search return the same
+    kind of hits. Rows have search_insights()'s fields plus `content_fields`.
+    """
+    if pa is None or limit <= 0:
+        return []
+    node = parse_query(query)
+    if before is not None:
+        end_ts = before[0] + 1 if end_ts is None else min(end_ts, before[0] + 1)
+    found = []
+    for path, max_ts in _parts(start_ts, end_ts):
+        # Parts come newest first: once the page is full, older parts can't make it
+        if len(found) >= limit and max_ts < found[limit - 1]["published_ts"]:
+            break
+        table = pq.read_table(_file("meta", path), columns=list(RESULT_COLUMNS))
+        table = table.append_column("_row", pa.array(range(table.num_rows), type=pa.int64()))
+        ts = table["published_ts"]
+        mask = pc.greater_equal(ts, _MIN_TS if start_ts is None else start_ts)
+        if end_ts is not None:
+            mask = pc.and_(mask, pc.less(ts, end_ts))
+        if before is not None:
+            mask = pc.and_(mask, pc.or_(
+                pc.less(ts, before[0]),
+                pc.and_(pc.equal(ts, before[0]), pc.less(table["id"], before[1])),
+            ))
+        if node is not None:
+            text = pq.read_table(_file("content", path), columns=["clean_text"])
+            mask = pc.and_(mask, _query_mask(table.append_column("clean_text", text["clean_text"]), node))
+        for row in table.filter(mask).to_pylist():
+            row["_path"] = path
+            found.append(row)
+        found.sort(key=lambda row: (row["published_ts"], row["id"]), reverse=True)
+        del found[limit:]
+    return _attach_bodies(found, content_fields)
+
+
+def load_archived(ids: List[int], content_fields: Sequence[str] = CONTENT_FIELDS) -> Dict[int, Dict]:
+    """{id: insight} for archived ids, in search_insights()'s shape plus `content_fields`."""
+    if pa is None or not ids:
+        return {}
+    with read_conn() as conn:
+        paths = [row[0] for row in conn.execute(
+            "SELECT path FROM archive_parts WHERE min_id <= ? AND max_id >= ?", (max(ids), min(ids))
+        )]
+    wanted = pa.array(ids, type=pa.int64())
+    rows = []
+    for path in paths:
+        table = pq.read_table(_file("meta", path), columns=list(RESULT_COLUMNS))
+        table = table.append_column("_row", pa.array(range(table.num_rows), type=pa.int64()))
+        for row in table.filter(pc.is_in(table["id"], value_set=wanted)).to_pylist():
+            row["_path"] = path
+            rows.append(row)
+    return {row["id"]: row for row in _attach_bodies(rows, content_fields)}
+
+
+# -------------------------------
+# Analytics
+# -------------------------------
+GROUP_COLUMNS = {"source": "source", "topic": "topic_id"}
+
+
+def _archive_volume(column: str, start_ts: int, end_ts: int, bucket_s: int) -> List[tuple]:
+    """(group, bucket, count) over the archived parts in range; reads two metadata columns only."""
+    paths = [str(_file("meta", path)) for path, _ in _parts(start_ts, end_ts)]
+    if not paths:
+        return []
+    if duckdb is not None:
+        with duckdb.connect() as con:
+            return con.execute(f"""
+                SELECT {column}, published_ts // ? AS bucket, COUNT(*)
+                FROM read_parquet(?)
+                WHERE published_ts >= ? AND published_ts < ?
+                GROUP BY ALL
+            """, [bucket_s, paths, start_ts, end_ts]).fetchall()
+    # Row groups whose published_ts statistics fall outside the range are skipped
+    table = ds.dataset(paths, format="parquet").to_table(
+        columns=[column, "published_ts"],
+        filter=(ds.field("published_ts") >= start_ts) & (ds.field("published_ts") < end_ts),
+    )
+    table = table.append_column("bucket", pc.divide(table["published_ts"], bucket_s))
+    counts = table.group_by([column, "bucket"]).aggregate([("bucket", "count")])
+    return list(zip(*(counts[name].to_pylist() for name in (column, "bucket", "bucket_count"))))
+
+
+def volume(by: str, start_ts: int, end_ts: int, bucket_s: int = 86400) -> Dict[str, List[int]]:
+    """
+    Insights published per `bucket_s` bucket in [start_ts, end_ts) per
+    source or topic, counting live rows and archived parts alike. Series are
+    dense lists starting at the bucket that holds start_ts. Insights without
+    a topic (never assigned, e.g. archived before topics ran) count under
+    UNCLUSTERED, the id backend.topics gives insights it can't place.
+    """
+    column = GROUP_COLUMNS[by]
+    first, last = start_ts // bucket_s, -(-end_ts // bucket_s)
+    with timed("analytics"):
+        with read_conn() as conn:
+            rows = conn.execute(f"""
+                SELECT {column}, published_ts / ?, COUNT(*) FROM insights
+                WHERE published_ts >= ? AND published_ts < ?
+                GROUP BY 1, 2
+            """, (bucket_s, start_ts, end_ts)).fetchall()
+        if pa is not None:
+            rows += _archive_volume(column, start_ts, end_ts, bucket_s)
+    series = {}
+    for key, bucket, n in rows:
+        key = UNCLUSTERED if key is None else key
+        series.setdefault(str(key), [0] * (last - first))[bucket - first] += n
+    return series
+
+
+@router.get("/analytics/volume")
+def volume_router(
+    start_date: str = Query(..., description="Start of the range (ISO 8601 or YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="End of the range, default now; a plain date includes that day"),
+    by: str = Query("source", pattern="^(source|topic)$"),
+    interval: str = Query("day", pattern="^(day|week)$"),
+):
+    start_ts, end_ts = parse_date_range(start_date, end_date)
+    if start_ts is None:
+        raise HTTPException(status_code=400, detail=f"Unparseable start_date: {start_date}")
+    end_ts = end_ts or int(time.time())
+    bucket_s = 86400 if interval == "day" else 7 * 86400
+    return {
+        "start": start_ts // bucket_s * bucket_s,
+        "bucket_s": bucket_s,
+        "series": volume(by, start_ts, end_ts, bucket_s),
+    }
+
+
+@router.get("/archive")
+def archive_status():
+    """Archived months with their part and row counts."""
+    with read_conn() as conn:
+        months = conn.execute("""
+            SELECT month, COUNT(*), SUM(rows), MIN(min_ts), MAX(max_ts)
+            FROM archive_parts GROUP BY month ORDER BY month
+        """).fetchall()
+    return {
+        "enabled": pa is not None and ARCHIVE_AFTER_DAYS > 0,
+        "after_days": ARCHIVE_AFTER_DAYS,
+        "horizon": archive_horizon(),
+        "rows": sum(m[2] for m in months),
+        "months": [
+            {"month": m[0], "parts": m[1], "rows": m[2], "first_ts": m[3], "last_ts": m[4]} for m in months
+        ],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move old insights from SQLite into the Parquet archive")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS or None, required=not ARCHIVE_AFTER_DAYS,
+                        help="Archive insights published more than this many days ago (default INSIGHTLENS_ARCHIVE_AFTER_DAYS)")
+    parser.add_argument("--vacuum", action="store_true", help="Shrink the database file afterwards")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    if pa is None:
+        log.error("❌ The archive needs pyarrow: pip install pyarrow")
+        return 1
+    init_db()
+    moved = archive_insights(args.days)
+    if moved and args.vacuum:
+        conn = get_conn()
+        conn.execute("VACUUM;")
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
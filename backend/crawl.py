@@ -0,0 +1,258 @@
+# insightlens/backend/crawl.py
+
+import os
+import json
+import time
+import logging
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import yaml
+except ImportError:  # PyYAML is optional; JSON plans always work
+    yaml = None
+
+from .db import get_conn, read_conn, flush_writes
+from .metrics import SOURCE_ERRORS
+from .jobs import INGEST_SOURCES, interval_for
+
+log = logging.getLogger(__name__)
+
+# A crawl plan lists what to fetch, from which source, how often:
+#
+#     concurrency:              # tasks in flight per source (default INSIGHTLENS_CRAWL_SOURCE_CONCURRENCY)
+#       reddit: 4
+#       newsapi: 1
+#     defaults:
+#       interval: 3600          # seconds between two runs of a task (default: the source's schedule)
+#     tasks:
+#       - source: reddit
+#         params: {subreddit: [technology, startups, SaaS], limit: 25}
+#         interval: 600
+#       - source: google_rss
+#         params: {topic: [AI, fintech, climate], region: ["IN:en", "US:en"]}
+#
+# List-valued params expand into one task per combination (six google_rss
+# tasks above). Params are passed to the source's fetcher on top of its
+# defaults in backend.jobs.INGEST_SOURCES. JSON files use the same shape.
+
+CRAWL_PLAN = os.getenv("INSIGHTLENS_CRAWL_PLAN", "")
+CRAWL_WORKERS = int(os.getenv("INSIGHTLENS_CRAWL_WORKERS", "8"))
+SOURCE_CONCURRENCY = int(os.getenv("INSIGHTLENS_CRAWL_SOURCE_CONCURRENCY", "2"))
+PROGRESS_EVERY_S = float(os.getenv("INSIGHTLENS_CRAWL_PROGRESS_S", "10"))
+
+
+# -------------------------------
+# Plan files
+# -------------------------------
+def _expand(params: dict) -> List[dict]:
+    """One params dict per combination of the list-valued entries."""
+    names = list(params)
+    choices = [v if isinstance(v, list) else [v] for v in params.values()]
+    return [dict(zip(names, combo)) for combo in itertools.product(*choices)]
+
+
+def task_key(source: str, params: dict) -> str:
+    return f"{source}:{json.dumps(params, sort_keys=True)}"
+
+
+def load_plan(path: str) -> dict:
+    """Read and expand a YAML/JSON crawl plan into {"tasks": [...], "concurrency": {...}}."""
+    path = Path(path)
+    text = path.read_text(encoding="utf-8")
+    if path.suffix in (".yaml", ".yml"):
+        if yaml is None:
+            raise RuntimeError(f"{path} is YAML; install PyYAML or write the plan as JSON")
+        raw = yaml.safe_load(text) or {}
+    else:
+        raw = json.loads(text)
+
+    default_interval = (raw.get("defaults") or {}).get("interval")
+    tasks = {}
+    for i, entry in enumerate(raw.get("tasks") or []):
+        source = entry.get("source")
+        if source not in INGEST_SOURCES:
+            raise ValueError(f"{path}: task {i} has unknown source {source!r}")
+        interval = float(entry.get("interval") or default_interval or interval_for(source))
+        for params in _expand(entry.get("params") or {}):
+            key = task_key(source, params)
+            # The same task listed twice keeps its shortest interval
+            if key not in tasks or interval < tasks[key]["interval"]:
+                tasks[key] = {"key": key, "source": source, "params": params, "interval": interval}
+    concurrency = {name: int(n) for name, n in (raw.get("concurrency") or {}).items()}
+    return {"tasks": list(tasks.values()), "concurrency": concurrency}
+
+
+# -------------------------------
+# Task state
+# -------------------------------
+def _last_runs(keys: List[str]) -> Dict[str, float]:
+    with read_conn() as conn:
+        return dict(conn.execute(
+            "SELECT key, last_run FROM crawl_tasks WHERE key IN (SELECT value FROM json_each(?))",
+            (json.dumps(keys),),
+        ).fetchall())
+
+
+def _record_run(task: dict, status: str, count: int, elapsed_ms: int, error: Optional[str] = None):
+    try:
+        conn = get_conn()
+        with conn:
+            conn.execute("""
+                INSERT INTO crawl_tasks (key, source, params, last_run, status, count, elapsed_ms, error)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    last_run = excluded.last_run, status = excluded.status, count = excluded.count,
+                    elapsed_ms = excluded.elapsed_ms, error = excluded.error
+            """, (task["key"], task["source"], json.dumps(task["params"], sort_keys=True),
+                  time.time(), status, count, elapsed_ms, error))
+        conn.close()
+    except Exception as e:
+        log.warning(f"⚠️ Could not record crawl task {task['key']}: {e}")
+
+
+def _run_task(task: dict) -> dict:
+    fn, defaults = INGEST_SOURCES[task["source"]]
+    start = time.perf_counter()
+    status, count, error = "ok", 0, None
+    try:
+        # Crawls always go upstream, bypassing the /search response cache
+        count = len(getattr(fn, "uncached", fn)(**{**defaults, **task["params"]}) or [])
+    except Exception as e:
+        log.error(f"❌ Crawl task {task['key']} failed: {e}")
+        SOURCE_ERRORS.inc(source=task["source"], kind="error")
+        status, error = "error", str(e)
+    elapsed_ms = round((time.perf_counter() - start) * 1000)
+    _record_run(task, status, count, elapsed_ms, error)
+    return {"status": status, "count": count, "elapsed_ms": elapsed_ms}
+
+
+# -------------------------------
+# Runs
+# -------------------------------
+def run_plan(plan: dict, force: bool = False, workers: int = CRAWL_WORKERS) -> dict:
+    """
+    Run the plan's due tasks (all of them with force=True) on a pool of
+    `workers` threads. Sources take turns for free slots, so a source with
+    hundreds of tasks can't starve the others, and no source has more than
+    its concurrency limit in flight. Returns a per-source summary.
+    """
+    started = time.time()
+    last_runs = {} if force else _last_runs([t["key"] for t in plan["tasks"]])
+    due = [t for t in plan["tasks"] if last_runs.get(t["key"], 0) + t["interval"] <= started]
+
+    queues = {}
+    for task in due:
+        queues.setdefault(task["source"], deque()).append(task)
+    limits = {name: max(1, plan["concurrency"].get(name, SOURCE_CONCURRENCY)) for name in queues}
+    summary = {
+        name: {"tasks": len(tasks), "ok": 0, "errors": 0, "items": 0, "elapsed_ms": 0}
+        for name, tasks in queues.items()
+    }
+    log.info(f"🕸️ Crawl plan: {len(due)} of {len(plan['tasks'])} tasks due across {len(queues)} sources")
+
+    turns = deque(queues)
+    running = {name: 0 for name in queues}
+    futures = {}
+    done = 0
+    last_progress = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="crawl") as pool:
+        while turns or futures:
+            # Round-robin over sources with queued tasks and a free per-source slot
+            idle = 0
+            while turns and len(futures) < workers and idle < len(turns):
+                name = turns[0]
+                turns.rotate(-1)
+                if running[name] >= limits[name]:
+                    idle += 1
+                    continue
+                idle = 0
+                task = queues[name].popleft()
+                if not queues[name]:
+                    turns.remove(name)
+                running[name] += 1
+                futures[pool.submit(_run_task, task)] = task
+
+            finished, _ = wait(futures, timeout=PROGRESS_EVERY_S, return_when=FIRST_COMPLETED)
+            for future in finished:
+                task = futures.pop(future)
+                result = future.result()
+                stats = summary[task["source"]]
+                running[task["source"]] -= 1
+                stats["ok" if result["status"] == "ok" else "errors"] += 1
+                stats["items"] += result["count"]
+                stats["elapsed_ms"] += result["elapsed_ms"]
+                done += 1
+            if time.monotonic() - last_progress >= PROGRESS_EVERY_S:
+                last_progress = time.monotonic()
+                log.info(
+                    f"🕸️ Crawl progress: {done}/{len(due)} tasks, "
+                    f"{sum(s['items'] for s in summary.values())} items",
+                    extra={"done": done, "total": len(due)},
+                )
+
+    flush_writes()
+    duration_ms = round((time.time() - started) * 1000)
+    items = sum(s["items"] for s in summary.values())
+    errors = sum(s["errors"] for s in summary.values())
+    log.info(
+        f"✅ Crawl plan done: {len(due)} tasks, {items} items, {errors} errors in {duration_ms} ms",
+        extra={"tasks": len(due), "items": items, "errors": errors, "duration_ms": duration_ms},
+    )
+    return {
+        "tasks": len(due),
+        "skipped": len(plan["tasks"]) - len(due),
+        "items": items,
+        "errors": errors,
+        "duration_ms": duration_ms,
+        "sources": summary,
+        "next_due_in_s": _next_due_in(plan),
+    }
+
+
+def _next_due_in(plan: dict) -> Optional[float]:
+    if not plan["tasks"]:
+        return None
+    last_runs = _last_runs([t["key"] for t in plan["tasks"]])
+    now = time.time()
+    return max(0.0, min(last_runs.get(t["key"], 0) + t["interval"] - now for t in plan["tasks"]))
+
+
+class CrawlScheduler:
+    """Re-reads the plan file and runs whatever is due, sleeping until the next task is."""
+
+    def __init__(self, path: str = CRAWL_PLAN):
+        self.path = path
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="crawl-scheduler", daemon=True)
+        self._thread.start()
+        log.info(f"⏰ Crawl scheduler started for {self.path}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        while not self._stop.is_set():
+            wait_s = 60.0
+            try:
+                # Re-read every pass, so plan edits apply without a restart
+                result = run_plan(load_plan(self.path))
+                if result["next_due_in_s"] is not None:
+                    wait_s = result["next_due_in_s"]
+            except Exception as e:
+                log.error(f"❌ Crawl plan {self.path} failed: {e}")
+            self._stop.wait(min(max(1.0, wait_s), 3600.0))
+
+crawl_scheduler = CrawlScheduler()
@@ -1,40 +1,851 @@
+import logging
 import os
+import json
 import sqlite3
+import threading
+import time
+import queue
+import atexit
+import itertools
+from contextlib import contextmanager
 from pathlib import Path
 
+from .dedup import canonicalize_url, simhash, assign_clusters
+from .timestamps import parse_timestamp
+from .text import normalize_text, compress_text, decompress_text
+from .metrics import timed, ROWS_INGESTED, READ_POOL_CONNECTIONS, READ_POOL_OPENED, READ_POOL_WAIT_SECONDS
+
+log = logging.getLogger(__name__)
+
 DB_PATH = Path(os.getenv("INSIGHTLENS_DB_PATH", "data/insightlens.db"))
+BUSY_TIMEOUT_S = float(os.getenv("INSIGHTLENS_DB_BUSY_TIMEOUT_S", "30"))
+WRITE_BATCH_SIZE = int(os.getenv("INSIGHTLENS_WRITE_BATCH_SIZE", "200"))
+WRITE_FLUSH_S = float(os.getenv("INSIGHTLENS_WRITE_FLUSH_S", "0.5"))
+# Read side (read_conn): pooled read-only connections and their per-connection
+# page cache / memory map. Readers never take the write lock under WAL.
+READ_POOL_SIZE = int(os.getenv("INSIGHTLENS_READ_POOL_SIZE", "8"))
+READ_CACHE_MB = int(os.getenv("INSIGHTLENS_READ_CACHE_MB", "32"))
+READ_MMAP_MB = int(os.getenv("INSIGHTLENS_READ_MMAP_MB", "256"))
+# Compiled statements kept per connection, keyed by SQL text
+STATEMENT_CACHE_SIZE = 256
 
 def _ensure_data_dir():
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
 def get_conn():
     _ensure_data_dir()
-    return sqlite3.connect(DB_PATH)
+    # timeout doubles as SQLite's busy timeout: wait for the lock instead of
+    # failing straight away with "database is locked"
+    return sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_S)
+
+class ReadPool:
+    """
+    Bounded pool of read-only connections. A connection outlives the
+    request, so its page cache stays warm and sqlite3's statement cache
+    hits for every query whose SQL text repeats (pass lists as one JSON
+    parameter through json_each(?) rather than a variable IN (?, ?, …)).
+    Callers wait for a free connection once `size` are checked out.
+    """
+
+    def __init__(self, size: int = READ_POOL_SIZE):
+        self.size = size
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []   # LIFO: the most recently used connection has the warmest cache
+        self._lock = threading.Lock()
+
+    def _open(self):
+        _ensure_data_dir()
+        conn = sqlite3.connect(
+            f"{DB_PATH.resolve().as_uri()}?mode=ro", uri=True, timeout=BUSY_TIMEOUT_S,
+            check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.execute(f"PRAGMA cache_size = -{READ_CACHE_MB * 1024};")
+        conn.execute(f"PRAGMA mmap_size = {READ_MMAP_MB * 1024 * 1024};")
+        READ_POOL_OPENED.inc()
+        return conn
+
+    @contextmanager
+    def connection(self):
+        start = time.perf_counter()
+        self._slots.acquire()
+        READ_POOL_WAIT_SECONDS.observe(time.perf_counter() - start)
+        try:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+                READ_POOL_CONNECTIONS.set(len(self._idle), state="idle")
+            if conn is None:
+                conn = self._open()
+        except Exception:
+            self._slots.release()
+            raise
+        READ_POOL_CONNECTIONS.inc(state="in_use")
+        try:
+            yield conn
+        finally:
+            READ_POOL_CONNECTIONS.dec(state="in_use")
+            if conn.in_transaction:
+                conn.rollback()
+            with self._lock:
+                self._idle.append(conn)
+                READ_POOL_CONNECTIONS.set(len(self._idle), state="idle")
+            self._slots.release()
+
+    def close(self):
+        """Close idle connections (checked-out ones return to a fresh pool)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            READ_POOL_CONNECTIONS.set(0, state="idle")
+        for conn in idle:
+            conn.close()
+
+_read_pool = ReadPool()
+
+def read_conn():
+    """A pooled read-only connection: `with read_conn() as conn: ...`; never close it."""
+    return _read_pool.connection()
 
 def init_db():
     conn = get_conn()
     c = conn.cursor()
-    # Basic table for ingested items
+    # WAL lets readers keep going while the writer commits; the setting is
+    # persistent, so every later connection to the file picks it up
+    c.execute("PRAGMA journal_mode=WAL;")
+    # Basic table for ingested items. Only small metadata lives here, so the
+    # scans and sorts of listings and searches stay within few pages
     c.execute("""
     CREATE TABLE IF NOT EXISTS insights (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         source TEXT NOT NULL,
         title TEXT,
         url TEXT NOT NULL UNIQUE,
-        content TEXT,
         published_at TEXT,
         inserted_at TEXT DEFAULT (datetime('now'))
     );
     """)
+    # Bodies, compressed by backend.text.compress_text and read through
+    # load_content() only when a caller needs them. clean_text is NULL when
+    # cleaning left the content unchanged (about half the rows), readers use
+    # COALESCE(clean_text, content). Nothing in SQL can read
+    # them, so the full-text index is written from Python (index_bodies)
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS insight_content (
+        id INTEGER PRIMARY KEY,
+        content BLOB,
+        clean_text BLOB
+    );
+    """)
+    _migrate_insight_columns(c)
+    _split_content(c)
+    # Near-duplicate detection (backend.dedup): LSH bands of each insight's SimHash
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS insight_bands (
+        band_key INTEGER NOT NULL,
+        insight_id INTEGER NOT NULL
+    );
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_insight_bands_key ON insight_bands(band_key);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_insights_canonical_url ON insights(canonical_url);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_insights_cluster ON insights(cluster_id);")
+    _backfill_signatures(c)
+    _backfill_published_ts(c)
+    # Date filters and newest-first listings are range scans on this index
+    c.execute("CREATE INDEX IF NOT EXISTS idx_insights_published_ts ON insights(published_ts, id);")
+    assign_clusters(c)
+    # Progress of the vector index in backend.vectors
+    c.execute("CREATE TABLE IF NOT EXISTS vector_meta (key TEXT PRIMARY KEY, value TEXT);")
+    # Online topic clustering (backend.topics): centroid sums as float32 blobs,
+    # running term counts, and per-day per-source sizes for windowed queries
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS topics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        centroid BLOB NOT NULL,
+        size INTEGER NOT NULL,
+        terms TEXT NOT NULL,
+        created_at INTEGER NOT NULL,
+        updated_at INTEGER NOT NULL
+    );
+    """)
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS topic_counts (
+        topic_id INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        source TEXT NOT NULL,
+        n INTEGER NOT NULL,
+        PRIMARY KEY (topic_id, day, source)
+    );
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_topic_counts_day ON topic_counts(day);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_insights_topic ON insights(topic_id, published_ts);")
+    # Hourly rollups for dashboards and /alerts (backend.rollups), keyed by published hour
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS rollup_source (
+        hour INTEGER NOT NULL,
+        source TEXT NOT NULL,
+        n INTEGER NOT NULL,
+        PRIMARY KEY (hour, source)
+    );
+    """)
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS rollup_term (
+        term TEXT NOT NULL,
+        hour INTEGER NOT NULL,
+        n INTEGER NOT NULL,
+        PRIMARY KEY (term, hour)
+    );
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_rollup_term_hour ON rollup_term(hour);")
+    c.execute("CREATE TABLE IF NOT EXISTS rollup_state (key TEXT PRIMARY KEY, value TEXT);")
+    _init_url_index(c)
+    _init_fts(c)
+    # Upstream responses cached by backend.ingest.cache (when persistence is on)
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS source_cache (
+        key TEXT PRIMARY KEY,
+        source TEXT NOT NULL,
+        value TEXT NOT NULL,
+        stored_at REAL NOT NULL
+    );
+    """)
+    # LLM summaries keyed by backend.llm.summary_cache_key
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS summary_cache (
+        key TEXT PRIMARY KEY,
+        query TEXT,
+        model TEXT,
+        summary TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        last_used REAL NOT NULL
+    );
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_summary_cache_last_used ON summary_cache(last_used);")
+    # Ingestion runs from backend.jobs; sources holds per-source progress as JSON
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS ingest_jobs (
+        id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        status TEXT NOT NULL,
+        sources TEXT NOT NULL,
+        started_at REAL,
+        finished_at REAL,
+        duration_ms INTEGER
+    );
+    """)
+    # Per-source crawl state: HTTP validators and the newest item already seen
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS source_state (
+        source TEXT NOT NULL,
+        key TEXT NOT NULL,
+        etag TEXT,
+        last_modified TEXT,
+        high_water TEXT,
+        updated_at TEXT DEFAULT (datetime('now')),
+        PRIMARY KEY (source, key)
+    );
+    """)
+    # Resumable backfills (backend.ingest.backfill): the next page cursor per (source, params)
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS backfill_state (
+        source TEXT NOT NULL,
+        key TEXT NOT NULL,
+        cursor TEXT,
+        pages INTEGER NOT NULL DEFAULT 0,
+        items INTEGER NOT NULL DEFAULT 0,
+        done INTEGER NOT NULL DEFAULT 0,
+        updated_at REAL,
+        PRIMARY KEY (source, key)
+    );
+    """)
+    # Last run of every crawl plan task (backend.crawl), keyed by source + params
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS crawl_tasks (
+        key TEXT PRIMARY KEY,
+        source TEXT NOT NULL,
+        params TEXT NOT NULL,
+        last_run REAL,
+        status TEXT,
+        count INTEGER,
+        elapsed_ms INTEGER,
+        error TEXT
+    );
+    """)
+    # YouTube transcripts per video, including negative results ("none", "disabled")
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS transcript_cache (
+        video_id TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        transcript TEXT,
+        fetched_at REAL NOT NULL
+    );
+    """)
+    # Parquet archive (backend.archive): every committed part file with the
+    # id / published_ts range it holds, so readers open only the parts a
+    # query can touch
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS archive_parts (
+        path TEXT PRIMARY KEY,
+        month TEXT NOT NULL,
+        rows INTEGER NOT NULL,
+        min_ts INTEGER NOT NULL,
+        max_ts INTEGER NOT NULL,
+        min_id INTEGER NOT NULL,
+        max_id INTEGER NOT NULL,
+        created_at TEXT DEFAULT (datetime('now'))
+    );
+    """)
+    # URLs of archived insights: the UNIQUE constraint on insights no longer
+    # sees them, this trigger keeps a re-fetched story from coming back
+    c.execute("CREATE TABLE IF NOT EXISTS archived_urls (url TEXT PRIMARY KEY) WITHOUT ROWID;")
+    c.execute("""
+    CREATE TRIGGER IF NOT EXISTS insights_archived_bi BEFORE INSERT ON insights
+    WHEN EXISTS (SELECT 1 FROM archived_urls WHERE url = new.url) BEGIN
+        SELECT RAISE(IGNORE);
+    END;
+    """)
     conn.commit()
     conn.close()
 
+# Columns added after the first schema, (name, type). Older DB files get them via ALTER TABLE.
+INSIGHT_COLUMNS = [
+    ("canonical_url", "TEXT"),
+    ("simhash", "INTEGER"),
+    ("cluster_id", "INTEGER"),
+    ("published_ts", "INTEGER"),   # published_at as UTC epoch seconds, inserted_at when unknown
+    ("topic_id", "INTEGER"),       # theme assigned by backend.topics
+]
+
+def _migrate_insight_columns(c):
+    existing = {row[1] for row in c.execute("PRAGMA table_info(insights)")}
+    for name, col_type in INSIGHT_COLUMNS:
+        if name not in existing:
+            c.execute(f"ALTER TABLE insights ADD COLUMN {name} {col_type};")
+
+def _split_content(c, batch_size: int = 1000):
+    """
+    Move the bodies of older DB files (insights.content / clean_text) into
+    insight_content, compressed, then drop the wide columns and VACUUM so
+    the file actually shrinks. The full-text index is rebuilt by _init_fts.
+    """
+    columns = {row[1] for row in c.execute("PRAGMA table_info(insights)")}
+    if "content" not in columns:
+        return
+    pending = c.execute("SELECT 1 FROM insights WHERE content IS NOT NULL LIMIT 1").fetchone()
+    # The old index triggers read the columns about to go away
+    c.executescript("""
+    DROP TRIGGER IF EXISTS insights_fts_ai;
+    DROP TRIGGER IF EXISTS insights_fts_ad;
+    DROP TRIGGER IF EXISTS insights_fts_au;
+    """)
+    if pending:
+        c.execute("DROP TABLE IF EXISTS insights_fts;")
+    clean_column = "clean_text" if "clean_text" in columns else "NULL"
+    total = 0
+    last_id = 0
+    while True:
+        rows = c.execute(
+            f"SELECT id, content, {clean_column} FROM insights WHERE id > ? AND content IS NOT NULL ORDER BY id LIMIT ?",
+            (last_id, batch_size),
+        ).fetchall()
+        if not rows:
+            break
+        c.executemany(
+            "INSERT OR REPLACE INTO insight_content (id, content, clean_text) VALUES (?, ?, ?)",
+            [
+                (insight_id, compress_text(content), stored_clean_text(content, clean if clean is not None else normalize_text(content)))
+                for insight_id, content, clean in rows
+            ],
+        )
+        last_id = rows[-1][0]
+        total += len(rows)
+    try:
+        for name in ("content", "clean_text"):
+            if name in columns:
+                c.execute(f"ALTER TABLE insights DROP COLUMN {name};")
+    except sqlite3.OperationalError:
+        # SQLite < 3.35 has no DROP COLUMN; emptied columns cost next to nothing
+        if pending:
+            c.execute("UPDATE insights SET content = NULL;" if clean_column == "NULL" else
+                      "UPDATE insights SET content = NULL, clean_text = NULL;")
+    c.connection.commit()
+    if total:
+        log.info(f"🔧 Moved {total} insight bodies to compressed storage, compacting the database…")
+        c.execute("VACUUM;")
+
+def _init_url_index(c):
+    """
+    Lookups by URL alone (dedup, incremental crawls). New tables have url
+    UNIQUE, whose index serves them; older ones only have UNIQUE(source,
+    url), which cannot, so they get idx_insights_url.
+    """
+    url_unique = any(
+        unique and [col[2] for col in c.execute(f"PRAGMA index_info('{name}')")] == ["url"]
+        for _, name, unique, *_ in c.execute("PRAGMA index_list(insights)").fetchall()
+    )
+    if url_unique:
+        c.execute("DROP INDEX IF EXISTS idx_insights_url;")
+    else:
+        c.execute("CREATE INDEX IF NOT EXISTS idx_insights_url ON insights(url);")
+
+def _backfill_signatures(c, batch_size: int = 1000):
+    """Compute canonical_url / simhash for rows stored before dedup existed."""
+    total = 0
+    while True:
+        rows = c.execute("""
+            SELECT i.id, i.url, i.title, COALESCE(b.clean_text, b.content)
+            FROM insights i LEFT JOIN insight_content b ON b.id = i.id
+            WHERE i.canonical_url IS NULL LIMIT ?
+        """, (batch_size,)).fetchall()
+        if not rows:
+            break
+        c.executemany(
+            "UPDATE insights SET canonical_url = ?, simhash = ? WHERE id = ?",
+            [
+                (canonicalize_url(url), simhash(title, decompress_text(text)), insight_id)
+                for insight_id, url, title, text in rows
+            ],
+        )
+        total += len(rows)
+    if total:
+        log.info(f"🔧 Computed dedup signatures for {total} existing insights")
+
+def _backfill_published_ts(c, batch_size: int = 5000):
+    """Normalize the mixed published_at formats of rows stored before published_ts existed."""
+    total = 0
+    while True:
+        rows = c.execute(
+            "SELECT id, published_at, inserted_at FROM insights WHERE published_ts IS NULL LIMIT ?", (batch_size,)
+        ).fetchall()
+        if not rows:
+            break
+        c.executemany(
+            "UPDATE insights SET published_ts = ? WHERE id = ?",
+            [
+                (parse_timestamp(published_at) or parse_timestamp(inserted_at) or int(time.time()), insight_id)
+                for insight_id, published_at, inserted_at in rows
+            ],
+        )
+        total += len(rows)
+    if total:
+        log.info(f"🔧 Normalized publish timestamps for {total} existing insights")
+
+def _init_fts(c):
+    """
+    Contentless FTS5 index over (title, clean_text). Bodies are stored
+    compressed, so the index keeps no copy of its own and is written from
+    Python: index_bodies() for new rows, 'delete' commands with the old text
+    for replaced or removed ones (the writer, unindex_bodies()). Rows deleted
+    behind its back only leave dead entries: ids are never reused, so they
+    no longer join any insight. Older indexes, external content over
+    insights or the insight_docs view, are replaced and backfilled.
+    """
+    existing = c.execute(
+        "SELECT sql FROM sqlite_master WHERE type='table' AND name='insights_fts'"
+    ).fetchone()
+    if existing and "content=''" not in existing[0]:
+        c.executescript("""
+        DROP TRIGGER IF EXISTS insights_fts_ai;
+        DROP TRIGGER IF EXISTS insights_fts_ad;
+        DROP TRIGGER IF EXISTS insights_fts_au;
+        DROP TRIGGER IF EXISTS insight_content_fts_ai;
+        DROP TRIGGER IF EXISTS insight_content_fts_ad;
+        DROP TRIGGER IF EXISTS insight_content_fts_au;
+        DROP TABLE insights_fts;
+        """)
+        existing = None
+    c.executescript("""
+    DROP VIEW IF EXISTS insight_docs;
+    CREATE VIRTUAL TABLE IF NOT EXISTS insights_fts USING fts5(
+        title, clean_text,
+        content='', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    );
+    -- Deleting an insight takes its body along
+    CREATE TRIGGER IF NOT EXISTS insights_content_bd BEFORE DELETE ON insights BEGIN
+        DELETE FROM insight_content WHERE id = old.id;
+    END;
+    """)
+    if not existing:
+        log.info("🔧 Building full-text index for existing insights…")
+        index_bodies(c)
+
+FTS_INSERT_SQL = "INSERT INTO insights_fts (rowid, title, clean_text) VALUES (?, ?, ?);"
+FTS_DELETE_SQL = "INSERT INTO insights_fts (insights_fts, rowid, title, clean_text) VALUES ('delete', ?, ?, ?);"
+
+def index_bodies(conn, after_id: int = 0, batch_size: int = 1000) -> int:
+    """Add every insight with an id above `after_id` and a stored body to the full-text index."""
+    total = 0
+    while True:
+        rows = conn.execute("""
+            SELECT i.id, i.title, COALESCE(b.clean_text, b.content)
+            FROM insights i JOIN insight_content b ON b.id = i.id
+            WHERE i.id > ? ORDER BY i.id LIMIT ?
+        """, (after_id, batch_size)).fetchall()
+        if not rows:
+            return total
+        conn.executemany(FTS_INSERT_SQL, [(i, title, decompress_text(text)) for i, title, text in rows])
+        after_id = rows[-1][0]
+        total += len(rows)
+
+def unindex_bodies(conn, ids: list) -> int:
+    """Take insights out of the full-text index; call before deleting them."""
+    rows = conn.execute("""
+        SELECT i.id, i.title, COALESCE(b.clean_text, b.content)
+        FROM insights i JOIN insight_content b ON b.id = i.id
+        WHERE i.id IN (SELECT value FROM json_each(?))
+    """, (json.dumps(ids),)).fetchall()
+    conn.executemany(FTS_DELETE_SQL, [(i, title, decompress_text(text)) for i, title, text in rows])
+    return len(rows)
+
+
+# -------------------------------
+# Insight bodies
+# -------------------------------
+CONTENT_FIELDS = ("content", "clean_text")
+_FIELD_SQL = {"content": "content", "clean_text": "COALESCE(clean_text, content)"}
+
+def stored_clean_text(content: str, clean_text: str):
+    """insight_content.clean_text for a body: compressed, or None when it equals the content."""
+    return None if clean_text == (content or "") else compress_text(clean_text)
+
+def load_content(ids: list, fields=CONTENT_FIELDS, conn=None) -> dict:
+    """{id: {field: text}} for the given insight ids; only `fields` are read and decompressed."""
+    fields = [f for f in fields if f in CONTENT_FIELDS]
+    ids = [i for i in ids if i is not None]
+    if not fields or not ids:
+        return {}
+    if conn is None:
+        with read_conn() as conn:
+            return load_content(ids, fields, conn)
+    sql = f"SELECT id, {', '.join(_FIELD_SQL[f] for f in fields)} FROM insight_content WHERE id IN (SELECT value FROM json_each(?))"
+    return {
+        row[0]: {name: decompress_text(blob) for name, blob in zip(fields, row[1:])}
+        for row in conn.execute(sql, (json.dumps(ids),))
+    }
+
+def attach_content(rows: list, fields=CONTENT_FIELDS, conn=None) -> list:
+    """Fill `fields` into insight dicts (by their "id") in place; rows without a body get ""."""
+    bodies = load_content([row.get("id") for row in rows], fields, conn)
+    for row in rows:
+        body = bodies.get(row.get("id"), {})
+        for name in fields:
+            row[name] = body.get(name) or ""
+    return rows
+
+
+# -------------------------------
+# Incremental crawl state
+# -------------------------------
+def get_source_state(source: str, key: str) -> dict:
+    """ETag / Last-Modified / high-water mark stored for (source, key), or {}."""
+    with read_conn() as conn:
+        row = conn.execute(
+            "SELECT etag, last_modified, high_water FROM source_state WHERE source = ? AND key = ?",
+            (source, key),
+        ).fetchone()
+    return dict(zip(("etag", "last_modified", "high_water"), row)) if row else {}
+
+def set_source_state(source: str, key: str, etag: str = None, last_modified: str = None, high_water: str = None):
+    """
+    Queue an upsert of etag / last_modified / high_water for (source, key);
+    None leaves a field as it is. It goes through the writer behind the rows
+    of the fetch it describes, so the mark never moves past rows that were
+    not committed.
+    """
+    if etag is None and last_modified is None and high_water is None:
+        return
+    _writer.put(SOURCE_STATE_SQL, (source, key, etag, last_modified, high_water))
+
+def get_backfill_state(source: str, key: str) -> dict:
+    """Checkpoint of a backfill: cursor (JSON), pages, items, done; {} if never started."""
+    with read_conn() as conn:
+        row = conn.execute(
+            "SELECT cursor, pages, items, done FROM backfill_state WHERE source = ? AND key = ?", (source, key)
+        ).fetchone()
+    return dict(zip(("cursor", "pages", "items", "done"), row)) if row else {}
+
+def existing_urls(urls: list) -> set:
+    """Subset of `urls` already stored in insights or the archive."""
+    urls = [u for u in urls if u]
+    if not urls:
+        return set()
+    with read_conn() as conn:
+        rows = conn.execute("""
+            SELECT url FROM insights WHERE url IN (SELECT value FROM json_each(?1))
+            UNION ALL
+            SELECT url FROM archived_urls WHERE url IN (SELECT value FROM json_each(?1))
+        """, (json.dumps(urls),)).fetchall()
+    return {r[0] for r in rows}
+
+# -------------------------------
+# Write-behind insert pipeline
+# -------------------------------
+INSERT_INSIGHT_SQL = """
+    INSERT OR IGNORE INTO insights (source, title, url, published_at, canonical_url, simhash, published_ts)
+    VALUES (?, ?, ?, ?, ?, ?, ?);
+"""
+# Runs right after INSERT_INSIGHT_SQL for the same rows; a URL stored before keeps its body.
+# Matched on source too: DB files from before the url-only UNIQUE key have UNIQUE(source, url)
+INSERT_CONTENT_SQL = """
+    INSERT OR IGNORE INTO insight_content (id, content, clean_text)
+    SELECT id, ?, ? FROM insights WHERE source = ? AND url = ?;
+"""
+BACKFILL_STATE_SQL = """
+    INSERT INTO backfill_state (source, key, cursor, pages, items, done, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(source, key) DO UPDATE SET
+        cursor = excluded.cursor, pages = excluded.pages, items = excluded.items,
+        done = excluded.done, updated_at = excluded.updated_at;
+"""
+SOURCE_STATE_SQL = """
+    INSERT INTO source_state (source, key, etag, last_modified, high_water, updated_at)
+    VALUES (?, ?, ?, ?, ?, datetime('now'))
+    ON CONFLICT(source, key) DO UPDATE SET
+        etag = COALESCE(excluded.etag, etag),
+        last_modified = COALESCE(excluded.last_modified, last_modified),
+        high_water = COALESCE(excluded.high_water, high_water),
+        updated_at = excluded.updated_at;
+"""
+UPDATE_CONTENT_SQL = """
+    UPDATE insight_content SET content = ?, clean_text = ?
+    WHERE id = (SELECT id FROM insights WHERE source = ? AND url = ?);
+"""
+
+_STOP = object()
+
+# Called as hook(conn), in a transaction of its own, after every committed
+# batch, for work that must follow the inserts (story clustering, rollups, …)
+_post_write_hooks = [assign_clusters]
+
+def register_post_write_hook(hook):
+    _post_write_hooks.append(hook)
+
+# Called as hook(conn, changes), inside the writer's transaction, when
+# update_insight_content() replaces bodies, to re-derive what was built from
+# the old text (vector, topic, term rollups). `changes` is a list of dicts
+# with id, source, title, published_ts, old_text and new_text (clean text).
+_content_hooks = []
+
+def register_content_hook(hook):
+    _content_hooks.append(hook)
+
+def _replace_content(conn, rows: list):
+    """
+    Run UPDATE_CONTENT_SQL for `rows` and swap the full-text index entries,
+    then recompute the SimHash of every replaced body and clear its LSH bands and cluster_id so assign_clusters
+    places it again, and hand the changes to the content hooks.
+    """
+    changes = []
+    # Row by row, so a body replaced twice in one batch diffs against the first replacement
+    for params in rows:
+        content, clean_text, source, url = params
+        row = conn.execute("""
+            SELECT i.id, i.title, i.published_ts, COALESCE(b.clean_text, b.content)
+            FROM insights i JOIN insight_content b ON b.id = i.id
+            WHERE i.source = ? AND i.url = ?
+        """, (source, url)).fetchone()
+        if row is None:
+            continue
+        conn.execute(UPDATE_CONTENT_SQL, params)
+        insight_id, title, published_ts, old = row
+        change = {
+            "id": insight_id, "source": source, "title": title, "published_ts": published_ts,
+            "old_text": decompress_text(old), "new_text": decompress_text(content if clean_text is None else clean_text),
+        }
+        conn.execute(FTS_DELETE_SQL, (insight_id, title, change["old_text"]))
+        conn.execute(FTS_INSERT_SQL, (insight_id, title, change["new_text"]))
+        changes.append(change)
+    if not changes:
+        return
+    conn.execute(
+        "DELETE FROM insight_bands WHERE insight_id IN (SELECT value FROM json_each(?))",
+        (json.dumps([change["id"] for change in changes]),),
+    )
+    conn.executemany(
+        "UPDATE insights SET simhash = ?, cluster_id = NULL WHERE id = ?",
+        [(simhash(change["title"], change["new_text"]), change["id"]) for change in changes],
+    )
+    # A failing hook leaves its own derived data stale but must not lose the new bodies
+    for hook in _content_hooks:
+        conn.execute("SAVEPOINT content_hook")
+        try:
+            hook(conn, changes)
+        except Exception as e:
+            conn.execute("ROLLBACK TO content_hook")
+            log.error(f"❌ Content hook {hook.__name__} failed: {e}")
+        conn.execute("RELEASE content_hook")
+
+class InsightWriter:
+    """
+    Owns one long-lived connection on a background thread. (sql, params)
+    pairs are queued by save_insight() / update_insight_content() and written
+    with executemany, one transaction per batch of WRITE_BATCH_SIZE rows or
+    WRITE_FLUSH_S seconds, whichever comes first. Queue order is preserved,
+    so crawl marks and backfill checkpoints queued after their rows
+    (set_source_state, save_backfill_state) commit with them or after them.
+    """
+
+    def __init__(self, batch_size: int = WRITE_BATCH_SIZE, flush_s: float = WRITE_FLUSH_S):
+        self.batch_size = batch_size
+        self.flush_s = flush_s
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="insight-writer", daemon=True)
+                self._thread.start()
+
+    def put(self, sql: str, params: tuple):
+        self._ensure_started()
+        self._queue.put((sql, params))
+
+    def flush(self, timeout: float = None) -> bool:
+        """Block until every row queued before this call is committed."""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: float = None):
+        """Flush outstanding rows and stop the writer thread."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _apply(self, conn, batch: list) -> dict:
+        """Write `batch` in one transaction; returns {source: new insights}. Rolls back on any error."""
+        inserted = {}
+        with timed("db_write"), conn:
+            # Consecutive statements of the same shape go through one executemany
+            for sql, group in itertools.groupby(batch, key=lambda item: item[0]):
+                rows = [params for _, params in group]
+                if sql == INSERT_INSIGHT_SQL:
+                    # Per source, so rowcount tells how many were new (OR IGNORE skips the rest).
+                    # params end with the compressed (content, clean_text) for insight_content.
+                    # New rows get ids above the current maximum (AUTOINCREMENT), which
+                    # is how the full-text index finds the bodies it has to add
+                    last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM insights").fetchone()[0]
+                    for source, source_rows in itertools.groupby(rows, key=lambda params: params[0]):
+                        source_rows = list(source_rows)
+                        cursor = conn.executemany(sql, [params[:-2] for params in source_rows])
+                        inserted[source] = inserted.get(source, 0) + cursor.rowcount
+                        conn.executemany(
+                            INSERT_CONTENT_SQL, [(*params[-2:], params[0], params[2]) for params in source_rows]
+                        )
+                    index_bodies(conn, last_id)
+                elif sql == UPDATE_CONTENT_SQL:
+                    _replace_content(conn, rows)
+                else:
+                    conn.executemany(sql, rows)
+        return inserted
+
+    def _write(self, conn, batch: list):
+        if not batch:
+            return
+        try:
+            inserted = self._apply(conn, batch)
+        except Exception as e:
+            # One bad row must not take the batch with it: redo it a row at a time
+            log.warning(f"⚠️ DB write of {len(batch)} rows failed ({e}), retrying row by row")
+            inserted = {}
+            for item in batch:
+                try:
+                    for source, count in self._apply(conn, [item]).items():
+                        inserted[source] = inserted.get(source, 0) + count
+                except Exception as e:
+                    log.error(f"❌ DB write error, row dropped ({' '.join(item[0].split()[:4])} …): {e}")
+        for source, count in inserted.items():
+            ROWS_INGESTED.inc(count, source=source)
+        batch.clear()
+        # Hooks get their own transaction, a failing hook must not lose the rows
+        for hook in _post_write_hooks:
+            try:
+                with conn:
+                    hook(conn)
+            except Exception as e:
+                log.error(f"❌ Post-write hook {hook.__name__} failed: {e}")
+
+    def _run(self):
+        conn = get_conn()
+        conn.execute("PRAGMA journal_mode=WAL;")
+        batch = []
+        first_at = None
+        try:
+            while True:
+                wait_s = None if first_at is None else max(0.0, first_at + self.flush_s - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=wait_s)
+                except queue.Empty:
+                    item = None
+                try:
+                    if item is None:
+                        self._write(conn, batch)
+                        first_at = None
+                        continue
+
+                    if item is _STOP:
+                        self._write(conn, batch)
+                        return
+                    if isinstance(item, threading.Event):
+                        self._write(conn, batch)
+                        first_at = None
+                        item.set()
+                        continue
+
+                    batch.append(item)
+                    if first_at is None:
+                        first_at = time.monotonic()
+                    if len(batch) >= self.batch_size:
+                        self._write(conn, batch)
+                        first_at = None
+                except Exception as e:
+                    # Keep the thread alive: a dead writer leaves every later flush_writes() waiting
+                    log.error(f"❌ Insight writer error ({len(batch)} rows dropped): {e}")
+                    batch.clear()
+                    first_at = None
+                    if isinstance(item, threading.Event):
+                        item.set()
+                    if item is _STOP:
+                        return
+        finally:
+            conn.close()
+
+_writer = InsightWriter()
+
+def flush_writes(timeout: float = None) -> bool:
+    return _writer.flush(timeout)
+
+def close_writer(timeout: float = None):
+    _writer.close(timeout)
+
+atexit.register(close_writer)
+
 def save_insight(source: str, title: str, url: str, content: str, published_at: str):
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("""
-        INSERT OR IGNORE INTO insights (source, title, url, content, published_at)
-        VALUES (?, ?, ?, ?, ?);
-    """, (source, title or "", url or "", content or "", published_at or ""))
-    conn.commit()
-    conn.close()
+    # Text cleanup and signatures are computed here, on the fetcher's thread, to keep the writer lean
+    clean_text = normalize_text(content)
+    _writer.put(INSERT_INSIGHT_SQL, (
+        source, title or "", url or "", published_at or "",
+        canonicalize_url(url), simhash(title, clean_text),
+        parse_timestamp(published_at) or int(time.time()),
+        compress_text(content), stored_clean_text(content, clean_text),
+    ))
+
+def update_insight_content(source: str, url: str, content: str):
+    """
+    Queue a content replacement (e.g. a late-arriving transcript) for the
+    insight stored from `source` at `url`. The writer re-derives its SimHash
+    and cluster, and the content hooks its vector, topic and term rollups.
+    """
+    _writer.put(UPDATE_CONTENT_SQL, (
+        compress_text(content), stored_clean_text(content, normalize_text(content)), source, url,
+    ))
+
+def save_backfill_state(source: str, key: str, cursor: str, pages: int, items: int, done: bool):
+    """
+    Queue a backfill checkpoint behind the rows of the pages it covers, so
+    it is never committed before them and a resumed run loses nothing.
+    """
+    _writer.put(BACKFILL_STATE_SQL, (source, key, cursor, pages, items, int(done), time.time()))
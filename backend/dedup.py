@@ -0,0 +1,184 @@
+# insightlens/backend/dedup.py
+
+import os
+import re
+import base64
+import hashlib
+import urllib.parse
+from typing import List, Optional
+
+# Two insights are the same story when their 64-bit SimHashes differ in at
+# most this many bits. The signature is split into SIMHASH_BANDS bands, so any
+# pair within the distance shares at least one band exactly (pigeonhole).
+SIMHASH_DISTANCE = int(os.getenv("INSIGHTLENS_SIMHASH_DISTANCE", "3"))
+SIMHASH_BANDS = 4
+_BAND_BITS = 64 // SIMHASH_BANDS
+
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "mc_cid", "mc_eid", "igshid",
+    "ref", "ref_src", "ref_url", "referrer", "cmpid", "ncid", "ocid", "smid", "soc_src",
+    "taid", "spm", "ito", "at_medium", "at_campaign", "guccounter", "share", "output",
+}
+# Redirectors that carry the target URL in a query parameter
+REDIRECT_PARAMS = {
+    "www.google.com": "url", "google.com": "url",
+    "l.facebook.com": "u", "lm.facebook.com": "u",
+    "out.reddit.com": "url",
+}
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_PUBLISHER_SUFFIX_RE = re.compile(r"\s+[-–|]\s+[^-–|]{1,60}$")
+
+
+def _decode_google_news(url: str) -> Optional[str]:
+    """Old-style news.google.com/rss/articles/<base64> links embed the target URL."""
+    path = urllib.parse.urlsplit(url).path
+    token = path.rsplit("/", 1)[-1]
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except Exception:
+        return None
+    match = re.search(rb"https?://[\x21-\x7e]+", raw)
+    if not match:
+        return None
+    return match.group(0).decode("ascii")
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalized identity for a URL: resolve known redirect wrappers, lowercase
+    scheme and host, drop www., fragments, tracking parameters and trailing
+    slashes, and sort what's left of the query string.
+    """
+    url = (url or "").strip()
+    if not url:
+        return ""
+    parts = urllib.parse.urlsplit(url)
+    host = parts.netloc.lower()
+
+    if host == "news.google.com" and "/articles/" in parts.path:
+        target = _decode_google_news(url)
+        if target:
+            return canonicalize_url(target)
+    if host in REDIRECT_PARAMS:
+        target = urllib.parse.parse_qs(parts.query).get(REDIRECT_PARAMS[host], [None])[0]
+        if target and target.startswith("http"):
+            return canonicalize_url(target)
+
+    if host.startswith("www."):
+        host = host[4:]
+    if host.endswith(":80") or host.endswith(":443"):
+        host = host.rsplit(":", 1)[0]
+    query = [
+        (k, v) for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    ]
+    path = parts.path.rstrip("/") or "/"
+    return urllib.parse.urlunsplit(("https", host, path, urllib.parse.urlencode(sorted(query)), ""))
+
+
+def _signature_tokens(title: str, content: str):
+    # "Headline - Publisher" (Google News) and "Headline | Site" suffixes differ per outlet
+    title = _PUBLISHER_SUFFIX_RE.sub("", title or "")
+    title_words = [w.lower() for w in _WORD_RE.findall(title)]
+    content_words = [w.lower() for w in _WORD_RE.findall(content or "")[:60]]
+    # Title bigrams carry most of the identity, weight them double
+    for i in range(max(1, len(title_words) - 1)):
+        yield " ".join(title_words[i:i + 2]), 2
+    for i in range(max(0, len(content_words) - 2)):
+        yield " ".join(content_words[i:i + 3]), 1
+
+
+def simhash(title: str, content: str = "") -> Optional[int]:
+    """64-bit SimHash (as a signed SQLite integer) over title and lead text, None if empty."""
+    weights = [0] * 64
+    empty = True
+    for token, weight in _signature_tokens(title, content):
+        if not token:
+            continue
+        empty = False
+        h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += weight if h >> bit & 1 else -weight
+    if empty:
+        return None
+    value = sum(1 << bit for bit in range(64) if weights[bit] > 0)
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin((a ^ b) & ((1 << 64) - 1)).count("1")
+
+
+def band_keys(signature: int) -> List[int]:
+    unsigned = signature & ((1 << 64) - 1)
+    mask = (1 << _BAND_BITS) - 1
+    return [(band << _BAND_BITS) | (unsigned >> (band * _BAND_BITS) & mask) for band in range(SIMHASH_BANDS)]
+
+
+def assign_clusters(conn, batch_size: int = 500) -> int:
+    """
+    Give every insight without a cluster_id the cluster of an earlier insight
+    with the same canonical URL or a SimHash within SIMHASH_DISTANCE, or its
+    own id. Returns the number of rows assigned.
+    """
+    assigned = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, canonical_url, simhash FROM insights WHERE cluster_id IS NULL ORDER BY id LIMIT ?",
+            (batch_size,),
+        ).fetchall()
+        if not rows:
+            return assigned
+        for insight_id, canonical, signature in rows:
+            cluster = None
+            if canonical:
+                match = conn.execute(
+                    "SELECT cluster_id FROM insights WHERE canonical_url = ? AND id != ? AND cluster_id IS NOT NULL LIMIT 1",
+                    (canonical, insight_id),
+                ).fetchone()
+                cluster = match[0] if match else None
+            keys = band_keys(signature) if signature is not None else []
+            if cluster is None and keys:
+                candidates = conn.execute(f"""
+                    SELECT DISTINCT i.simhash, i.cluster_id
+                    FROM insight_bands b JOIN insights i ON i.id = b.insight_id
+                    WHERE b.band_key IN ({", ".join("?" for _ in keys)})
+                """, keys).fetchall()
+                best = min(
+                    ((hamming(signature, other), other_cluster) for other, other_cluster in candidates),
+                    default=None,
+                )
+                if best is not None and best[0] <= SIMHASH_DISTANCE:
+                    cluster = best[1]
+            conn.execute("UPDATE insights SET cluster_id = ? WHERE id = ?", (cluster or insight_id, insight_id))
+            conn.executemany(
+                "INSERT INTO insight_bands (band_key, insight_id) VALUES (?, ?)",
+                [(key, insight_id) for key in keys],
+            )
+            assigned += 1
+
+
+def collapse_duplicates(insights: list) -> list:
+    """
+    Keep the first insight of each story (same canonical URL or near-identical
+    SimHash) and record how many copies were folded into it.
+    """
+    kept = []
+    signatures = []
+    by_url = {}
+    for insight in insights:
+        canonical = canonicalize_url(insight.get("url", ""))
+        # Stored rows may come without their raw body; clean_text is what ingest hashed too
+        signature = simhash(insight.get("title", ""), insight.get("clean_text") or insight.get("content", ""))
+        match = by_url.get(canonical) if canonical else None
+        if match is None and signature is not None:
+            match = next((i for i, s in enumerate(signatures) if s is not None and hamming(s, signature) <= SIMHASH_DISTANCE), None)
+        if match is not None:
+            kept[match]["duplicates"] = kept[match].get("duplicates", 0) + 1
+            continue
+        if canonical:
+            by_url[canonical] = len(kept)
+        kept.append(dict(insight))
+        signatures.append(signature)
+    return kept
@@ -0,0 +1,83 @@
+# insightlens/backend/federated.py
+
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from .metrics import SOURCE_ERRORS
+from .ingest.http_client import deadline
+
+log = logging.getLogger(__name__)
+
+# Request-level latency budget for a federated /search fetch (seconds).
+SEARCH_BUDGET_S = float(os.getenv("INSIGHTLENS_SEARCH_BUDGET_S", "8"))
+# Fetch threads per request. Each request gets its own, so a fetch that is
+# still winding down never delays the fetches of the next request.
+FETCH_WORKERS = int(os.getenv("INSIGHTLENS_FETCH_WORKERS", "8"))
+
+
+def _timed_call(fn: Callable, kwargs: dict, until: float):
+    start = time.perf_counter()
+    try:
+        # Requests, retries and rate-limit waits stop at the budget (http_client.deadline)
+        with deadline(until):
+            return fn(**kwargs), None, time.perf_counter() - start
+    except Exception as e:
+        return None, e, time.perf_counter() - start
+
+
+def iter_federated(
+    tasks: Dict[str, Tuple[Callable, dict]],
+    budget_s: Optional[float] = None,
+) -> Iterator[Tuple[str, list, Dict]]:
+    """
+    Run every fetcher in `tasks` ({name: (fn, kwargs)}) concurrently and yield
+    (name, insights, status) as each one finishes. A fetcher that raised is
+    yielded with status "error"; sources still running when the budget runs
+    out are yielded last with status "timeout". Their HTTP calls give up at
+    the budget too, rather than retrying on in the background.
+    """
+    budget_s = SEARCH_BUDGET_S if budget_s is None else budget_s
+    until = time.monotonic() + budget_s
+    executor = ThreadPoolExecutor(max_workers=max(1, min(FETCH_WORKERS, len(tasks))), thread_name_prefix="fetch")
+    pending = {executor.submit(_timed_call, fn, kwargs, until): name for name, (fn, kwargs) in tasks.items()}
+    try:
+        while pending:
+            remaining = until - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = pending.pop(fut)
+                insights, error, elapsed = fut.result()
+                status = {"status": "ok", "elapsed_ms": round(elapsed * 1000)}
+                if error is not None:
+                    status.update(status="error", error=str(error))
+                    SOURCE_ERRORS.inc(source=name, kind="error")
+                    insights = []
+                insights = insights or []
+                status["count"] = len(insights)
+                yield name, insights, status
+
+        for name in pending.values():
+            log.warning(f"⏱️ {name}: no response within {budget_s}s budget")
+            SOURCE_ERRORS.inc(source=name, kind="timeout")
+            yield name, [], {"status": "timeout", "elapsed_ms": round(budget_s * 1000), "count": 0}
+    finally:
+        # Late fetchers finish on their own (bounded by the deadline); tasks not started yet are dropped
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def federated_fetch(
+    tasks: Dict[str, Tuple[Callable, dict]],
+    budget_s: Optional[float] = None,
+) -> Tuple[list, Dict[str, Dict]]:
+    """Collect everything `iter_federated` returns within the budget."""
+    insights = []
+    statuses = {}
+    for name, items, status in iter_federated(tasks, budget_s):
+        insights.extend(items)
+        statuses[name] = status
+    return insights, statuses
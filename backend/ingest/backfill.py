@@ -0,0 +1,155 @@
+# insightlens/backend/ingest/backfill.py
+
+import sys
+import json
+import time
+import logging
+import argparse
+from typing import Optional
+
+from backend.db import init_db, save_insight, existing_urls, flush_writes, get_backfill_state, save_backfill_state
+from backend.logs import configure_logging
+from backend.metrics import SOURCE_ERRORS, timed
+from backend.ingest.news import newsapi_pages
+from backend.ingest.gdelt import gdelt_pages
+from backend.ingest.reddit import reddit_pages
+from backend.ingest.youtube import youtube_search_pages, store_videos, wait_for_transcripts, video_url
+
+log = logging.getLogger(__name__)
+
+# Sources with a way to page back in time: name -> page generator. Each
+# generator takes the source's params plus cursor= and yields
+# (records, next cursor), with None as the cursor of the last page.
+BACKFILLS = {
+    "reddit": reddit_pages,
+    "newsapi": newsapi_pages,
+    "gdelt": gdelt_pages,
+    "youtube_search": youtube_search_pages,
+}
+
+
+def backfill_key(params: dict) -> str:
+    return json.dumps(params, sort_keys=True)
+
+
+def _record_url(source: str, record) -> str:
+    # YouTube pages hold (video_id, snippet) pairs, the others insight dicts
+    return video_url(record[0]) if source == "youtube_search" else record.get("url", "")
+
+
+def _timed_pages(source: str, pages):
+    """Pass pages through, timing each upstream request in STAGE_SECONDS."""
+    while True:
+        with timed("backfill_fetch", source=source):
+            page = next(pages, None)
+        if page is None:
+            return
+        yield page
+
+
+def _new_only(source: str, pages):
+    """Drop records that are already stored, by URL."""
+    for records, cursor in pages:
+        seen = existing_urls([_record_url(source, r) for r in records])
+        yield [r for r in records if _record_url(source, r) not in seen], cursor
+
+
+def _store(source: str, records: list) -> int:
+    if source == "youtube_search":
+        return len(store_videos(source, records))
+    for insight in records:
+        save_insight(**insight)
+    return len(records)
+
+
+def backfill(source: str, params: Optional[dict] = None, max_pages: Optional[int] = None, restart: bool = False) -> dict:
+    """
+    Page through `source`'s history for `params`, storing new items as each
+    page arrives and checkpointing the next cursor after it. A later call
+    with the same params resumes from the checkpoint; restart=True starts
+    over. max_pages bounds this call (e.g. to spread a quota over days).
+    """
+    pager = BACKFILLS.get(source)
+    if pager is None:
+        raise ValueError(f"{source} can't be backfilled; supported: {', '.join(BACKFILLS)}")
+    params = params or {}
+    key = backfill_key(params)
+    state = {} if restart else get_backfill_state(source, key)
+    pages_done, items = state.get("pages", 0), state.get("items", 0)
+    if state.get("done"):
+        log.info(f"✅ Backfill {source} {key}: already complete ({pages_done} pages, {items} items)")
+        return {
+            "source": source, "key": key, "status": "done",
+            "pages": pages_done, "items": items, "pages_run": 0, "elapsed_ms": 0,
+        }
+    cursor = json.loads(state["cursor"]) if state.get("cursor") else None
+    if cursor is not None:
+        log.info(f"⏯️ Backfill {source} {key}: resuming after page {pages_done}")
+
+    pages = _new_only(source, _timed_pages(source, pager(cursor=cursor, **params)))
+    pages_run = 0
+    status = "done"
+    started = time.perf_counter()
+    try:
+        for records, cursor in pages:
+            stored = _store(source, records)
+            pages_done += 1
+            pages_run += 1
+            items += stored
+            save_backfill_state(source, key, json.dumps(cursor), pages_done, items, cursor is None)
+            log.info(
+                f"📜 Backfill {source}: page {pages_done}, {stored} new items",
+                extra={"source": source, "page": pages_done, "count": stored},
+            )
+            if cursor is not None and max_pages and pages_run >= max_pages:
+                status = "paused"
+                break
+        else:
+            if pages_run == 0:
+                # Nothing (left) to page through
+                save_backfill_state(source, key, None, pages_done, items, True)
+    except Exception as e:
+        # The checkpoint still points at the failed page, the next run retries it
+        log.error(f"❌ Backfill {source} {key} stopped at page {pages_done + 1}: {e}")
+        SOURCE_ERRORS.inc(source=source, kind="backfill")
+        status = "error"
+    flush_writes()
+    elapsed_ms = round((time.perf_counter() - started) * 1000)
+    log.info(
+        f"📜 Backfill {source} {key}: {status} after {pages_run} pages this run, {items} items in total",
+        extra={"source": source, "status": status, "pages": pages_run, "duration_ms": elapsed_ms},
+    )
+    return {
+        "source": source, "key": key, "status": status,
+        "pages": pages_done, "items": items, "pages_run": pages_run, "elapsed_ms": elapsed_ms,
+    }
+
+
+def _param(text: str):
+    name, _, value = text.partition("=")
+    try:
+        return name, json.loads(value)
+    except ValueError:
+        return name, value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Resumable backfill, e.g. `python -m backend.ingest.backfill reddit subreddit=technology`"
+    )
+    parser.add_argument("source", choices=sorted(BACKFILLS))
+    parser.add_argument("params", nargs="*", help="Fetch parameters as name=value (query=..., days=30, ...)")
+    parser.add_argument("--max-pages", type=int, default=None, help="Stop after this many pages (resume later)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start over")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    init_db()
+    result = backfill(args.source, dict(_param(p) for p in args.params), args.max_pages, args.restart)
+    wait_for_transcripts()
+    flush_writes()
+    return 0 if result["status"] != "error" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
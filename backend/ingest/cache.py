@@ -0,0 +1,178 @@
+import logging
+import os
+import json
+import time
+import inspect
+import threading
+import functools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.db import get_conn, read_conn
+from backend.metrics import timed
+
+log = logging.getLogger(__name__)
+
+# Seconds a cached upstream response counts as fresh, per source. Override
+# with INSIGHTLENS_CACHE_TTL_<SOURCE>, e.g. INSIGHTLENS_CACHE_TTL_NEWSAPI=3600.
+DEFAULT_TTLS = {
+    "newsapi": 900,          # free tier is 100 req/day, keep it the longest
+    "gdelt": 300,
+    "google_rss": 300,
+    "reddit": 120,
+    "youtube_trending": 1800,
+    "youtube_search": 1800,
+}
+# After the TTL, a stale entry is still served for this long while a
+# background refresh fetches a new one (stale-while-revalidate).
+STALE_WINDOW_S = float(os.getenv("INSIGHTLENS_CACHE_STALE_S", "600"))
+MAX_ENTRIES = int(os.getenv("INSIGHTLENS_CACHE_MAX_ENTRIES", "512"))
+PERSIST = os.getenv("INSIGHTLENS_CACHE_PERSIST", "0") == "1"
+ENABLED = os.getenv("INSIGHTLENS_CACHE", "1") == "1"
+
+def ttl_for(source: str) -> float:
+    return float(os.getenv(f"INSIGHTLENS_CACHE_TTL_{source.upper()}", DEFAULT_TTLS.get(source, 300)))
+
+
+class SourceCache:
+    """
+    In-memory LRU of upstream responses, optionally backed by the
+    source_cache table so entries survive restarts.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, persist: bool = PERSIST):
+        self.max_entries = max_entries
+        self.persist = persist
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """Return (value, stored_at) or None."""
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None:
+                self._entries.move_to_end(key)
+                return hit
+        if self.persist:
+            hit = self._load(key)
+            if hit is not None:
+                self._remember(key, hit)
+            return hit
+        return None
+
+    def set(self, key: str, source: str, value):
+        entry = (value, time.time())
+        self._remember(key, entry)
+        if self.persist:
+            self._store(key, source, entry)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key: str, entry: tuple):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _load(self, key: str):
+        try:
+            with read_conn() as conn:
+                row = conn.execute("SELECT value, stored_at FROM source_cache WHERE key = ?", (key,)).fetchone()
+        except Exception as e:
+            log.warning(f"⚠️ Source cache read failed: {e}")
+            return None
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def _store(self, key: str, source: str, entry: tuple):
+        try:
+            conn = get_conn()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO source_cache (key, source, value, stored_at) VALUES (?, ?, ?, ?)",
+                    (key, source, json.dumps(entry[0]), entry[1]),
+                )
+            conn.close()
+        except Exception as e:
+            log.warning(f"⚠️ Source cache write failed: {e}")
+
+
+source_cache = SourceCache()
+_refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    return value
+
+def cache_key(source: str, params: dict) -> str:
+    normalized = {k: _normalize(v) for k, v in sorted(params.items())}
+    return f"{source}:{json.dumps(normalized, sort_keys=True, default=str)}"
+
+
+def _refresh(key: str, source: str, fn, kwargs: dict):
+    try:
+        value = fn(**kwargs)
+        if value:
+            source_cache.set(key, source, value)
+    except Exception as e:
+        log.warning(f"⚠️ Background refresh for {source} failed: {e}")
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(key)
+
+
+def cached_source(source: str):
+    """
+    Cache a fetch_* function's result keyed by (source, normalized params).
+    Empty results (missing API keys, nothing new) are never cached, and a
+    fetch that raises propagates to the caller.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def fetch(*args, **kwargs):
+            # Upstream fetch time per source; cache hits never get here
+            with timed("fetch", source=source):
+                return fn(*args, **kwargs)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fetch(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = dict(bound.arguments)
+            key = cache_key(source, params)
+            ttl = ttl_for(source)
+
+            hit = source_cache.get(key)
+            if hit is not None:
+                value, stored_at = hit
+                age = time.time() - stored_at
+                if age < ttl:
+                    log.debug(f"⚡ {source}: cache hit ({age:.0f}s old)")
+                    return value
+                if age < ttl + STALE_WINDOW_S:
+                    with _refreshing_lock:
+                        start = key not in _refreshing
+                        _refreshing.add(key)
+                    if start:
+                        _refresher.submit(_refresh, key, source, fetch, params)
+                    log.debug(f"⚡ {source}: serving stale cache ({age:.0f}s old), refreshing")
+                    return value
+
+            value = fetch(**params)
+            if value:
+                source_cache.set(key, source, value)
+            return value
+
+        wrapper.uncached = fetch
+        return wrapper
+    return decorator
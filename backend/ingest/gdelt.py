@@ -1,52 +1,110 @@
+import logging
 import time
-import requests
-from requests.exceptions import RequestException
-import time
+import calendar
+
+from backend.db import save_insight, get_source_state, set_source_state
+from backend.ingest.cache import cached_source
+from backend.ingest.http_client import http_get
+
+log = logging.getLogger(__name__)
+
+# The DOC API only accepts startdatetime within the last three months
+GDELT_WINDOW_S = 90 * 24 * 3600
+# Most records the DOC API returns per request
+GDELT_MAX_RECORDS = 250
+# Narrowest time slice a backfill splits a full window down to
+GDELT_MIN_SLICE_S = 900
+
+def _within_window(seendate: str) -> bool:
+    try:
+        return time.time() - calendar.timegm(time.strptime(seendate, "%Y%m%dT%H%M%SZ")) < GDELT_WINDOW_S
+    except ValueError:
+        return False
 
-from backend.db import save_insight
+def _gdelt_time(epoch: int) -> str:
+    return time.strftime("%Y%m%d%H%M%S", time.gmtime(epoch))
 
+def article_insight(art: dict) -> dict:
+    return {
+        "source": "gdelt",
+        "title": art.get("title", ""),
+        "url": art.get("url", ""),
+        "content": art.get("seendate", "") + " | " + (art.get("language", "") or ""),
+        "published_at": art.get("seendate", ""),
+    }
+
+@cached_source("gdelt")
 def fetch_gdelt(query: str = "market OR finance OR technology", max_records: int = 10):
     """
     GDELT 2.0 DOC API returns news documents with rich metadata.
     Reference:
       https://blog.gdeltproject.org/gdelt-doc-2-0-api-debuts/
+    Only asks for documents seen after the newest one stored for this query.
+    """
+    high_water = get_source_state("gdelt", query).get("high_water") or ""
+    try:
+        url = "https://api.gdeltproject.org/api/v2/doc/doc"
+        params = {
+            "query": query,
+            "format": "json",
+            "maxrecords": max_records,
+            "sort": "DateDesc",
+        }
+        if high_water and _within_window(high_water):
+            # seendate looks like 20240101T120000Z, startdatetime wants 20240101120000
+            params["startdatetime"] = high_water.replace("T", "").replace("Z", "")
+        # 429s are retried with backoff by the shared client
+        r = http_get(url, params=params, timeout=30)
+        r.raise_for_status()
+        data = r.json()
+        articles = data.get("articles", [])
+        insights = []
+        newest = high_water
+        for art in articles:
+            seendate = art.get("seendate", "")
+            if seendate and seendate <= high_water:
+                break  # sorted DateDesc, everything after this is already stored
+            newest = max(newest, seendate)
+            insight = article_insight(art)
+            save_insight(**insight)
+            insights.append(insight)
+        set_source_state("gdelt", query, high_water=newest or None)
+        log.info(f"✅ GDELT: stored {len(insights)} new items.", extra={"source": "gdelt", "count": len(insights)})
+        return insights
+    except Exception as e:
+        log.error(f"❌ GDELT error: {e}")
+        raise
+
+def gdelt_pages(query: str, days: float = 90, window_hours: float = 6, cursor: int = None):
+    """
+    Walk back from now (or from `cursor`, an epoch second) to `days` ago in
+    startdatetime/enddatetime slices of up to `window_hours`. A slice that
+    comes back full (GDELT_MAX_RECORDS) is split in half and asked again,
+    so busy hours aren't truncated. Yields (insights, end of the next
+    slice), None once the start is reached.
     """
-    retries = 3
-    delay = 1  # seconds
-    for i in range(retries):
-        try:
-            url = "https://api.gdeltproject.org/api/v2/doc/doc"
-            params = {
-                "query": query,
-                "format": "json",
-                "maxrecords": max_records,
-                "sort": "DateDesc",
-            }
-            r = requests.get(url, params=params, timeout=30)
-            r.raise_for_status()
-            data = r.json()
-            articles = data.get("articles", [])
-            insights = []
-            for art in articles:
-                insight = {
-                    "source": "gdelt",
-                    "title": art.get("title", ""),
-                    "url": art.get("url", ""),
-                    "content": art.get("seendate", "") + " | " + (art.get("language", "") or ""),
-                    "published_at": art.get("seendate", ""),
-                }
-                save_insight(**insight)
-                insights.append(insight)
-            print(f"✅ GDELT: stored {len(insights)} items.")
-            return insights # Success, exit the function
-        except RequestException as e:
-            if r.status_code == 429 and i < retries - 1:
-                print(f"⚠️ GDELT rate limit hit. Retrying in {delay} seconds...")
-                time.sleep(delay)
-                delay *= 2  # Exponential backoff
-            else:
-                print(f"❌ GDELT error: {e}")
-                return [] # Non-retryable error or last retry failed
-        except Exception as e:
-            print(f"❌ GDELT error: {e}")
-            return [] # Catch any other unexpected errors
+    oldest = int(time.time() - min(days * 86400, GDELT_WINDOW_S))
+    end = int(cursor or time.time())
+    window_s = int(window_hours * 3600)
+    span = window_s
+    while end > oldest:
+        begin = max(oldest, end - span)
+        params = {
+            "query": query,
+            "format": "json",
+            "maxrecords": GDELT_MAX_RECORDS,
+            "sort": "DateDesc",
+            "startdatetime": _gdelt_time(begin),
+            "enddatetime": _gdelt_time(end),
+        }
+        r = http_get("https://api.gdeltproject.org/api/v2/doc/doc", params=params, timeout=30)
+        r.raise_for_status()
+        # An empty window comes back as an empty body rather than JSON
+        articles = r.json().get("articles", []) if r.content.strip() else []
+        if len(articles) >= GDELT_MAX_RECORDS and span > GDELT_MIN_SLICE_S:
+            span = max(GDELT_MIN_SLICE_S, span // 2)
+            continue
+        end = begin
+        yield [article_insight(art) for art in articles], end if end > oldest else None
+        # Quiet stretch: widen back towards the configured window
+        span = min(window_s, span * 2)
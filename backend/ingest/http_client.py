@@ -0,0 +1,191 @@
+import logging
+import os
+import time
+import random
+import threading
+import contextvars
+import urllib.parse
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from backend.metrics import UPSTREAM_RESPONSES
+
+log = logging.getLogger(__name__)
+
+HEADERS = {"User-Agent": "InsightLens/0.1 (+https://example.com)"}
+
+# Per-host token buckets: (requests per second, burst)
+HOST_LIMITS = {
+    "newsapi.org": (1.0, 2),
+    "www.reddit.com": (0.5, 3),                # unauthenticated JSON, ~30/min
+    "api.gdeltproject.org": (0.2, 1),          # GDELT asks for one request every 5 s
+    "www.googleapis.com": (5.0, 10),           # YouTube Data API, quota bound
+    "news.google.com": (1.0, 3),
+}
+DEFAULT_LIMIT = (2.0, 4)
+MAX_CONCURRENCY = int(os.getenv("INSIGHTLENS_HTTP_CONCURRENCY", "8"))
+MAX_RETRIES = int(os.getenv("INSIGHTLENS_HTTP_RETRIES", "3"))
+BACKOFF_BASE_S = float(os.getenv("INSIGHTLENS_HTTP_BACKOFF_S", "1.0"))
+BACKOFF_MAX_S = float(os.getenv("INSIGHTLENS_HTTP_BACKOFF_MAX_S", "30"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Point upstream hosts elsewhere, e.g. at the local stubs in bench/:
+# "newsapi.org=http://127.0.0.1:8900,www.reddit.com=http://127.0.0.1:8900"
+UPSTREAM_OVERRIDES = dict(
+    item.strip().split("=", 1)
+    for item in os.getenv("INSIGHTLENS_UPSTREAM_OVERRIDES", "").split(",")
+    if "=" in item
+)
+
+
+# time.monotonic() by which the current fetch must be done; see deadline()
+_deadline = contextvars.ContextVar("http_deadline", default=None)
+
+
+class DeadlineExceeded(requests.Timeout):
+    """The caller's deadline passed before the request could be (re)sent."""
+
+
+@contextmanager
+def deadline(at: float):
+    """
+    Bound every http_get() in the block by the time.monotonic() `at`: no
+    request, retry or rate-limit wait runs past it. /search fetches run under
+    their request budget this way, so a fetch that misses the budget stops
+    instead of retrying in the background.
+    """
+    token = _deadline.set(at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def _remaining():
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+class TokenBucket:
+    """Blocking token bucket: acquire() waits until a request may be sent."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, until: float = None) -> bool:
+        """Take a token, waiting at most until the time.monotonic() `until`; False if that passed first."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait_s = (1 - self.tokens) / self.rate
+            if until is not None and now + wait_s > until:
+                return False
+            time.sleep(wait_s)
+
+
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=MAX_CONCURRENCY)
+_session.mount("https://", _adapter)
+_session.mount("http://", _adapter)
+_session.headers.update(HEADERS)
+
+_concurrency = threading.BoundedSemaphore(MAX_CONCURRENCY)
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def _bucket_for(host: str) -> TokenBucket:
+    with _buckets_lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            bucket = _buckets[host] = TokenBucket(*HOST_LIMITS.get(host, DEFAULT_LIMIT))
+        return bucket
+
+
+def _retry_after(response) -> float:
+    """Seconds requested by a Retry-After header (delta or HTTP date), or None."""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(attempt: int, response=None) -> float:
+    delay = _retry_after(response)
+    if delay is None:
+        # Exponential backoff with full jitter
+        delay = random.uniform(0, BACKOFF_BASE_S * 2 ** attempt)
+    return min(delay, BACKOFF_MAX_S)
+
+
+def http_get(url: str, params: dict = None, headers: dict = None, timeout: float = 20, retries: int = MAX_RETRIES):
+    """
+    GET through the shared pooled session, respecting the host's rate limit
+    and the global concurrency cap. 429/5xx responses and connection errors
+    are retried with Retry-After-aware exponential backoff; the last response
+    is returned (callers still call raise_for_status), the last connection
+    error is raised. Under a deadline() the timeout shrinks to the time left
+    and retries stop once their backoff would run past it (DeadlineExceeded
+    when there is no response to return).
+    """
+    parts = urllib.parse.urlsplit(url)
+    host = parts.netloc
+    if parts.netloc in UPSTREAM_OVERRIDES:
+        base = urllib.parse.urlsplit(UPSTREAM_OVERRIDES[parts.netloc])
+        url = urllib.parse.urlunsplit((base.scheme, base.netloc, parts.path, parts.query, parts.fragment))
+    bucket = _bucket_for(urllib.parse.urlsplit(url).netloc)
+    until = _deadline.get()
+    for attempt in range(retries + 1):
+        if not bucket.acquire(until):
+            raise DeadlineExceeded(f"{url}: deadline passed waiting for the {host} rate limit")
+        remaining = _remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded(f"{url}: deadline passed")
+        response = None
+        try:
+            with _concurrency:
+                response = _session.get(
+                    url, params=params, headers=headers,
+                    timeout=timeout if remaining is None else min(timeout, remaining),
+                )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            UPSTREAM_RESPONSES.inc(host=host, status=e.__class__.__name__)
+            delay = _backoff(attempt)
+            if attempt == retries or _past_deadline(delay):
+                raise
+            log.warning(f"⚠️ {url}: {e.__class__.__name__}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+        UPSTREAM_RESPONSES.inc(host=host, status=response.status_code)
+        if response.status_code not in RETRY_STATUSES or attempt == retries:
+            return response
+        delay = _backoff(attempt, response)
+        if _past_deadline(delay):
+            return response
+        log.warning(f"⚠️ {url}: HTTP {response.status_code}, retrying in {delay:.1f}s")
+        time.sleep(delay)
+    return response
+
+
+def _past_deadline(delay: float) -> bool:
+    """Would sleeping `delay` seconds leave no time for another attempt?"""
+    remaining = _remaining()
+    return remaining is not None and delay >= remaining
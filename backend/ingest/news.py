@@ -1,23 +1,40 @@
+import logging
 import os
-import requests
 from typing import Optional
-from backend.db import save_insight
+from backend.db import save_insight, get_source_state, set_source_state
+from backend.ingest.cache import cached_source
+from backend.ingest.http_client import http_get
 from dotenv import load_dotenv
 
+log = logging.getLogger(__name__)
+
 load_dotenv()
 
 NEWS_API_KEY: Optional[str] = os.getenv("NEWS_API_KEY")
 
+def article_insight(art: dict) -> dict:
+    return {
+        "source": "newsapi",
+        "title": art.get("title") or "",
+        "url": art.get("url") or "",
+        "content": art.get("description") or (art.get("content") or ""),
+        "published_at": art.get("publishedAt") or "",
+    }
+
+@cached_source("newsapi")
 def fetch_newsapi(query: str = None, language: str = "en", page_size: int = 10):
     """
     Fetch recent headlines from NewsAPI (free tier: 100 req/day).
     If query is None, use top-headlines; else use 'everything'.
+    Queries only ask for articles newer than the last one stored for them.
     """
     if not NEWS_API_KEY:
-        print("⚠️ NEWS_API_KEY not set; skipping NewsAPI.")
+        log.warning("⚠️ NEWS_API_KEY not set; skipping NewsAPI.")
         return
 
     try:
+        state_key = f"{query or 'top-headlines'}|{language}"
+        high_water = get_source_state("newsapi", state_key).get("high_water") or ""
         if query:
             url = "https://newsapi.org/v2/everything"
             params = {
@@ -27,6 +44,8 @@ def fetch_newsapi(query: str = None, language: str = "en", page_size: int = 10):
                 "sortBy": "publishedAt",
                 "apiKey": NEWS_API_KEY,
             }
+            if high_water:
+                params["from"] = high_water
         else:
             url = "https://newsapi.org/v2/top-headlines"
             params = {
@@ -35,23 +54,59 @@ def fetch_newsapi(query: str = None, language: str = "en", page_size: int = 10):
                 "apiKey": NEWS_API_KEY,
             }
 
-        r = requests.get(url, params=params, timeout=20)
+        r = http_get(url, params=params, timeout=20)
         r.raise_for_status()
         data = r.json()
 
         insights = []
+        newest = high_water
         for art in data.get("articles", []):
-            insight = {
-                "source": "newsapi",
-                "title": art.get("title") or "",
-                "url": art.get("url") or "",
-                "content": art.get("description") or (art.get("content") or ""),
-                "published_at": art.get("publishedAt") or "",
-            }
+            published_at = art.get("publishedAt") or ""
+            if published_at and published_at <= high_water:
+                if query:
+                    break  # 'everything' is sorted by publishedAt, the rest is older still
+                continue
+            newest = max(newest, published_at)
+            insight = article_insight(art)
             save_insight(**insight)
             insights.append(insight)
-        print(f"✅ NewsAPI: stored {len(insights)} items.")
+        set_source_state("newsapi", state_key, high_water=newest or None)
+        log.info(f"✅ NewsAPI: stored {len(insights)} new items.", extra={"source": "newsapi", "count": len(insights)})
         return insights
     except Exception as e:
-        print(f"❌ NewsAPI error: {e}")
-        return []
+        log.error(f"❌ NewsAPI error: {e}")
+        raise
+
+def newsapi_pages(query: str, language: str = "en", page_size: int = 100,
+                  start: Optional[str] = None, end: Optional[str] = None, cursor: int = None):
+    """
+    Walk /v2/everything for `query` (optionally between ISO dates `start`
+    and `end`) with the `page` parameter. Yields (insights, next page); the
+    page is None once totalResults is covered. The free tier refuses pages
+    past the first 100 results.
+    """
+    if not NEWS_API_KEY:
+        raise RuntimeError("NEWS_API_KEY not set")
+    page = cursor or 1
+    while True:
+        params = {
+            "q": query,
+            "language": language,
+            "pageSize": page_size,
+            "page": page,
+            "sortBy": "publishedAt",
+            "apiKey": NEWS_API_KEY,
+        }
+        if start:
+            params["from"] = start
+        if end:
+            params["to"] = end
+        r = http_get("https://newsapi.org/v2/everything", params=params, timeout=20)
+        r.raise_for_status()
+        data = r.json()
+        articles = data.get("articles", [])
+        more = bool(articles) and page * page_size < data.get("totalResults", 0)
+        yield [article_insight(art) for art in articles], page + 1 if more else None
+        if not more:
+            return
+        page += 1
@@ -1,40 +1,86 @@
+import logging
 import time
-import requests
-import time
-from backend.db import save_insight
+from backend.db import save_insight, get_source_state, set_source_state, existing_urls
+from backend.ingest.cache import cached_source
+from backend.ingest.http_client import http_get
+
+log = logging.getLogger(__name__)
+
+def _listing_url(subreddit: str, sort: str) -> str:
+    return f"https://www.reddit.com/r/{subreddit}/{sort}.json"
+
+def _post_url(post: dict) -> str:
+    return "https://reddit.com" + post.get("permalink", "")
 
-HEADERS = {"User-Agent": "InsightLens/0.1 (+https://example.com)"}
+def post_insight(post: dict) -> dict:
+    """Insight dict for one post of a listing's children[].data."""
+    created_utc = post.get("created_utc")
+    return {
+        "source": "reddit",
+        "title": post.get("title", ""),
+        "url": _post_url(post),
+        "content": post.get("selftext", ""),
+        "published_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(created_utc)) if created_utc else "",
+    }
 
+@cached_source("reddit")
 def fetch_reddit(subreddit: str = "worldnews", sort: str = "hot", limit: int = 10):
     """
     Uses public Reddit JSON endpoints (no OAuth) with a custom User-Agent.
     Rate limits apply; suitable for light MVP usage.
+    Posts already stored are skipped: /new stops at the newest post seen
+    last time, other listings aren't chronological and check by URL.
     """
     try:
-        url = f"https://www.reddit.com/r/{subreddit}/{sort}.json"
+        state_key = f"{subreddit}/{sort}"
+        high_water = float(get_source_state("reddit", state_key).get("high_water") or 0)
+        url = _listing_url(subreddit, sort)
         params = {"limit": limit}
-        r = requests.get(url, headers=HEADERS, params=params, timeout=20)
+        r = http_get(url, params=params, timeout=20)
         r.raise_for_status()
         data = r.json()
         posts = data.get("data", {}).get("children", [])
+        seen = set() if sort == "new" else existing_urls(
+            [_post_url(post.get("data", {})) for post in posts]
+        )
         count = 0
+        insights = []
+        newest = high_water
         for post in posts:
             p = post.get("data", {})
             created_utc = p.get("created_utc")
-            published_iso = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(created_utc)) if created_utc else ""
-            insights = []
-            insight = {
-                "source": "reddit",
-                "title": p.get("title", ""),
-                "url": ("https://reddit.com" + p.get("permalink", "")),
-                "content": p.get("selftext", ""),
-                "published_at": published_iso,
-            }
+            if sort == "new" and created_utc and created_utc <= high_water:
+                break  # the /new listing is chronological, the rest is older still
+            if _post_url(p) in seen:
+                continue
+            newest = max(newest, created_utc or 0)
+            insight = post_insight(p)
             save_insight(**insight)
             insights.append(insight)
             count += 1
-        print(f"✅ Reddit: stored {count} items from r/{subreddit}.")
+        set_source_state("reddit", state_key, high_water=str(newest) if newest else None)
+        log.info(f"✅ Reddit: stored {count} new items from r/{subreddit}.", extra={"source": "reddit", "count": count})
         return insights
     except Exception as e:
-        print(f"❌ Reddit error: {e}")
-        return []
+        log.error(f"❌ Reddit error: {e}")
+        raise
+
+def reddit_pages(subreddit: str, sort: str = "new", limit: int = 100, cursor: str = None):
+    """
+    Walk a listing page by page with Reddit's `after` token. Yields
+    (insights, next cursor); the cursor is None on the last page. Reddit
+    stops listings at about 1000 posts.
+    """
+    after = cursor
+    while True:
+        params = {"limit": min(limit, 100)}
+        if after:
+            params["after"] = after
+        r = http_get(_listing_url(subreddit, sort), params=params, timeout=20)
+        r.raise_for_status()
+        data = r.json().get("data", {})
+        posts = [child.get("data", {}) for child in data.get("children", [])]
+        after = data.get("after") if posts else None
+        yield [post_insight(p) for p in posts], after
+        if not after:
+            return
@@ -1,13 +1,20 @@
+import logging
 import time
 import feedparser
 import urllib.parse
-import time
-from backend.db import save_insight
+from backend.db import save_insight, get_source_state, set_source_state, existing_urls
+from backend.ingest.cache import cached_source
+from backend.ingest.http_client import http_get
+
+log = logging.getLogger(__name__)
 
+@cached_source("google_rss")
 def fetch_google_news_rss(topic: str = None, region: str = "IN:en", max_items: int = 10):
     """
     Fetch Google News RSS (free, no key). Topic optional.
     region is 'IN:en' for India-English feed by default.
+    Sends the stored ETag / Last-Modified so an unchanged feed costs a 304,
+    and skips entries that are already stored.
     """
     try:
         base = "https://news.google.com/rss"
@@ -19,11 +26,30 @@ def fetch_google_news_rss(topic: str = None, region: str = "IN:en", max_items: i
             # top headlines for region
             url = f"{base}?hl=en-IN&gl=IN&ceid={region}"
 
-        feed = feedparser.parse(url)
-        count = 0
-        for entry in feed.entries[:max_items]:
+        state = get_source_state("google_rss", url)
+        headers = {}
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+        r = http_get(url, headers=headers, timeout=20)
+        if r.status_code == 304:
+            log.info("✅ Google RSS: feed unchanged since last fetch.")
+            return []
+        r.raise_for_status()
+        feed = feedparser.parse(r.content)
+
+        entries = feed.entries[:max_items]
+        # Feeds are ordered by relevance, not date, so check what's seen by URL
+        seen = existing_urls([entry.get("link", "") for entry in entries])
+        newest = state.get("high_water") or ""
+        insights = []
+        for entry in entries:
+            if entry.get("link", "") in seen:
+                continue
             published_struct = entry.get("published_parsed")
             published_iso = time.strftime("%Y-%m-%dT%H:%M:%SZ", published_struct) if published_struct else ""
+            newest = max(newest, published_iso)
             insight = {
                 "source": "google_rss",
                 "title": entry.get("title", ""),
@@ -33,9 +59,15 @@ def fetch_google_news_rss(topic: str = None, region: str = "IN:en", max_items: i
             }
             save_insight(**insight)
             insights.append(insight)
-            count += 1
-        print(f"✅ Google RSS: stored {count} items.")
+
+        set_source_state(
+            "google_rss", url,
+            etag=r.headers.get("ETag"),
+            last_modified=r.headers.get("Last-Modified"),
+            high_water=newest or None,
+        )
+        log.info(f"✅ Google RSS: stored {len(insights)} new items.", extra={"source": "google_rss", "count": len(insights)})
         return insights
     except Exception as e:
-        print(f"❌ Google RSS error: {e}")
-        return []
+        log.error(f"❌ Google RSS error: {e}")
+        raise
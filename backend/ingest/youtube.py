@@ -1,19 +1,146 @@
-import requests
+import logging
 import os
+import json
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import Optional
-import requests
 from dotenv import load_dotenv
 from youtube_transcript_api import YouTubeTranscriptApi, NoTranscriptFound, TranscriptsDisabled
-from backend.db import save_insight
+from backend.db import (
+    get_conn, read_conn, save_insight, update_insight_content, get_source_state, set_source_state, existing_urls,
+)
+from backend.ingest.cache import cached_source
+from backend.ingest.http_client import http_get
+
+log = logging.getLogger(__name__)
 
 load_dotenv()
 
 YOUTUBE_API_KEY: Optional[str] = os.getenv("YOUTUBE_API_KEY")
 
+# Set to 0 to store descriptions only and never download transcripts
+TRANSCRIPTS_ENABLED = os.getenv("INSIGHTLENS_TRANSCRIPTS", "1") == "1"
+TRANSCRIPT_WORKERS = int(os.getenv("INSIGHTLENS_TRANSCRIPT_WORKERS", "4"))
+# How long "no transcript" / "disabled" answers are trusted before asking again
+TRANSCRIPT_NEGATIVE_TTL_S = float(os.getenv("INSIGHTLENS_TRANSCRIPT_NEGATIVE_TTL_S", str(24 * 3600)))
+TRANSCRIPT_ERROR_TTL_S = float(os.getenv("INSIGHTLENS_TRANSCRIPT_ERROR_TTL_S", "3600"))
+
+_transcript_pool = ThreadPoolExecutor(max_workers=TRANSCRIPT_WORKERS, thread_name_prefix="transcript")
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def video_url(video_id: str) -> str:
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+# -------------------------------
+# Transcript stage
+# -------------------------------
+def cached_transcripts(video_ids: list) -> dict:
+    """{video_id: transcript or None} for videos with a usable cache entry."""
+    if not video_ids:
+        return {}
+    with read_conn() as conn:
+        rows = conn.execute(
+            "SELECT video_id, status, transcript, fetched_at FROM transcript_cache"
+            " WHERE video_id IN (SELECT value FROM json_each(?))",
+            (json.dumps(video_ids),),
+        ).fetchall()
+    now = time.time()
+    ttls = {"none": TRANSCRIPT_NEGATIVE_TTL_S, "disabled": TRANSCRIPT_NEGATIVE_TTL_S, "error": TRANSCRIPT_ERROR_TTL_S}
+    cached = {}
+    for video_id, status, transcript, fetched_at in rows:
+        if status == "ok":
+            cached[video_id] = transcript
+        elif now - fetched_at < ttls.get(status, 0):
+            cached[video_id] = None
+    return cached
+
+def _store_transcript(video_id: str, status: str, transcript: Optional[str]):
+    conn = get_conn()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO transcript_cache (video_id, status, transcript, fetched_at) VALUES (?, ?, ?, ?)",
+            (video_id, status, transcript, time.time()),
+        )
+    conn.close()
+
+def _fetch_transcript(video_id: str):
+    """Download the English transcript; returns (status, text)."""
+    try:
+        transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
+        transcript = transcript_list.find_transcript(['en'])
+        return "ok", " ".join([t['text'] for t in transcript.fetch()])
+    except NoTranscriptFound:
+        log.debug(f"No English transcript found for video {video_id}")
+        return "none", None
+    except TranscriptsDisabled:
+        log.debug(f"Transcripts are disabled for video {video_id}")
+        return "disabled", None
+    except Exception as e:
+        log.warning(f"Error fetching transcript for video {video_id}: {e}")
+        return "error", None
+
+def _enrich(source: str, video_id: str):
+    try:
+        status, transcript = _fetch_transcript(video_id)
+        _store_transcript(video_id, status, transcript)
+        if transcript:
+            update_insight_content(source, video_url(video_id), transcript)
+    finally:
+        with _pending_lock:
+            _pending.pop((source, video_id), None)
+
+def enrich_transcripts(source: str, video_ids: list):
+    """Fetch missing transcripts on the pool; each one updates the insight stored from `source` when done."""
+    with _pending_lock:
+        for video_id in video_ids:
+            if (source, video_id) not in _pending:
+                _pending[(source, video_id)] = _transcript_pool.submit(_enrich, source, video_id)
+
+def wait_for_transcripts(timeout: float = None):
+    """Block until queued transcript downloads have finished (e.g. before a CLI run exits)."""
+    with _pending_lock:
+        futures = list(_pending.values())
+    wait(futures, timeout=timeout)
+
+
+def store_videos(source: str, videos: list) -> list:
+    """
+    Store video metadata right away, using cached transcripts where we have
+    them, and hand the rest to the transcript pool. `videos` holds
+    (video_id, snippet) pairs.
+    """
+    cached = cached_transcripts([video_id for video_id, _ in videos])
+    insights = []
+    missing = []
+    for video_id, sn in videos:
+        if video_id not in cached:
+            missing.append(video_id)
+        insight = {
+            "source": source,
+            "title": sn["title"],
+            "url": video_url(video_id),
+            "content": cached.get(video_id) or sn.get("description", ""),
+            "published_at": sn["publishedAt"],
+        }
+        save_insight(**insight)
+        insights.append(insight)
+    if TRANSCRIPTS_ENABLED:
+        enrich_transcripts(source, missing)
+    return insights
+
+@cached_source("youtube_trending")
 def fetch_youtube_trending(region_code: str = "US", max_results: int = 10):
+    """
+    Most popular videos for a region. Videos already stored are skipped;
+    new ones are stored with their description straight away and get their
+    transcript asynchronously.
+    """
     if not YOUTUBE_API_KEY:
-        print("⚠️ YOUTUBE_API_KEY not set; skipping YouTube.")
+        log.warning("⚠️ YOUTUBE_API_KEY not set; skipping YouTube.")
         return
     try:
         url = "https://www.googleapis.com/youtube/v3/videos"
@@ -24,45 +151,32 @@ def fetch_youtube_trending(region_code: str = "US", max_results: int = 10):
             "maxResults": max_results,
             "key": YOUTUBE_API_KEY,
         }
-        r = requests.get(url, params=params, timeout=20)
+        r = http_get(url, params=params, timeout=20)
         r.raise_for_status()
         data = r.json()
         items = data.get("items", [])
-        for it in items:
-            sn = it.get("snippet", {})
-            video_id = it.get("id", "")
-            content = sn.get("description", "")
-            try:
-                transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
-                transcript = transcript_list.find_transcript(['en'])
-                content = " ".join([t['text'] for t in transcript.fetch()])
-            except NoTranscriptFound:
-                print(f"No English transcript found for video {video_id}")
-            except TranscriptsDisabled:
-                print(f"Transcripts are disabled for video {video_id}")
-            except Exception as e:
-                print(f"Error fetching transcript for video {video_id}: {e}")
-
-            insight = {
-                "source": "youtube_trending",
-                "title": sn["title"],
-                "url": f"https://www.youtube.com/watch?v={video_id}",
-                "content": content,
-                "published_at": sn["publishedAt"],
-            }
-            save_insight(**insight)
-            insights.append(insight)
-        print(f"✅ YouTube: stored {len(insights)} trending items.")
+        seen = existing_urls([video_url(it.get("id", "")) for it in items])
+        videos = [(it.get("id", ""), it.get("snippet", {})) for it in items]
+        insights = store_videos("youtube_trending", [
+            (video_id, sn) for video_id, sn in videos if video_id and video_url(video_id) not in seen
+        ])
+        log.info(f"✅ YouTube: stored {len(insights)} new trending items.", extra={"source": "youtube_trending", "count": len(insights)})
         return insights
     except Exception as e:
-        print(f"❌ YouTube error: {e}")
-        return []
+        log.error(f"❌ YouTube error: {e}")
+        raise
 
+@cached_source("youtube_search")
 def fetch_youtube_search(query: str, max_results: int = 10):
+    """
+    Video search. Only asks for videos published after the newest one stored
+    for this query and skips stored videos. Transcripts arrive asynchronously.
+    """
     if not YOUTUBE_API_KEY:
-        print("⚠️ YOUTUBE_API_KEY not set; skipping YouTube search.")
+        log.warning("⚠️ YOUTUBE_API_KEY not set; skipping YouTube search.")
         return
     try:
+        high_water = get_source_state("youtube_search", query).get("high_water") or ""
         url = "https://www.googleapis.com/youtube/v3/search"
         params = {
             "part": "snippet",
@@ -71,37 +185,55 @@ def fetch_youtube_search(query: str, max_results: int = 10):
             "maxResults": max_results,
             "key": YOUTUBE_API_KEY,
         }
-        r = requests.get(url, params=params, timeout=20)
+        if high_water:
+            params["publishedAfter"] = high_water
+        r = http_get(url, params=params, timeout=20)
         r.raise_for_status()
         data = r.json()
         items = data.get("items", [])
-        for it in items:
-            sn = it.get("snippet", {})
-            video_id = it.get("id", {}).get("videoId", "")
-            if video_id:
-                content = sn.get("description", "")
-            try:
-                transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
-                transcript = transcript_list.find_transcript(['en'])
-                content = " ".join([t['text'] for t in transcript.fetch()])
-            except NoTranscriptFound:
-                print(f"No English transcript found for video {video_id}")
-            except TranscriptsDisabled:
-                print(f"Transcripts are disabled for video {20} {video_id}")
-            except Exception as e:
-                print(f"Error fetching transcript for video {video_id}: {e}")
-
-            insight = {
-                "source": "youtube_search",
-                "title": sn["title"],
-                "url": f"https://www.youtube.com/watch?v={video_id}",
-                "content": content,
-                "published_at": sn["publishedAt"],
-            }
-            save_insight(**insight)
-            insights.append(insight)
-        print(f"✅ YouTube: stored {len(insights)} search results for '{query}'.")
+        videos = [(it.get("id", {}).get("videoId", ""), it.get("snippet", {})) for it in items]
+        seen = existing_urls([video_url(video_id) for video_id, _ in videos])
+        videos = [(video_id, sn) for video_id, sn in videos if video_id and video_url(video_id) not in seen]
+        newest = max([high_water] + [sn.get("publishedAt", "") for _, sn in videos])
+        insights = store_videos("youtube_search", videos)
+        set_source_state("youtube_search", query, high_water=newest or None)
+        log.info(f"✅ YouTube: stored {len(insights)} new search results for '{query}'.", extra={"source": "youtube_search", "count": len(insights)})
         return insights
     except Exception as e:
-        print(f"❌ YouTube search error: {e}")
-        return []
+        log.error(f"❌ YouTube search error: {e}")
+        raise
+
+def youtube_search_pages(query: str, max_results: int = 50, published_after: Optional[str] = None,
+                         published_before: Optional[str] = None, cursor: str = None):
+    """
+    Walk search results for `query` with nextPageToken. Yields
+    ((video_id, snippet) pairs, next token); None on the last page. The
+    API stops after about 500 results per query, narrow the dates for more.
+    """
+    if not YOUTUBE_API_KEY:
+        raise RuntimeError("YOUTUBE_API_KEY not set")
+    token = cursor
+    while True:
+        params = {
+            "part": "snippet",
+            "q": query,
+            "type": "video",
+            "order": "date",
+            "maxResults": min(max_results, 50),
+            "key": YOUTUBE_API_KEY,
+        }
+        if token:
+            params["pageToken"] = token
+        if published_after:
+            params["publishedAfter"] = published_after
+        if published_before:
+            params["publishedBefore"] = published_before
+        r = http_get("https://www.googleapis.com/youtube/v3/search", params=params, timeout=20)
+        r.raise_for_status()
+        data = r.json()
+        items = data.get("items", [])
+        videos = [(it.get("id", {}).get("videoId", ""), it.get("snippet", {})) for it in items]
+        token = data.get("nextPageToken") if items else None
+        yield [(video_id, sn) for video_id, sn in videos if video_id], token
+        if not token:
+            return
@@ -0,0 +1,244 @@
+# insightlens/backend/jobs.py
+
+import logging
+import os
+import json
+import time
+import uuid
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from .db import get_conn, read_conn, flush_writes
+from .metrics import SOURCE_ERRORS
+from .ingest.news import fetch_newsapi
+from .ingest.rss import fetch_google_news_rss
+from .ingest.reddit import fetch_reddit
+from .ingest.youtube import fetch_youtube_trending, fetch_youtube_search
+from .ingest.gdelt import fetch_gdelt
+
+log = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Default ingestion run: source name -> (fetcher, kwargs)
+INGEST_SOURCES = {
+    "google_rss": (fetch_google_news_rss, {"topic": None, "region": "IN:en", "max_items": 10}),
+    "newsapi": (fetch_newsapi, {"query": "SaaS OR startup OR AI", "language": "en", "page_size": 10}),
+    "reddit": (fetch_reddit, {"subreddit": "technology", "sort": "hot", "limit": 10}),
+    "youtube_trending": (fetch_youtube_trending, {"region_code": "US", "max_results": 10}),
+    "youtube_search": (fetch_youtube_search, {"query": "AI news", "max_results": 10}),
+    "gdelt": (fetch_gdelt, {"query": "SaaS OR startup OR technology OR finance", "max_records": 10}),
+}
+
+# Scheduler intervals in seconds, override with INSIGHTLENS_SCHEDULE_<SOURCE>_S
+DEFAULT_INTERVALS = {
+    "google_rss": 900,
+    "newsapi": 3600,          # 100 req/day on the free tier
+    "reddit": 600,
+    "youtube_trending": 3600,
+    "youtube_search": 3600,
+    "gdelt": 900,
+}
+SCHEDULE_JITTER = float(os.getenv("INSIGHTLENS_SCHEDULE_JITTER", "0.1"))
+JOB_WORKERS = int(os.getenv("INSIGHTLENS_JOB_WORKERS", "2"))
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="ingest-job")
+# Recent jobs kept in memory for live progress; older ones are read from the DB
+MAX_JOBS_IN_MEMORY = 200
+_jobs: Dict[str, dict] = {}
+_jobs_lock = threading.Lock()
+# One lock per source so two jobs never crawl the same source at once
+_source_locks = {name: threading.Lock() for name in INGEST_SOURCES}
+
+
+def _save_job(job: dict):
+    try:
+        conn = get_conn()
+        with conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO ingest_jobs (id, kind, status, sources, started_at, finished_at, duration_ms)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (job["id"], job["kind"], job["status"], json.dumps(job["sources"]),
+                  job["started_at"], job["finished_at"], job["duration_ms"]))
+        conn.close()
+    except Exception as e:
+        log.warning(f"⚠️ Could not record ingest job {job['id']}: {e}")
+
+
+def _load_job(job_id: str) -> Optional[dict]:
+    with read_conn() as conn:
+        row = conn.execute(
+            "SELECT id, kind, status, sources, started_at, finished_at, duration_ms FROM ingest_jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+    if not row:
+        return None
+    keys = ("id", "kind", "status", "sources", "started_at", "finished_at", "duration_ms")
+    job = dict(zip(keys, row))
+    job["sources"] = json.loads(job["sources"])
+    return job
+
+
+def _new_job(sources: List[str], kind: str) -> dict:
+    return {
+        "id": uuid.uuid4().hex,
+        "kind": kind,
+        "status": "queued",
+        "sources": {name: {"status": "pending", "count": 0, "elapsed_ms": None} for name in sources},
+        "started_at": None,
+        "finished_at": None,
+        "duration_ms": None,
+    }
+
+
+def _set(record: dict, **fields):
+    """Update a live job (or one of its per-source entries) under the lock get_job() snapshots with."""
+    with _jobs_lock:
+        record.update(fields)
+
+
+def _run_job(job: dict):
+    _set(job, status="running", started_at=time.time())
+    _save_job(job)
+
+    failed = False
+    for name, progress in job["sources"].items():
+        fn, kwargs = INGEST_SOURCES[name]
+        lock = _source_locks[name]
+        if not lock.acquire(blocking=False):
+            log.info(f"⏭️ {name}: already being ingested by another job, skipping")
+            _set(progress, status="skipped")
+            continue
+        _set(progress, status="running")
+        start = time.perf_counter()
+        try:
+            # Ingestion always goes upstream, bypassing the /search response cache.
+            # Fetchers raise on failure, so an upstream error shows up as "error" here
+            items = getattr(fn, "uncached", fn)(**kwargs)
+            _set(progress, status="ok", count=len(items or []))
+        except Exception as e:
+            log.error(f"❌ {name} ingestion failed: {e}")
+            SOURCE_ERRORS.inc(source=name, kind="error")
+            _set(progress, status="error", error=str(e))
+            failed = True
+        finally:
+            lock.release()
+            _set(progress, elapsed_ms=round((time.perf_counter() - start) * 1000))
+
+    flush_writes()
+    finished_at = time.time()
+    _set(
+        job,
+        finished_at=finished_at,
+        duration_ms=round((finished_at - job["started_at"]) * 1000),
+        status="error" if failed else "done",
+    )
+    _save_job(job)
+    return job
+
+
+def _remember_job(job: dict):
+    with _jobs_lock:
+        _jobs[job["id"]] = job
+        # dicts keep insertion order, so the first finished entries are the oldest
+        for job_id in [k for k, j in _jobs.items() if j["finished_at"]][:max(0, len(_jobs) - MAX_JOBS_IN_MEMORY)]:
+            del _jobs[job_id]
+
+
+def run_sources(sources: Optional[List[str]] = None, kind: str = "manual") -> dict:
+    """Run an ingestion job synchronously and return its record."""
+    job = _new_job(sources or list(INGEST_SOURCES), kind)
+    _remember_job(job)
+    return _run_job(job)
+
+
+def submit_job(sources: Optional[List[str]] = None, kind: str = "manual") -> dict:
+    """Queue an ingestion job on the background pool and return it immediately."""
+    job = _new_job(sources or list(INGEST_SOURCES), kind)
+    _remember_job(job)
+    _save_job(job)
+    _executor.submit(_run_job, job)
+    return job
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            # Snapshot, the job thread keeps mutating the live record
+            return json.loads(json.dumps(job))
+    return _load_job(job_id)
+
+
+# -------------------------------
+# Scheduler
+# -------------------------------
+def interval_for(source: str) -> float:
+    return float(os.getenv(f"INSIGHTLENS_SCHEDULE_{source.upper()}_S", DEFAULT_INTERVALS.get(source, 3600)))
+
+def _jittered(interval: float) -> float:
+    return interval * (1 + random.uniform(-SCHEDULE_JITTER, SCHEDULE_JITTER))
+
+
+class IngestScheduler:
+    """Runs each source as its own scheduled job on its own jittered interval."""
+
+    def __init__(self, sources: Optional[List[str]] = None):
+        self.sources = sources or list(INGEST_SOURCES)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ingest-scheduler", daemon=True)
+        self._thread.start()
+        log.info(f"⏰ Ingestion scheduler started for {', '.join(self.sources)}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        now = time.monotonic()
+        # Spread the first runs out instead of hitting every source at startup
+        next_due = {name: now + random.uniform(0, min(60.0, interval_for(name))) for name in self.sources}
+        while not self._stop.is_set():
+            now = time.monotonic()
+            for name, due in next_due.items():
+                if due > now:
+                    continue
+                next_due[name] = now + _jittered(interval_for(name))
+                # Overlap guard: a still-running crawl for this source means skip this tick
+                if _source_locks[name].locked():
+                    log.info(f"⏭️ {name}: previous run still in progress")
+                    continue
+                submit_job([name], kind="scheduled")
+            self._stop.wait(max(0.5, min(next_due.values()) - time.monotonic()))
+
+scheduler = IngestScheduler()
+
+
+# -------------------------------
+# API
+# -------------------------------
+@router.post("/ingest")
+def ingest_data(sources: Optional[List[str]] = Query(None, description="Sources to ingest, default all")):
+    unknown = set(sources or []) - set(INGEST_SOURCES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown sources: {', '.join(sorted(unknown))}")
+    job = submit_job(sources)
+    return {"job_id": job["id"], "status": "queued"}
+
+@router.get("/ingest/{job_id}")
+def ingest_status(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
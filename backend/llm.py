@@ -1,7 +1,18 @@
+import logging
 import os
+import json
+import time
+import hashlib
 from dotenv import load_dotenv
 from openai import OpenAI
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
+from backend.db import get_conn, read_conn
+from backend.metrics import timed, LLM_TOKENS
+from backend.prompt import (
+    PROMPT_TOKEN_BUDGET, count_tokens, prepare_articles, format_articles, chunk_articles,
+)
+
+log = logging.getLogger(__name__)
 
 load_dotenv()
 
@@ -13,7 +24,7 @@ LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini") # Default to a cost-effective
 def get_llm_client():
     if LLM_PROVIDER == "openrouter":
         if not OPENROUTER_API_KEY:
-            print("⚠️ OPENROUTER_API_KEY not set")
+            log.warning("⚠️ OPENROUTER_API_KEY not set")
             return None
         return OpenAI(
             base_url="https://openrouter.ai/api/v1",
@@ -21,90 +32,13 @@ def get_llm_client():
         )
     else: # Default to openai
         if not OPENAI_API_KEY:
-            print("⚠️ OPENAI_API_KEY not set")
+            log.warning("⚠️ OPENAI_API_KEY not set")
             return None
         return OpenAI(api_key=OPENAI_API_KEY)
 
 client = get_llm_client()
 
-def summarize_insights(query: str, insights: list, max_tokens: int = 5000):
-    if not (OPENAI_API_KEY or OPENROUTER_API_KEY):
-        print("⚠️ LLM API key not set. Skipping summarization.")
-        return {
-            "text": "LLM summarization skipped: API key not configured.",
-            "bullets": [],
-            "recommendations": [],
-            "citations": []
-        }
-        
-    if client is None:
-        print("⚠️ LLM client initialization failed. Skipping summarization.")
-        return {
-            "text": "LLM summarization skipped: Client initialization failed.",
-            "bullets": [],
-            "recommendations": [],
-            "citations": []
-        }
-
-    if not insights:
-        print("⚠️ No insights provided to summarize_insights function")
-        return {
-            "text": "No insights to summarize.",
-            "bullets": [],
-            "recommendations": [],
-            "citations": []
-        }
-    
-    print(f"📊 Summarizing {len(insights)} insights")
-    print(f"📝 First insight sample: {insights[0] if insights else 'None'}")
-    print(f"🔍 Query: {query}")
-
-    # Prepare insights for the LLM
-    insight_texts = []
-    citations = []
-    for i, insight in enumerate(insights):
-        # Clean content: remove HTML tags
-        cleaned_content = insight.get('content', 'N/A')
-        if cleaned_content != 'N/A':
-            soup = BeautifulSoup(cleaned_content, 'html.parser')
-            cleaned_content = soup.get_text()
-
-        # Clean URL: remove backticks and extra spaces if present
-        cleaned_url = insight.get('url', 'N/A').strip().replace('`', '').strip()
-
-        insight_texts.append(f"Article {i+1}:\nTitle: {insight.get('title', 'N/A')}\nContent: {cleaned_content}\nURL: {cleaned_url}\n")
-        citations.append(cleaned_url)
-
-    prompt = f"""You are an expert analyst. Summarize the following articles related to '{query}'.
-Provide a concise, actionable summary in a paragraph, followed by key insights as bullet points, and 3 short recommendations.
-Also, list the URLs of the articles you used for the summary.
-
-Articles:
-{'\n---\n'.join(insight_texts)}
-
-Format your response as follows:
-Summary: 
-[paragraph summary]
-Key Insights:
-- [bullet point 1]
-- [bullet point 2]
-- [bullet point 3]
-Recommendations:
-- [recommendation 1]
-- [recommendation 2]
-- [recommendation 3]
-Citations: [URL1, URL2, URL3,...]
-"""
-
-    try:
-        # Print the prompt for debugging
-        print(f"🔤 Prompt length: {len(prompt)} characters")
-        print(f"🔤 First 500 chars of prompt: {prompt[:500]}...")
-        
-        chat_completion = client.chat.completions.create(
-            model=LLM_MODEL,
-            messages=[
-                {"role": "system", "content": r"""You are InsightLens, an AI-powered competitive intelligence and trend-analysis agent.Your role is to:
+SYSTEM_PROMPT = r"""You are InsightLens, an AI-powered competitive intelligence and trend-analysis agent.Your role is to:
 
                     Continuously analyze real-time data sources (news, RSS feeds, Reddit, YouTube, GDELT, etc.)
 
@@ -169,90 +103,379 @@ Citations: [URL1, URL2, URL3,...]
 
                     Alert:
 
-                    🚨 Sudden Spike: "Generative AI in Education" mentions jumped 250% on Reddit in 24h. Likely due to MIT’s new open-source tool launch."""},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=max_tokens,
-            temperature=0.7,
+                    🚨 Sudden Spike: "Generative AI in Education" mentions jumped 250% on Reddit in 24h. Likely due to MIT’s new open-source tool launch."""
+
+# -------------------------------
+# Summary cache
+# -------------------------------
+SUMMARY_CACHE_TTL_S = float(os.getenv("INSIGHTLENS_SUMMARY_CACHE_TTL_S", str(6 * 3600)))
+SUMMARY_CACHE_MAX = int(os.getenv("INSIGHTLENS_SUMMARY_CACHE_MAX", "1000"))
+
+def summary_cache_key(query: str, insights: list, max_tokens: int) -> str:
+    """
+    Hash of everything that determines the summary. Articles are reduced to
+    a sorted set of (url, text hash), so the same articles in a different
+    order, or repeated across DB and fresh results, give the same key.
+    """
+    articles = sorted({
+        (
+            (insight.get('url') or '').strip(),
+            hashlib.sha1((insight.get('clean_text') or insight.get('content') or '').encode('utf-8')).hexdigest(),
         )
-        response_content = chat_completion.choices[0].message.content
-        print(f"🔤 Response length: {len(response_content)} characters")
-        print(f"🔤 First 500 chars of response: {response_content}...")                
-        
-
-        summary_text = ""
-        bullets = []
-        recommendations = []
-        extracted_citations = []
-
-        lines = response_content.split('\n')
-        current_section = None
-        for line in lines:
-            line = line.strip()
-            if line.startswith("### Summary:"):
-                 summary_text = line[len("### Summary:"):].strip()
-                 current_section = "summary"
-                 print(f"Summary: {summary_text}")
-            elif line.startswith("### Key Insights:"):
-                current_section = "insights"
-            elif line.startswith("### Recommendations:"):
-                current_section = "recommendations"
-            elif line.startswith("### Citations:"):
-                current_section = "citations"
-            elif current_section == "summary" and line and not line.startswith("-"):
-                summary_text += " " + line
-            elif current_section == "insights" and line.startswith("-"):
-                bullets.append(line[1:].strip())
-            elif current_section == "recommendations" and line.startswith("-"):
-                recommendations.append(line[1:].strip())
-            elif current_section == "citations" and line.startswith("[") and line.endswith("]"):
-                extracted_citations.extend([url.strip() for url in line[1:-1].split(',')])
-            
-
-            
-            elif current_section == "insights" and line.startswith("-"):
-                bullets.append(line[1:].strip())
-            elif current_section == "recommendations" and line.startswith("-"):
-                recommendations.append(line[1:].strip())
+        for insight in insights
+    })
+    payload = json.dumps({
+        "query": " ".join((query or "").lower().split()),
+        "articles": articles,
+        "model": LLM_MODEL,
+        "max_tokens": max_tokens,
+    })
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def get_cached_summary(key: str):
+    try:
+        with read_conn() as conn:
+            row = conn.execute(
+                "SELECT summary FROM summary_cache WHERE key = ? AND created_at >= ?",
+                (key, time.time() - SUMMARY_CACHE_TTL_S),
+            ).fetchone()
+        if row:
+            conn = get_conn()
+            with conn:
+                conn.execute("UPDATE summary_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            conn.close()
+    except Exception as e:
+        log.warning(f"⚠️ Summary cache read failed: {e}")
+        return None
+    return json.loads(row[0]) if row else None
+
+def store_summary(key: str, query: str, summary: dict):
+    now = time.time()
+    try:
+        conn = get_conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO summary_cache (key, query, model, summary, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, query, LLM_MODEL, json.dumps(summary), now, now),
+            )
+            # Enforce the size cap: drop expired entries, then least recently used
+            conn.execute("DELETE FROM summary_cache WHERE created_at < ?", (now - SUMMARY_CACHE_TTL_S,))
+            conn.execute("""
+                DELETE FROM summary_cache WHERE key IN (
+                    SELECT key FROM summary_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            """, (SUMMARY_CACHE_MAX,))
+        conn.close()
+    except Exception as e:
+        log.warning(f"⚠️ Summary cache write failed: {e}")
+
+def _skipped_summary(text: str) -> dict:
+    return {
+        "text": text,
+        "bullets": [],
+        "recommendations": [],
+        "citations": [],
+        "cached": False
+    }
+
+def _precheck(insights: list):
+    """Return a placeholder summary when summarization can't run, else None."""
+    if not (OPENAI_API_KEY or OPENROUTER_API_KEY):
+        log.warning("⚠️ LLM API key not set. Skipping summarization.")
+        return _skipped_summary("LLM summarization skipped: API key not configured.")
+
+    if client is None:
+        log.warning("⚠️ LLM client initialization failed. Skipping summarization.")
+        return _skipped_summary("LLM summarization skipped: Client initialization failed.")
+
+    if not insights:
+        log.warning("⚠️ No insights provided to summarize_insights function")
+        return _skipped_summary("No insights to summarize.")
+    return None
+
+MAP_MAX_TOKENS = int(os.getenv("INSIGHTLENS_MAP_MAX_TOKENS", "600"))
+MAP_CONCURRENCY = int(os.getenv("INSIGHTLENS_MAP_CONCURRENCY", "4"))
+
+def build_prompt(query: str, insights: list = None, articles: list = None) -> str:
+    # Prepare insights for the LLM
+    if articles is None:
+        articles = prepare_articles(query, insights)
+    articles_text = format_articles(articles)
+    return f"""You are an expert analyst. Summarize the following articles related to '{query}'.
+Provide a concise, actionable summary in a paragraph, followed by key insights as bullet points, and 3 short recommendations.
+Also, list the URLs of the articles you used for the summary.
+
+Articles:
+{articles_text}
+
+Format your response as follows:
+Summary: 
+[paragraph summary]
+Key Insights:
+- [bullet point 1]
+- [bullet point 2]
+- [bullet point 3]
+Recommendations:
+- [recommendation 1]
+- [recommendation 2]
+- [recommendation 3]
+Citations: [URL1, URL2, URL3,...]
+"""
+
+def _map_prompt(query: str, articles: list, start: int) -> str:
+    return f"""Extract the key facts, signals and numbers from the following articles related to '{query}'.
+Answer with concise bullet points only, and put the article URL after each fact it supports.
+
+Articles:
+{format_articles(articles, start)}
+"""
+
+def _record_usage(usage, prompt_tokens: int, completion: str):
+    """Count LLM tokens, from the API's usage block when it sends one, estimated otherwise."""
+    if usage is not None:
+        prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens
+    else:
+        completion_tokens = count_tokens(completion)
+    LLM_TOKENS.inc(prompt_tokens, model=LLM_MODEL, kind="prompt")
+    LLM_TOKENS.inc(completion_tokens, model=LLM_MODEL, kind="completion")
+
+def _map_chunk(query: str, articles: list, start: int):
+    prompt = _map_prompt(query, articles, start)
+    with timed("llm_call", source="map"):
+        chat_completion = client.chat.completions.create(
+            model=LLM_MODEL,
+            messages=_messages(prompt),
+            max_tokens=MAP_MAX_TOKENS,
+            temperature=0.3,
+        )
+    text = chat_completion.choices[0].message.content
+    _record_usage(getattr(chat_completion, "usage", None), count_tokens(prompt), text)
+    return text, count_tokens(prompt)
+
+def plan_prompt(query: str, insights: list):
+    """
+    Build the final (reduce) prompt within PROMPT_TOKEN_BUDGET and return
+    (prompt, prompt_tokens), where prompt_tokens counts every prompt sent.
+    Articles are trimmed to ITEM_TOKEN_BUDGET each; if they still don't fit,
+    chunks are summarized concurrently first (map) and the final prompt is
+    built from those notes (reduce).
+    """
+    articles = prepare_articles(query, insights)
+    chunks = chunk_articles(articles, PROMPT_TOKEN_BUDGET)
+    if len(chunks) <= 1:
+        prompt = build_prompt(query, articles=articles)
+        return prompt, count_tokens(prompt)
+
+    log.info(f"🧩 {len(articles)} articles over budget, map-reduce over {len(chunks)} chunks")
+    starts = []
+    start = 1
+    for chunk in chunks:
+        starts.append(start)
+        start += len(chunk)
+    with ThreadPoolExecutor(max_workers=MAP_CONCURRENCY) as pool:
+        mapped = list(pool.map(lambda args: _map_chunk(query, *args), zip(chunks, starts)))
+
+    notes = []
+    for chunk, chunk_start, (text, _) in zip(chunks, starts, mapped):
+        notes.append({
+            "title": f"Notes on articles {chunk_start}-{chunk_start + len(chunk) - 1}",
+            "content": text,
+            "url": ", ".join(a["url"] for a in chunk),
+        })
+    prompt = build_prompt(query, articles=notes)
+    return prompt, count_tokens(prompt) + sum(tokens for _, tokens in mapped)
+
+def _messages(prompt: str) -> list:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+class SummaryParser:
+    """
+    Splits the LLM response into summary / key insights / recommendations /
+    citations. Lines are fed one at a time, so it works the same on a full
+    response and on a token stream.
+    """
+
+    def __init__(self):
+        self.summary_text = ""
+        self.bullets = []
+        self.recommendations = []
+        self.citations = []
+        self.current_section = None
+
+    def feed(self, line: str):
+        """Consume one line; return (section, text) when it completed an item."""
+        line = line.strip()
+        if line.startswith("### Summary:"):
+            text = line[len("### Summary:"):].strip()
+            self.summary_text = text
+            self.current_section = "summary"
+            return ("summary", text) if text else None
+        elif line.startswith("### Key Insights:"):
+            self.current_section = "insights"
+        elif line.startswith("### Recommendations:"):
+            self.current_section = "recommendations"
+        elif line.startswith("### Citations:"):
+            self.current_section = "citations"
+        elif self.current_section == "summary" and line and not line.startswith("-"):
+            self.summary_text += " " + line
+            return ("summary", line)
+        elif self.current_section == "insights" and line.startswith("-"):
+            self.bullets.append(line[1:].strip())
+            return ("bullet", self.bullets[-1])
+        elif self.current_section == "recommendations" and line.startswith("-"):
+            self.recommendations.append(line[1:].strip())
+            return ("recommendation", self.recommendations[-1])
+        elif self.current_section == "citations" and line.startswith("[") and line.endswith("]"):
+            urls = [url.strip() for url in line[1:-1].split(',')]
+            self.citations.extend(urls)
+            return ("citations", urls)
+        return None
+
+    def result(self) -> dict:
+        return {
+            "text": self.summary_text,
+            "bullets": self.bullets,
+            "recommendations": self.recommendations,
+            "citations": self.citations
+        }
+
+
+def _fallback_summary(insights: list, e: Exception) -> dict:
+    # Generate a basic fallback summary from the insights
+    try:
+        fallback_summary = "Summary based on available insights:"
+        fallback_bullets = []
+        fallback_recommendations = ["Review the original sources for more detailed information"]
+        fallback_citations = []
+
+        # Extract some basic information from insights
+        for i, insight in enumerate(insights[:5]):  # Use up to 5 insights
+            title = insight.get('title', 'N/A')
+            if title != 'N/A' and len(title) > 5:  # Only use meaningful titles
+                fallback_bullets.append(f"Information from: {title}")
+
+            url = insight.get('url', 'N/A')
+            if url != 'N/A':
+                fallback_citations.append(url)
 
         return {
-            "text": summary_text,
-            "bullets": bullets,
-            "recommendations": recommendations,
-            "citations": extracted_citations
+            "text": fallback_summary,
+            "bullets": fallback_bullets,
+            "recommendations": fallback_recommendations,
+            "citations": fallback_citations,
+            "cached": False
         }
+    except Exception as fallback_error:
+        log.error(f"❌ Even fallback summary generation failed: {fallback_error}")
+        return _skipped_summary(f"LLM summarization failed: {e}")
+
+
+def summarize_insights(query: str, insights: list, max_tokens: int = 5000):
+    skipped = _precheck(insights)
+    if skipped is not None:
+        return skipped
+
+    cache_key = summary_cache_key(query, insights, max_tokens)
+    cached = get_cached_summary(cache_key)
+    if cached is not None:
+        log.info(f"⚡ Summary cache hit for '{query}'")
+        return {**cached, "cached": True}
+
+    log.info(f"📊 Summarizing {len(insights)} insights", extra={"query": query})
+    log.debug("📝 First insight sample: %s", insights[0])
+
+    try:
+        with timed("prompt_build"):
+            prompt, prompt_tokens = plan_prompt(query, insights)
+        log.info("🔤 Prompt built", extra={"chars": len(prompt), "prompt_tokens": prompt_tokens})
+        log.debug("🔤 Prompt: %s", prompt)
+
+        with timed("llm_call", source="summary"):
+            chat_completion = client.chat.completions.create(
+                model=LLM_MODEL,
+                messages=_messages(prompt),
+                max_tokens=max_tokens,
+                temperature=0.7,
+            )
+        response_content = chat_completion.choices[0].message.content
+        _record_usage(getattr(chat_completion, "usage", None), prompt_tokens, response_content)
+        log.debug("🔤 Response: %s", response_content)
+
+        parser = SummaryParser()
+        for line in response_content.split('\n'):
+            parser.feed(line)
+        summary = {**parser.result(), "prompt_tokens": prompt_tokens}
+        store_summary(cache_key, query, summary)
+        return {**summary, "cached": False}
 
     except Exception as e:
-        print(f"❌ LLM summarization error: {e}")
-        
-        # Generate a basic fallback summary from the insights
-        try:
-            fallback_summary = "Summary based on available insights:"
-            fallback_bullets = []
-            fallback_recommendations = ["Review the original sources for more detailed information"]
-            fallback_citations = []
-            
-            # Extract some basic information from insights
-            for i, insight in enumerate(insights[:5]):  # Use up to 5 insights
-                title = insight.get('title', 'N/A')
-                if title != 'N/A' and len(title) > 5:  # Only use meaningful titles
-                    fallback_bullets.append(f"Information from: {title}")
-                    
-                url = insight.get('url', 'N/A')
-                if url != 'N/A':
-                    fallback_citations.append(url)
-            
-            return {
-                "text": fallback_summary,
-                "bullets": fallback_bullets,
-                "recommendations": fallback_recommendations,
-                "citations": fallback_citations
-            }
-        except Exception as fallback_error:
-            print(f"❌ Even fallback summary generation failed: {fallback_error}")
-            return {
-                "text": f"LLM summarization failed: {e}",
-                "bullets": [],
-                "recommendations": [],
-                "citations": []
-            }
\ No newline at end of file
+        log.error(f"❌ LLM summarization error: {e}")
+        return _fallback_summary(insights, e)
+
+
+def stream_summary(query: str, insights: list, max_tokens: int = 5000):
+    """
+    Streaming counterpart of summarize_insights. Yields ("token", text) for
+    every delta from the LLM, (section, text) whenever SummaryParser
+    completes a line ("summary", "bullet", "recommendation", "citations"),
+    and finally ("summary_done", summary_dict).
+    """
+    skipped = _precheck(insights)
+    if skipped is not None:
+        yield "summary_done", skipped
+        return
+
+    cache_key = summary_cache_key(query, insights, max_tokens)
+    cached = get_cached_summary(cache_key)
+    if cached is not None:
+        log.info(f"⚡ Summary cache hit for '{query}'")
+        yield "summary_done", {**cached, "cached": True}
+        return
+
+    parser = SummaryParser()
+    buffer = ""
+    completion = []
+    usage = None
+    try:
+        with timed("prompt_build"):
+            prompt, prompt_tokens = plan_prompt(query, insights)
+        with timed("llm_call", source="stream"):
+            stream = client.chat.completions.create(
+                model=LLM_MODEL,
+                messages=_messages(prompt),
+                max_tokens=max_tokens,
+                temperature=0.7,
+                stream=True,
+            )
+            for chunk in stream:
+                usage = getattr(chunk, "usage", None) or usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                yield "token", delta
+                completion.append(delta)
+                buffer += delta
+                # Only complete lines go through the parser
+                *lines, buffer = buffer.split('\n')
+                for line in lines:
+                    item = parser.feed(line)
+                    if item:
+                        yield item
+        _record_usage(usage, prompt_tokens, "".join(completion))
+        item = parser.feed(buffer)
+        if item:
+            yield item
+    except Exception as e:
+        log.error(f"❌ LLM streaming error: {e}")
+        yield "summary_done", _fallback_summary(insights, e)
+        return
+
+    summary = {**parser.result(), "prompt_tokens": prompt_tokens}
+    store_summary(cache_key, query, summary)
+    yield "summary_done", {**summary, "cached": False}
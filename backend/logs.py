@@ -0,0 +1,58 @@
+# insightlens/backend/logs.py
+
+import os
+import sys
+import json
+import logging
+
+LOG_LEVEL = os.getenv("INSIGHTLENS_LOG_LEVEL", "INFO").upper()
+# "text" for humans, "json" for one object per line (log shippers)
+LOG_FORMAT = os.getenv("INSIGHTLENS_LOG_FORMAT", "text").lower()
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def _extras(record: logging.LogRecord) -> dict:
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_FIELDS}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+            **_extras(record),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extras = _extras(record)
+        if extras:
+            line += " " + " ".join(f"{k}={v}" for k, v in extras.items())
+        return line
+
+
+def configure_logging():
+    """Route the backend's loggers to stdout at INSIGHTLENS_LOG_LEVEL. Safe to call twice."""
+    root = logging.getLogger()
+    if any(getattr(h, "_insightlens", False) for h in root.handlers):
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    handler._insightlens = True
+    if LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(TextFormatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s"))
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+    # Per-request access lines from the HTTP client libraries are noise at INFO
+    for name in ("httpx", "urllib3", "openai"):
+        logging.getLogger(name).setLevel(max(logging.WARNING, root.level))
@@ -0,0 +1,147 @@
+# insightlens/backend/metrics.py
+
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Dict, Sequence, Tuple
+
+from fastapi import APIRouter, Response
+
+router = APIRouter()
+
+# Seconds; spans a cache hit up to a slow LLM call
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_registry = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(labels.get(n, "") for n in self.labelnames)
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines += self._samples()
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        return [f"{self.name}{_label_text(self.labelnames, k)} {v}" for k, v in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(buckets)
+        self._values = {}   # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def _samples(self):
+        lines = []
+        for key, state in sorted(self._values.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, state):
+                cumulative += n
+                labels = _label_text(self.labelnames, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _label_text(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {state[-1]}")
+            labels = _label_text(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {state[-2]}")
+            lines.append(f"{self.name}_count{labels} {state[-1]}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "insightlens_stage_seconds", "Time spent per pipeline stage (fetch, db_write, db_search, prompt_build, llm_call)",
+    ["stage", "source"],
+)
+REQUEST_SECONDS = Histogram("insightlens_request_seconds", "API request latency", ["method", "route", "status"])
+SOURCE_ERRORS = Counter("insightlens_source_errors_total", "Failed or timed-out source fetches", ["source", "kind"])
+UPSTREAM_RESPONSES = Counter("insightlens_upstream_responses_total", "Upstream HTTP responses by status", ["host", "status"])
+ROWS_INGESTED = Counter("insightlens_rows_ingested_total", "New insights committed to the database", ["source"])
+LLM_TOKENS = Counter("insightlens_llm_tokens_total", "LLM tokens used", ["model", "kind"])
+READ_POOL_CONNECTIONS = Gauge("insightlens_read_pool_connections", "Pooled read-only DB connections", ["state"])
+READ_POOL_OPENED = Counter("insightlens_read_pool_opened_total", "Read-only DB connections opened by the pool")
+READ_POOL_WAIT_SECONDS = Histogram(
+    "insightlens_read_pool_wait_seconds", "Time spent waiting for a pooled read connection",
+    buckets=(0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+
+
+@contextmanager
+def timed(stage: str, source: str = ""):
+    """Record the duration of the block in STAGE_SECONDS, also when it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage, source=source)
+
+
+def render() -> str:
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,107 @@
+# insightlens/backend/prompt.py
+
+import os
+import re
+from .text import normalize_text
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken is optional; fall back to a ~4 chars/token estimate
+    _encoding = None
+
+# Tokens allowed for the articles section of a single prompt. Above this the
+# summary switches to map-reduce over chunks of at most this size.
+PROMPT_TOKEN_BUDGET = int(os.getenv("INSIGHTLENS_PROMPT_TOKEN_BUDGET", "6000"))
+# Tokens kept per article (lead sentences + the sentences matching the query).
+ITEM_TOKEN_BUDGET = int(os.getenv("INSIGHTLENS_ITEM_TOKEN_BUDGET", "250"))
+
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+_WORD_RE = re.compile(r'\w+')
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def _truncate_tokens(text: str, budget: int) -> str:
+    if _encoding is not None:
+        return _encoding.decode(_encoding.encode(text, disallowed_special=())[:budget])
+    return text[:budget * 4]
+
+
+def trim_to_budget(text: str, query: str, budget: int = ITEM_TOKEN_BUDGET) -> str:
+    """
+    Extractive trim: keep the two lead sentences, then the sentences that
+    share the most words with the query, in their original order, until the
+    budget is used up.
+    """
+    if count_tokens(text) <= budget:
+        return text
+    sentences = [s for s in _SENTENCE_RE.split(text) if s.strip()]
+    query_terms = {w.lower() for w in _WORD_RE.findall(query or "")}
+
+    def overlap(i):
+        return len(query_terms & {w.lower() for w in _WORD_RE.findall(sentences[i])})
+
+    order = list(range(min(2, len(sentences))))
+    order += sorted(range(len(order), len(sentences)), key=lambda i: (-overlap(i), i))
+
+    picked = []
+    used = 0
+    for i in order:
+        cost = count_tokens(sentences[i])
+        if used + cost > budget:
+            if not picked:  # a single enormous "sentence", e.g. an unpunctuated transcript
+                return _truncate_tokens(sentences[i], budget) + " …"
+            continue
+        picked.append(i)
+        used += cost
+    return " ".join(sentences[i] for i in sorted(picked)) + " …"
+
+
+def prepare_articles(query: str, insights: list, item_budget: int = ITEM_TOKEN_BUDGET) -> list:
+    """Plain text, tidy URLs and trim every insight to the per-item budget."""
+    articles = []
+    for insight in insights:
+        # Stored rows carry clean_text from ingest; only fresh, unsaved items need cleaning here
+        content = insight.get('clean_text')
+        if content is None:
+            content = normalize_text(insight.get('content', '')) or 'N/A'
+        # Clean URL: remove backticks and extra spaces if present
+        url = insight.get('url', 'N/A').strip().replace('`', '').strip()
+        articles.append({
+            "title": insight.get('title', 'N/A'),
+            "content": trim_to_budget(content, query, item_budget),
+            "url": url,
+        })
+    return articles
+
+
+def format_articles(articles: list, start: int = 1) -> str:
+    return '\n---\n'.join(
+        f"Article {i}:\nTitle: {a['title']}\nContent: {a['content']}\nURL: {a['url']}\n"
+        for i, a in enumerate(articles, start)
+    )
+
+
+def chunk_articles(articles: list, budget: int = PROMPT_TOKEN_BUDGET) -> list:
+    """Group consecutive articles into chunks whose formatted text fits the budget."""
+    chunks = []
+    current = []
+    used = 0
+    for article in articles:
+        cost = count_tokens(format_articles([article]))
+        if current and used + cost > budget:
+            chunks.append(current)
+            current = []
+            used = 0
+        current.append(article)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
@@ -0,0 +1,236 @@
+# insightlens/backend/rollups.py
+
+import logging
+import os
+import re
+import math
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Query
+
+from .db import get_conn, read_conn, register_post_write_hook, register_content_hook
+from .text import decompress_text
+from .timestamps import parse_timestamp
+
+log = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Terms whose hourly mention counts are rolled up. Single words or two-word
+# phrases, matched case-insensitively on word boundaries in title + text.
+DEFAULT_TRACKED_TERMS = (
+    "ai,llm,agent,agents,agentic,openai,anthropic,google,microsoft,meta,nvidia,apple,"
+    "startup,funding,acquisition,ipo,layoffs,regulation,lawsuit,security,breach,"
+    "open source,chatgpt,gemini,claude"
+)
+TRACKED_TERMS = sorted({
+    t.strip().lower()
+    for t in os.getenv("INSIGHTLENS_TRACKED_TERMS", DEFAULT_TRACKED_TERMS).split(",")
+    if t.strip()
+})
+ROLLUP_BATCH = 1000
+EWMA_ALPHA = float(os.getenv("INSIGHTLENS_ALERT_EWMA_ALPHA", "0.3"))
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _mentioned_terms(title: str, text: str) -> set:
+    words = _WORD_RE.findall(f"{title or ''} {text or ''}".lower())
+    grams = set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+    return grams.intersection(TRACKED_TERMS)
+
+
+def _state(conn, key: str) -> Optional[str]:
+    row = conn.execute("SELECT value FROM rollup_state WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+def _set_state(conn, key: str, value: str):
+    conn.execute("INSERT OR REPLACE INTO rollup_state (key, value) VALUES (?, ?)", (key, value))
+
+
+def update_rollups(conn) -> int:
+    """
+    Add every insight above the rolled_upto mark to the hourly source and
+    term counts. Runs as a post-write hook; when the tracked vocabulary
+    changes the rollups are rebuilt from the whole table.
+    """
+    vocabulary = ",".join(TRACKED_TERMS)
+    if _state(conn, "vocabulary") != vocabulary:
+        conn.execute("DELETE FROM rollup_source")
+        conn.execute("DELETE FROM rollup_term")
+        _set_state(conn, "rolled_upto", "0")
+        _set_state(conn, "vocabulary", vocabulary)
+    upto = int(_state(conn, "rolled_upto") or 0)
+    total = 0
+    while True:
+        rows = conn.execute("""
+            SELECT i.id, i.source, i.title, COALESCE(b.clean_text, b.content), i.published_ts
+            FROM insights i LEFT JOIN insight_content b ON b.id = i.id
+            WHERE i.id > ? ORDER BY i.id LIMIT ?
+        """, (upto, ROLLUP_BATCH)).fetchall()
+        if not rows:
+            return total
+        now = int(time.time())
+        sources = Counter()
+        terms = Counter()
+        for _, source, title, text, published_ts in rows:
+            hour = (published_ts or now) // 3600
+            sources[(hour, source)] += 1
+            for term in _mentioned_terms(title, decompress_text(text)):
+                terms[(term, hour)] += 1
+        conn.executemany("""
+            INSERT INTO rollup_source (hour, source, n) VALUES (?, ?, ?)
+            ON CONFLICT(hour, source) DO UPDATE SET n = n + excluded.n
+        """, [(h, s, n) for (h, s), n in sources.items()])
+        conn.executemany("""
+            INSERT INTO rollup_term (term, hour, n) VALUES (?, ?, ?)
+            ON CONFLICT(term, hour) DO UPDATE SET n = n + excluded.n
+        """, [(t, h, n) for (t, h), n in terms.items()])
+        upto = rows[-1][0]
+        _set_state(conn, "rolled_upto", str(upto))
+        total += len(rows)
+
+
+def reroll_changed(conn, changes: list) -> int:
+    """
+    Move the term mentions of replaced bodies that update_rollups already
+    counted from the old text to the new one (content hook). Source counts
+    do not depend on the text and stay as they are.
+    """
+    upto = int(_state(conn, "rolled_upto") or 0)
+    now = int(time.time())
+    terms = Counter()
+    for change in changes:
+        if change["id"] > upto:
+            continue
+        hour = (change["published_ts"] or now) // 3600
+        for term in _mentioned_terms(change["title"], change["old_text"]):
+            terms[(term, hour)] -= 1
+        for term in _mentioned_terms(change["title"], change["new_text"]):
+            terms[(term, hour)] += 1
+    conn.executemany("""
+        INSERT INTO rollup_term (term, hour, n) VALUES (?, ?, ?)
+        ON CONFLICT(term, hour) DO UPDATE SET n = n + excluded.n
+    """, [(t, h, n) for (t, h), n in terms.items() if n])
+    return len(changes)
+
+
+def ensure_rollups():
+    """Roll up insights stored before the rollups existed (or before a vocabulary change)."""
+    conn = get_conn()
+    try:
+        with conn:
+            count = update_rollups(conn)
+        if count:
+            log.info(f"📊 Rolled up {count} insights into hourly buckets")
+    finally:
+        conn.close()
+
+
+def hourly_series(kind: str, first_hour: int, last_hour: int) -> Dict[str, List[int]]:
+    """Dense hourly counts in [first_hour, last_hour) per source (kind="source") or tracked term."""
+    if kind == "source":
+        sql = "SELECT source, hour, n FROM rollup_source WHERE hour >= ? AND hour < ?"
+    else:
+        sql = "SELECT term, hour, n FROM rollup_term WHERE hour >= ? AND hour < ?"
+    series = {}
+    with read_conn() as conn:
+        for key, hour, n in conn.execute(sql, (first_hour, last_hour)):
+            series.setdefault(key, [0] * (last_hour - first_hour))[hour - first_hour] = n
+    return series
+
+
+def _score(baseline: List[int], current: int, method: str):
+    """(expected count, z-score) of `current` against the earlier windows."""
+    if method == "ewma":
+        mean = float(baseline[0])
+        var = 0.0
+        for x in baseline[1:]:
+            diff = x - mean
+            mean += EWMA_ALPHA * diff
+            var = (1 - EWMA_ALPHA) * (var + EWMA_ALPHA * diff * diff)
+    else:
+        mean = sum(baseline) / len(baseline)
+        var = sum((x - mean) ** 2 for x in baseline) / len(baseline)
+    # Counts are roughly Poisson: never trust a spread below sqrt(mean) (or 1)
+    spread = max(math.sqrt(var), math.sqrt(mean), 1.0)
+    return mean, (current - mean) / spread
+
+
+def detect_spikes(
+    end_ts: int,
+    window_hours: int = 24,
+    baseline_windows: int = 7,
+    method: str = "zscore",
+    threshold: float = 3.0,
+    min_count: int = 5,
+    kinds=("source", "term"),
+) -> List[Dict]:
+    """
+    Compare each series' count in the last `window_hours` before end_ts with
+    the `baseline_windows` windows before it (rolling z-score, or an EWMA
+    mean/variance when method="ewma") and return the ones above threshold.
+    """
+    last_hour = end_ts // 3600
+    first_hour = last_hour - window_hours * (baseline_windows + 1)
+    alerts = []
+    for kind in kinds:
+        for key, hours in hourly_series(kind, first_hour, last_hour).items():
+            windows = [sum(hours[i:i + window_hours]) for i in range(0, len(hours), window_hours)]
+            current = windows[-1]
+            if current < min_count:
+                continue
+            expected, z = _score(windows[:-1], current, method)
+            if z < threshold:
+                continue
+            alerts.append({
+                "kind": kind,
+                "key": key,
+                "count": current,
+                "expected": round(expected, 2),
+                "change_pct": round((current - expected) / expected * 100, 1) if expected else None,
+                "z": round(z, 2),
+                "window_start": (last_hour - window_hours) * 3600,
+                "window_end": last_hour * 3600,
+            })
+    return sorted(alerts, key=lambda a: a["z"], reverse=True)
+
+
+register_post_write_hook(update_rollups)
+register_content_hook(reroll_changed)
+
+
+def _end_ts(end: Optional[str]) -> int:
+    # Default to the end of the current hour so the newest bucket is included
+    end_ts = parse_timestamp(end) if end else None
+    return end_ts if end_ts is not None else (int(time.time()) // 3600 + 1) * 3600
+
+
+@router.get("/alerts")
+def list_alerts(
+    window_hours: int = Query(24, ge=1, le=24 * 30),
+    baseline_windows: int = Query(7, ge=2, le=60),
+    method: str = Query("zscore", pattern="^(zscore|ewma)$"),
+    threshold: float = Query(3.0, gt=0),
+    min_count: int = Query(5, ge=1),
+    kind: Optional[str] = Query(None, pattern="^(source|term)$", description="Only sources or only terms"),
+    end: Optional[str] = Query(None, description="End of the current window (ISO 8601), default now"),
+):
+    kinds = (kind,) if kind else ("source", "term")
+    return {"alerts": detect_spikes(_end_ts(end), window_hours, baseline_windows, method, threshold, min_count, kinds)}
+
+
+@router.get("/rollups")
+def get_rollups(
+    kind: str = Query("source", pattern="^(source|term)$"),
+    hours: int = Query(48, ge=1, le=24 * 90),
+    end: Optional[str] = Query(None, description="End of the range (ISO 8601), default now"),
+):
+    last_hour = _end_ts(end) // 3600
+    return {
+        "start": (last_hour - hours) * 3600,
+        "bucket_s": 3600,
+        "series": hourly_series(kind, last_hour - hours, last_hour),
+    }
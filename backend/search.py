@@ -1,58 +1,276 @@
 # insightlens/backend/search.py
 
+import os
+import json
+import logging
 import sqlite3
-from typing import List, Dict, Optional
-from fastapi import APIRouter, Query
-from .db import get_conn
+from typing import List, Dict, Optional, Sequence
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from .db import read_conn, attach_content, CONTENT_FIELDS
 from .ingest.news import fetch_newsapi
 from .ingest.gdelt import fetch_gdelt
 from .ingest.reddit import fetch_reddit
 from .ingest.rss import fetch_google_news_rss
 import urllib.parse
 from .ingest.youtube import fetch_youtube_trending, fetch_youtube_search
-from .llm import summarize_insights
+from .llm import summarize_insights, stream_summary
+from .federated import federated_fetch, iter_federated
+from .dedup import collapse_duplicates
+from .timestamps import parse_date_range, encode_cursor, decode_cursor
+from .vectors import nearest
+from .archive import archive_horizon, search_archive, load_archived
+from .metrics import timed
+from .text import highlight_snippet, normalize_text
+from .responses import FastJSONResponse, dumps
+
+log = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Relevance = bm25 (title weighted over body) plus a freshness boost that
+# decays hyperbolically, WEIGHT / (1 + age / FRESHNESS_SCALE_DAYS): half the
+# weight at that age, a third at twice it. bm25() is negative, lower is better.
+TITLE_WEIGHT = float(os.getenv("INSIGHTLENS_FTS_TITLE_WEIGHT", "5.0"))
+FRESHNESS_WEIGHT = float(os.getenv("INSIGHTLENS_FRESHNESS_WEIGHT", "2.0"))
+# INSIGHTLENS_FRESHNESS_HALF_LIFE_DAYS is the name this setting used to have
+FRESHNESS_SCALE_DAYS = float(
+    os.getenv("INSIGHTLENS_FRESHNESS_SCALE_DAYS") or os.getenv("INSIGHTLENS_FRESHNESS_HALF_LIFE_DAYS") or "7"
+)
+
+def _fts_fallback_query(query: str) -> str:
+    """Quote every term so arbitrary user input is a valid FTS5 query."""
+    terms = [t.replace('"', '""') for t in query.split()]
+    return " ".join(f'"{t}"' for t in terms if t)
+
+# Metadata only: bodies are attached to the final page by attach_content()
+SELECT_COLUMNS = "i.id, i.source, i.title, i.url, i.published_at, i.published_ts, i.inserted_at"
+# Reciprocal rank fusion constant for mode="hybrid"
+RRF_K = 60
+# What fields= may ask for; "snippet" is the highlighted excerpt built per response
+RESULT_FIELDS = (
+    "id", "source", "title", "url", "published_at", "published_ts", "inserted_at",
+    "snippet", "content", "clean_text", "score", "duplicates", "archived",
+)
+
 def search_insights(
     query: str,
     limit: int = 20,
     offset: int = 0,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    sort: str = "relevance",
+    cursor: Optional[str] = None,
+    mode: str = "keyword",
+    content_fields: Sequence[str] = CONTENT_FIELDS,
 ) -> List[Dict]:
-    """Search stored insights by keyword(s) with optional filters."""
-    conn = get_conn()
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-
-    sql = """
-        SELECT id, source, title, url, content, published_at, inserted_at
-        FROM insights
-        WHERE 1=1
     """
-    params = []
+    Search stored insights with optional date filters.
+
+    mode="keyword": `query` uses FTS5 syntax: phrases ("open source"),
+    prefixes (startup*) and AND/OR/NOT. With sort="relevance" matches are
+    ranked by bm25 with a freshness boost and paged by offset. With
+    sort="date", or without a query, results are newest first and paged by
+    keyset: pass the previous page's next_cursor().
+    mode="semantic": nearest neighbours in the local embedding space.
+    mode="hybrid": keyword and semantic rankings fused by reciprocal rank.
+
+    Keyword searches also read the Parquet archive (backend.archive) when
+    live rows don't fill the page: merged by date, or after the live
+    matches when ranking by relevance. The other modes cover live rows only.
+
+    Rows carry the bodies named in content_fields (content, clean_text),
+    decompressed for the returned page only; pass () to leave them out.
+    """
+    with timed("db_search", source=mode):
+        if query and mode == "semantic":
+            results = _semantic_search(query, limit, offset, start_date, end_date)
+        elif query and mode == "hybrid":
+            results = _hybrid_search(query, limit, offset, start_date, end_date)
+        else:
+            results = _tiered_search(query, limit, offset, start_date, end_date, sort, cursor, content_fields)
+        if content_fields:
+            # Archived rows come with their bodies
+            attach_content([row for row in results if not row.get("archived")], content_fields)
+        return results
+
+
+def _rows_by_ids(ids: List[int], start_date: Optional[str], end_date: Optional[str]) -> Dict[int, Dict]:
+    if not ids:
+        return {}
+    sql = f"SELECT {SELECT_COLUMNS} FROM insights i WHERE i.id IN (SELECT value FROM json_each(?))"
+    params = [json.dumps(ids)]
+    start_ts, end_ts = parse_date_range(start_date, end_date)
+    if start_ts is not None:
+        sql += " AND i.published_ts >= ?"
+        params.append(start_ts)
+    if end_ts is not None:
+        sql += " AND i.published_ts < ?"
+        params.append(end_ts)
+    with read_conn() as conn:
+        c = conn.cursor()
+        c.row_factory = sqlite3.Row
+        return {row["id"]: dict(row) for row in c.execute(sql, params)}
+
+
+def _semantic_search(query, limit, offset, start_date, end_date) -> List[Dict]:
+    # Over-fetch so date filtering still leaves a full page
+    hits = nearest(query, (offset + limit) * 5)
+    rows = _rows_by_ids([i for i, _ in hits], start_date, end_date)
+    results = []
+    for insight_id, score in hits:
+        if insight_id in rows:
+            results.append({**rows[insight_id], "score": round(score, 4)})
+    return results[offset:offset + limit]
 
+
+def _hybrid_search(query, limit, offset, start_date, end_date) -> List[Dict]:
+    depth = (offset + limit) * 3
+    keyword = _keyword_search(query, depth, 0, start_date, end_date, "relevance", None)
+    semantic = _semantic_search(query, depth, 0, start_date, end_date)
+    fused = {}
+    rows = {}
+    for ranking in (keyword, semantic):
+        for rank, row in enumerate(ranking):
+            fused[row["id"]] = fused.get(row["id"], 0.0) + 1.0 / (RRF_K + rank + 1)
+            rows.setdefault(row["id"], row)
+    order = sorted(fused, key=fused.get, reverse=True)[offset:offset + limit]
+    return [{**rows[i], "score": round(fused[i], 5)} for i in order]
+
+
+def _tiered_search(query, limit, offset, start_date, end_date, sort, cursor, content_fields) -> List[Dict]:
+    horizon = archive_horizon()
+    start_ts, end_ts = parse_date_range(start_date, end_date)
+    if horizon is None or (start_ts is not None and start_ts > horizon):
+        return _keyword_search(query, limit, offset, start_date, end_date, sort, cursor)
+
+    # Both tiers are read from the top, the page is cut from their union
+    by_date = not (query and sort == "relevance")
+    position = decode_cursor(cursor) if by_date and cursor else None
+    skip = 0 if position is not None else offset
+    depth = skip + limit
+    live = _keyword_search(query, depth, 0, start_date, end_date, sort, cursor)
+    if len(live) >= depth and not (by_date and live[-1]["published_ts"] <= horizon):
+        return live[skip:]
+
+    archived = search_archive(
+        query, depth if by_date else depth - len(live), start_ts, end_ts, position, content_fields
+    )
+    for row in archived:
+        row["archived"] = True
+    if by_date:
+        merged = sorted(live + archived, key=lambda row: (row["published_ts"], row["id"]), reverse=True)
+    else:
+        # No bm25 for archived rows: they rank after every live match, newest first
+        merged = live + archived
+    return merged[skip:depth]
+
+
+def _keyword_search(query, limit, offset, start_date, end_date, sort, cursor) -> List[Dict]:
+    columns = SELECT_COLUMNS
     if query:
-        sql += " AND (title LIKE ? OR content LIKE ?)"
-        kw = f"%{query}%"
-        params.extend([kw, kw])
+        sql = f"""
+            SELECT {columns}
+            FROM insights_fts
+            JOIN insights i ON i.id = insights_fts.rowid
+            WHERE insights_fts MATCH ?
+        """
+    else:
+        sql = f"""
+            SELECT {columns}
+            FROM insights i
+            WHERE 1=1
+        """
+    params = [query] if query else []
+
+    start_ts, end_ts = parse_date_range(start_date, end_date)
+    if start_ts is not None:
+        sql += " AND i.published_ts >= ?"
+        params.append(start_ts)
+    if end_ts is not None:
+        sql += " AND i.published_ts < ?"
+        params.append(end_ts)
+
+    if query and sort == "relevance":
+        sql += """
+            ORDER BY bm25(insights_fts, ?, 1.0)
+                - ? / (1.0 + (strftime('%s', 'now') - i.published_ts) / 86400.0 / ?)
+            LIMIT ? OFFSET ?
+        """
+        params.extend([TITLE_WEIGHT, FRESHNESS_WEIGHT, FRESHNESS_SCALE_DAYS, limit, offset])
+    else:
+        position = decode_cursor(cursor) if cursor else None
+        if position is not None:
+            sql += " AND (i.published_ts, i.id) < (?, ?)"
+            params.extend(position)
+        sql += " ORDER BY i.published_ts DESC, i.id DESC LIMIT ?"
+        params.append(limit)
+        if position is None and offset:
+            sql += " OFFSET ?"
+            params.append(offset)
+
+    with read_conn() as conn:
+        c = conn.cursor()
+        c.row_factory = sqlite3.Row
+        try:
+            return [dict(row) for row in c.execute(sql, params)]
+        except sqlite3.OperationalError:
+            if not query:
+                raise
+            # Not valid FTS5 syntax (stray quotes, "e-commerce"…): search the terms literally
+            params[0] = _fts_fallback_query(query)
+            return [dict(row) for row in c.execute(sql, params)] if params[0] else []
+
 
+def next_cursor(results: List[Dict], limit: int) -> Optional[str]:
+    """Keyset cursor for the page after `results`, None on the last page."""
+    if len(results) < limit:
+        return None
+    last = results[-1]
+    return encode_cursor(last["published_ts"], last["id"])
 
 
-    if start_date:
-        sql += " AND date(published_at) >= date(?)"
-        params.append(start_date)
-    if end_date:
-        sql += " AND date(published_at) <= date(?)"
-        params.append(end_date)
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """fields= as a list, None for "everything"; unknown names are a 400."""
+    if not fields:
+        return None
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = set(wanted) - set(RESULT_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return wanted
 
-    sql += " ORDER BY published_at DESC, inserted_at DESC LIMIT ? OFFSET ?"
-    params.extend([limit, offset])
 
-    results = [dict(row) for row in c.execute(sql, params)]
-    conn.close()
-    return results
+def body_fields(wanted: Optional[List[str]]) -> tuple:
+    """Bodies to load for a response: clean_text always (snippets, summary), raw content only if shown."""
+    return CONTENT_FIELDS if wanted is None or "content" in wanted else ("clean_text",)
+
+
+def project(insights: List[Dict], query: str, wanted: Optional[List[str]]) -> List[Dict]:
+    """Add the highlighted snippet and keep only the `wanted` fields (all when None)."""
+    projected = []
+    for insight in insights:
+        if wanted is None or "snippet" in wanted:
+            # Fresh, unsaved items only have their raw body
+            text = insight.get("clean_text")
+            if text is None:
+                text = normalize_text(insight.get("content"))
+            insight = {**insight, "snippet": highlight_snippet(text, query)}
+        if wanted is not None:
+            insight = {name: insight[name] for name in wanted if name in insight}
+        projected.append(insight)
+    return projected
+
+
+def source_tasks(query: str, limit: int) -> Dict:
+    """Upstream fetchers for a /search query, keyed by source name."""
+    return {
+        "newsapi": (fetch_newsapi, {"query": query, "page_size": limit}),
+        "gdelt": (fetch_gdelt, {"query": query, "max_records": limit}),
+        "google_rss": (fetch_google_news_rss, {"topic": query, "max_items": limit}),
+        "reddit": (fetch_reddit, {"subreddit": query.replace(" ", "_"), "limit": limit}),
+        "youtube_search": (fetch_youtube_search, {"query": query, "max_results": limit}),
+    }
 
 
 # 🔹 FastAPI route
@@ -63,37 +281,113 @@ def search_router(
     offset: int = 0,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    budget: Optional[float] = Query(None, gt=0, le=60, description="Latency budget in seconds for upstream fetches"),
+    sort: str = Query("relevance", pattern="^(relevance|date)$"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (sort=date)"),
+    mode: str = Query("keyword", pattern="^(keyword|semantic|hybrid)$"),
+    fields: Optional[str] = Query(None, description="Comma-separated result fields, e.g. id,title,url,snippet (default all)"),
 ):
+    wanted = parse_fields(fields)
     newly_fetched_insights = []
     existing_insights = []
+    source_status = {}
 
-    # Fetch from all sources and save to DB before searching
+    # Fetch from all sources concurrently (they save to DB as they go) and
+    # keep whatever arrived within the request budget
     if query:
-        # Fetch from all sources and save to DB
-        # These functions now return the fetched data as well
-        news_insights = fetch_newsapi(query=query, page_size=limit)
-        gdelt_insights = fetch_gdelt(query=query, max_records=limit)
-        google_news_insights = fetch_google_news_rss(topic=query, max_items=limit)
-        reddit_query = query.replace(" ", "_")
-        reddit_insights = fetch_reddit(subreddit=reddit_query, limit=limit)
-        youtube_insights = fetch_youtube_search(query=query, max_results=limit)
-
-        # Combine newly fetched insights
-        newly_fetched_insights = []
-        if news_insights: newly_fetched_insights.extend(news_insights)
-        if gdelt_insights: newly_fetched_insights.extend(gdelt_insights)
-        if google_news_insights: newly_fetched_insights.extend(google_news_insights)
-        if reddit_insights: newly_fetched_insights.extend(reddit_insights)
-        if youtube_insights: newly_fetched_insights.extend(youtube_insights)
+        newly_fetched_insights, source_status = federated_fetch(
+            source_tasks(query, limit), budget_s=budget
+        )
 
     # Retrieve existing insights from the database
-    existing_insights = search_insights(query, limit, offset, start_date, end_date)
+    existing_insights = search_insights(
+        query, limit, offset, start_date, end_date, sort, cursor, mode, content_fields=body_fields(wanted)
+    )
 
     # Combine existing and newly fetched insights for summarization
-    all_insights = existing_insights + newly_fetched_insights
+    # Fresh items are usually already in the DB results, and the same story
+    # arrives from several sources: fold them into one entry per story
+    all_insights = collapse_duplicates(existing_insights + newly_fetched_insights)
 
-    print(f"Total insights for summarization: {len(all_insights)} items")
-    print(f"All insights content: {all_insights}")
+    log.info("🔍 /search", extra={"query": query, "results": len(all_insights), "mode": mode})
+    log.debug("Insights for summarization: %s", all_insights)
     summary = summarize_insights(query, all_insights)
-    return {"results": all_insights, "summary": summary}
+    # Returned as a response so FastAPI doesn't walk the payload with jsonable_encoder first
+    return FastJSONResponse({
+        "results": project(all_insights, query, wanted),
+        "summary": summary,
+        "sources": source_status,
+        "next_cursor": next_cursor(existing_insights, limit) if sort == "date" else None,
+    })
+
+
+@router.get("/insights/{insight_id}")
+def insight_router(
+    insight_id: int,
+    fields: Optional[str] = Query(None, description="Comma-separated fields (default all, including content)"),
+):
+    """One stored insight with its full body, for clients that listed snippets first."""
+    wanted = parse_fields(fields)
+    rows = _rows_by_ids([insight_id], None, None)
+    if rows:
+        insight = attach_content([rows[insight_id]], body_fields(wanted))[0]
+    else:
+        insight = load_archived([insight_id], body_fields(wanted)).get(insight_id)
+        if insight is None:
+            raise HTTPException(status_code=404, detail="Insight not found")
+        insight["archived"] = True
+    if wanted is not None:
+        insight = project([insight], "", wanted)[0]
+    return FastJSONResponse(insight)
+
+
+def _ndjson(event: str, **payload) -> bytes:
+    return dumps({"event": event, **payload}) + b"\n"
+
+@router.get("/search/stream")
+def search_stream_router(
+    query: str = Query(..., description="Keyword(s) to search in title or content"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = 0,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    budget: Optional[float] = Query(None, gt=0, le=60, description="Latency budget in seconds for upstream fetches"),
+    sort: str = Query("relevance", pattern="^(relevance|date)$"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (sort=date)"),
+    mode: str = Query("keyword", pattern="^(keyword|semantic|hybrid)$"),
+    fields: Optional[str] = Query(None, description="Comma-separated result fields, e.g. id,title,url,snippet (default all)"),
+):
+    """
+    Streaming /search as NDJSON, one event per line:
+      {"event": "source", "source": ..., "status": {...}, "results": [...]}  per upstream, as it arrives
+      {"event": "db", "results": [...]}                                     stored matches
+      {"event": "token", "text": ...}                                       raw summary tokens
+      {"event": "summary" | "bullet" | "recommendation" | "citations", ...} parsed summary items
+      {"event": "summary_done", "summary": {...}}                           final summary
+    """
+    wanted = parse_fields(fields)
+
+    def events():
+        newly_fetched_insights = []
+        if query:
+            for name, insights, status in iter_federated(source_tasks(query, limit), budget_s=budget):
+                newly_fetched_insights.extend(insights)
+                yield _ndjson("source", source=name, status=status, results=project(insights, query, wanted))
+
+        existing_insights = search_insights(
+            query, limit, offset, start_date, end_date, sort, cursor, mode, content_fields=body_fields(wanted)
+        )
+        yield _ndjson(
+            "db",
+            results=project(existing_insights, query, wanted),
+            next_cursor=next_cursor(existing_insights, limit) if sort == "date" else None,
+        )
+
+        all_insights = collapse_duplicates(existing_insights + newly_fetched_insights)
+        for event, data in stream_summary(query, all_insights):
+            if event == "summary_done":
+                yield _ndjson(event, summary=data)
+            else:
+                yield _ndjson(event, text=data)
 
+    return StreamingResponse(events(), media_type="application/x-ndjson")
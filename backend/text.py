@@ -0,0 +1,250 @@
+# insightlens/backend/text.py
+
+import os
+import re
+import html
+import zlib
+from bs4 import BeautifulSoup
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; bodies are zlib-compressed without it
+    zstandard = None
+
+# Longest plain text kept per insight; transcripts beyond this add nothing
+# the prompt builder or the full-text index can use
+MAX_CLEAN_CHARS = int(os.getenv("INSIGHTLENS_MAX_CLEAN_CHARS", "50000"))
+
+# Codec for newly stored bodies: "zstd" (when installed) or "zlib". Every blob
+# records its own codec, so changing this never breaks reading older rows.
+CONTENT_CODEC = os.getenv("INSIGHTLENS_CONTENT_CODEC", "zstd" if zstandard else "zlib").lower()
+# Bodies shorter than this (in bytes) are stored as-is, compression would only grow them
+MIN_COMPRESS_BYTES = 64
+
+_RAW, _ZLIB, _ZSTD = b"r", b"z", b"s"
+
+# Length of the highlighted excerpt returned in place of full bodies
+SNIPPET_CHARS = int(os.getenv("INSIGHTLENS_SNIPPET_CHARS", "240"))
+
+_QUERY_TERM_RE = re.compile(r"\w+\*?")
+_QUERY_OPERATORS = {"AND", "OR", "NOT", "NEAR"}
+# FTS5 query tokens: phrases, parentheses, NEAR's comma, column filters, words
+_QUERY_TOKEN_RE = re.compile(r'"[^"]*"?\*?|[(),]|\w+\s*:|\w+\*?')
+_QUERY_STRAY_RE = re.compile(r'[^\w\s()*:,]')
+_QUERY_WORD_RE = re.compile(r"\w+")
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_TAG_HINT_RE = re.compile(r"<[a-zA-Z/!]")
+
+
+def normalize_text(content: str, max_chars: int = MAX_CLEAN_CHARS) -> str:
+    """Plain text for an insight body: strip HTML, unescape entities, collapse whitespace, cap length."""
+    if not content:
+        return ""
+    # Most bodies (transcripts, Reddit selftext) have no markup; skip the parser for those
+    if _TAG_HINT_RE.search(content):
+        content = BeautifulSoup(content, "html.parser").get_text(" ")
+    content = html.unescape(content)
+    content = _WHITESPACE_RE.sub(" ", content).strip()
+    if len(content) > max_chars:
+        content = content[:max_chars].rsplit(" ", 1)[0] + " …"
+    return content
+
+
+def compress_text(text: str) -> bytes:
+    """Stored form of a body: one codec byte, then the (usually compressed) UTF-8 text."""
+    data = (text or "").encode("utf-8")
+    if len(data) < MIN_COMPRESS_BYTES:
+        return _RAW + data
+    if CONTENT_CODEC == "zstd" and zstandard is not None:
+        return _ZSTD + zstandard.ZstdCompressor(level=3).compress(data)
+    return _ZLIB + zlib.compress(data, 6)
+
+
+def decompress_text(blob) -> str:
+    """Inverse of compress_text(); None stays None and plain strings pass through."""
+    if blob is None or isinstance(blob, str):
+        return blob
+    blob = bytes(blob)
+    codec, data = blob[:1], blob[1:]
+    if codec == _ZLIB:
+        data = zlib.decompress(data)
+    elif codec == _ZSTD:
+        if zstandard is None:
+            raise RuntimeError("content was stored with zstd; install the zstandard package to read it")
+        data = zstandard.ZstdDecompressor().decompress(data)
+    return data.decode("utf-8")
+
+
+def query_terms(query: str) -> list:
+    """Terms an FTS5-style query looks for: operators and NOT-ed terms dropped, prefix terms keep their *."""
+    terms = []
+    negated = False
+    for term in _QUERY_TERM_RE.findall(query or ""):
+        if term in _QUERY_OPERATORS:
+            negated = term == "NOT"
+        elif negated:
+            negated = False
+        else:
+            terms.append(term)
+    return terms
+
+
+def parse_query(query: str, columns=("title", "clean_text")):
+    """
+    Boolean structure of an FTS5 query, for matching text outside the index
+    the way MATCH does. Nodes: ("phrase", words, prefix) for a word, prefix
+    (term*) or quoted phrase; ("near", phrases, distance); ("column", name,
+    node); ("and" | "or" | "not", left, right). Follows FTS5's grammar:
+    juxtaposed phrases are an implicit AND binding tighter than NOT, then
+    AND, then OR, and a parenthesized group can't be juxtaposed. Input MATCH
+    would reject (unknown `columns` included) is read the way search.py
+    retries it, each whitespace-separated token a phrase. None when there is
+    nothing to match.
+    """
+    unquoted = re.sub(r'"[^"]*"', " ", query or "")
+    if not _QUERY_STRAY_RE.search(unquoted):
+        tokens = _QUERY_TOKEN_RE.findall(query or "")
+        try:
+            node, end = _parse_binary(tokens, 0, columns, 0)
+            if end == len(tokens):
+                return node
+        except (ValueError, IndexError):
+            pass
+    node = None
+    for token in (query or "").split():
+        words = _QUERY_WORD_RE.findall(token)
+        if words:
+            node = ("phrase", words, False) if node is None else ("and", node, ("phrase", words, False))
+    return node
+
+
+_QUERY_PRECEDENCE = ("OR", "AND", "NOT")
+NEAR_DEFAULT_DISTANCE = 10
+
+
+def _parse_binary(tokens: list, i: int, columns, level: int):
+    if level == len(_QUERY_PRECEDENCE):
+        return _parse_unit(tokens, i, columns)
+    operator = _QUERY_PRECEDENCE[level]
+    left, i = _parse_binary(tokens, i, columns, level + 1)
+    while i < len(tokens) and tokens[i] == operator:
+        right, i = _parse_binary(tokens, i + 1, columns, level + 1)
+        left = (operator.lower(), left, right)
+    return left, i
+
+
+def _parse_unit(tokens: list, i: int, columns):
+    """A parenthesized group (optionally column-filtered), or juxtaposed phrases."""
+    if tokens[i] == "(":
+        return _parse_group(tokens, i, columns)
+    if tokens[i].endswith(":") and tokens[i + 1] == "(":
+        name = _column(tokens[i], columns)
+        node, i = _parse_group(tokens, i + 1, columns)
+        return ("column", name, node), i
+    node, i = _parse_nearset(tokens, i, columns)
+    while i < len(tokens) and tokens[i] not in _QUERY_PRECEDENCE and tokens[i] not in (")", ","):
+        right, i = _parse_nearset(tokens, i, columns)
+        node = ("and", node, right)
+    return node, i
+
+
+def _parse_group(tokens: list, i: int, columns):
+    node, i = _parse_binary(tokens, i + 1, columns, 0)
+    if tokens[i] != ")":
+        raise ValueError("unbalanced parentheses")
+    return node, i + 1
+
+
+def _column(token: str, columns) -> str:
+    name = token[:-1].strip()
+    if name not in columns:
+        raise ValueError(f"no such column: {name}")
+    return name
+
+
+def _parse_nearset(tokens: list, i: int, columns):
+    """A phrase or NEAR group, optionally column-filtered."""
+    if tokens[i].endswith(":"):
+        name = _column(tokens[i], columns)
+        node, i = _parse_nearset(tokens, i + 1, columns)
+        return ("column", name, node), i
+    if tokens[i] == "NEAR" and i + 1 < len(tokens) and tokens[i + 1] == "(":
+        phrases, i = [], i + 2
+        while tokens[i] not in (")", ","):
+            phrase, i = _parse_phrase(tokens, i)
+            phrases.append(phrase)
+        distance = NEAR_DEFAULT_DISTANCE
+        if tokens[i] == ",":
+            distance, i = int(tokens[i + 1]), i + 2
+        if not phrases or tokens[i] != ")":
+            raise ValueError("malformed NEAR group")
+        return ("near", phrases, distance), i + 1
+    return _parse_phrase(tokens, i)
+
+
+def _parse_phrase(tokens: list, i: int):
+    token = tokens[i]
+    if token in _QUERY_OPERATORS or token in ("(", ")", ",") or token.endswith(":"):
+        raise ValueError(f"unexpected {token}")
+    if token.startswith('"') and (token.rstrip("*") == '"' or not token.rstrip("*").endswith('"')):
+        raise ValueError("unterminated phrase")
+    words = _QUERY_WORD_RE.findall(token)
+    if not words:
+        raise ValueError("empty phrase")
+    return ("phrase", words, token.endswith("*")), i + 1
+
+
+def _query_pattern(query: str):
+    """Regex for the terms of an FTS5-style query (operators dropped, term* as prefix)."""
+    terms = set()
+    for term in query_terms(query):
+        word = re.escape(term.rstrip("*"))
+        terms.add(word + r"\w*" if term.endswith("*") else word)
+    if not terms:
+        return None
+    return re.compile(r"\b(?:" + "|".join(sorted(terms, key=len, reverse=True)) + r")\b", re.IGNORECASE)
+
+
+def highlight_snippet(text: str, query: str, max_chars: int = SNIPPET_CHARS) -> str:
+    """
+    About max_chars of `text` around the densest run of query terms,
+    HTML-escaped, with every match wrapped in <mark>. The start of the
+    text when nothing matches (semantic hits, empty queries).
+    """
+    if not text:
+        return ""
+    pattern = _query_pattern(query)
+    matches = list(pattern.finditer(text)) if pattern else []
+    start = 0
+    if matches:
+        # Two pointers over the matches: the window with the most of them
+        best_first, best_last, first = 0, 0, 0
+        for last, match in enumerate(matches):
+            while match.end() - matches[first].start() > max_chars:
+                first += 1
+            if last - first > best_last - best_first:
+                best_first, best_last = first, last
+        span = matches[best_last].end() - matches[best_first].start()
+        start = max(0, matches[best_first].start() - (max_chars - span) // 2)
+        if start:
+            # Begin on a word boundary
+            space = text.find(" ", start, matches[best_first].start())
+            start = space + 1 if space != -1 else start
+    end = min(len(text), start + max_chars)
+    if end < len(text):
+        space = text.rfind(" ", start, end)
+        end = space if space > start else end
+
+    parts = ["… "] if start else []
+    pos = start
+    for match in matches:
+        if match.start() < start or match.end() > end:
+            continue
+        parts.append(html.escape(text[pos:match.start()]))
+        parts.append(f"<mark>{html.escape(match.group())}</mark>")
+        pos = match.end()
+    parts.append(html.escape(text[pos:end]))
+    if end < len(text):
+        parts.append(" …")
+    return "".join(parts)
@@ -0,0 +1,56 @@
+# insightlens/backend/timestamps.py
+
+import re
+import calendar
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Tuple
+
+_GDELT_RE = re.compile(r"^\d{8}T\d{6}Z$")
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def parse_timestamp(value) -> Optional[int]:
+    """
+    Epoch seconds (UTC) for the timestamp formats our sources emit: ISO 8601
+    (RSS, Reddit, NewsAPI, YouTube), GDELT's 20240101T120000Z seendate,
+    RFC 2822 dates, plain dates and epoch numbers. None if unparseable.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    value = str(value).strip()
+    if _GDELT_RE.match(value):
+        return calendar.timegm(datetime.strptime(value, "%Y%m%dT%H%M%SZ").timetuple())
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            dt = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def parse_date_range(start_date: Optional[str], end_date: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """[start, end) epoch bounds for the /search date filters. A plain end date includes that whole day."""
+    start = parse_timestamp(start_date) if start_date else None
+    end = parse_timestamp(end_date) if end_date else None
+    if end is not None and _DATE_RE.match(end_date.strip()):
+        end += 86400
+    return start, end
+
+
+def encode_cursor(published_ts: int, insight_id: int) -> str:
+    return f"{published_ts}_{insight_id}"
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[int, int]]:
+    try:
+        published_ts, insight_id = cursor.split("_")
+        return int(published_ts), int(insight_id)
+    except (AttributeError, ValueError):
+        return None
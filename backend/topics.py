@@ -0,0 +1,297 @@
+# insightlens/backend/topics.py
+
+import logging
+import os
+import re
+import json
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+import numpy as np
+from fastapi import APIRouter, Query
+
+from .db import get_conn, read_conn, register_post_write_hook, register_content_hook
+from .text import decompress_text
+from .timestamps import parse_date_range
+from .vectors import VECTOR_DIM, embed, doc_text
+
+log = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Single-pass threshold clustering: a new insight joins the topic whose
+# centroid is most similar if the cosine reaches TOPIC_THRESHOLD, otherwise
+# it starts a new topic. Centroids are running sums, so joining is O(dim).
+TOPIC_THRESHOLD = float(os.getenv("INSIGHTLENS_TOPIC_THRESHOLD", "0.5"))
+TERMS_KEPT = 50          # running term counts stored per topic
+TOP_TERMS = 8            # terms returned as the topic's label
+ASSIGN_BATCH = 500
+UNCLUSTERED = 0          # topic_id for insights without any usable text
+
+_WORD_RE = re.compile(r"[^\W\d_]{3,}", re.UNICODE)
+STOPWORDS = {
+    "the", "and", "for", "that", "with", "this", "from", "are", "was", "were", "has", "have",
+    "had", "but", "not", "you", "your", "our", "their", "its", "his", "her", "they", "them",
+    "will", "would", "can", "could", "should", "about", "into", "over", "more", "most", "than",
+    "also", "just", "what", "when", "where", "which", "who", "why", "how", "all", "any", "new",
+    "out", "now", "one", "two", "after", "before", "been", "being", "said", "says", "some",
+    "there", "here", "these", "those", "such", "only", "other", "very", "like", "get", "got",
+    "want", "know", "need", "make", "think", "really", "even", "much", "many", "well", "way",
+    "see", "going", "anyone", "something", "actually", "people", "time", "use", "using",
+    "via", "per", "amp", "http", "https", "www", "com", "href", "video", "news",
+}
+
+
+def _terms(title: str, text: str) -> Counter:
+    words = _WORD_RE.findall(f"{title or ''} {(text or '')[:500]}".lower())
+    return Counter(w for w in words if w not in STOPWORDS)
+
+
+def _meta(conn, key: str) -> Optional[str]:
+    row = conn.execute("SELECT value FROM vector_meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+class _Centroids:
+    """In-memory view of the topics table for one assignment pass."""
+
+    def __init__(self, conn):
+        rows = conn.execute("SELECT id, centroid, size, terms FROM topics ORDER BY id").fetchall()
+        self.ids = [r[0] for r in rows]
+        self.sizes = [r[2] for r in rows]
+        self.terms = [Counter(json.loads(r[3])) for r in rows]
+        capacity = max(64, len(rows) * 2)
+        self.sums = np.zeros((capacity, VECTOR_DIM), dtype=np.float32)
+        self.unit = np.zeros((capacity, VECTOR_DIM), dtype=np.float32)
+        for i, r in enumerate(rows):
+            self.sums[i] = np.frombuffer(r[1], dtype=np.float32)
+            self.unit[i] = self.sums[i] / (np.linalg.norm(self.sums[i]) or 1.0)
+        self.dirty = set()
+
+    def best(self, vec: np.ndarray):
+        if not self.ids:
+            return None, 0.0
+        scores = self.unit[:len(self.ids)] @ vec
+        i = int(np.argmax(scores))
+        return i, float(scores[i])
+
+    def add(self, conn, vec: np.ndarray, now: int) -> int:
+        cursor = conn.execute(
+            "INSERT INTO topics (centroid, size, terms, created_at, updated_at) VALUES (?, 0, '{}', ?, ?)",
+            (vec.tobytes(), now, now),
+        )
+        if len(self.ids) == len(self.sums):
+            self.sums = np.vstack([self.sums, np.zeros_like(self.sums)])
+            self.unit = np.vstack([self.unit, np.zeros_like(self.unit)])
+        self.ids.append(cursor.lastrowid)
+        self.sizes.append(0)
+        self.terms.append(Counter())
+        return len(self.ids) - 1
+
+    def join(self, i: int, vec: np.ndarray, terms: Counter):
+        self.sums[i] += vec
+        self.unit[i] = self.sums[i] / (np.linalg.norm(self.sums[i]) or 1.0)
+        self.sizes[i] += 1
+        self.terms[i].update(terms)
+        if len(self.terms[i]) > TERMS_KEPT * 2:
+            self.terms[i] = Counter(dict(self.terms[i].most_common(TERMS_KEPT)))
+        self.dirty.add(i)
+
+    def save(self, conn, now: int):
+        conn.executemany(
+            "UPDATE topics SET centroid = ?, size = ?, terms = ?, updated_at = ? WHERE id = ?",
+            [
+                (self.sums[i].tobytes(), self.sizes[i],
+                 json.dumps(dict(self.terms[i].most_common(TERMS_KEPT))), now, self.ids[i])
+                for i in self.dirty
+            ],
+        )
+        self.dirty.clear()
+
+
+def _reset_topics(conn):
+    conn.execute("DELETE FROM topics")
+    conn.execute("DELETE FROM topic_counts")
+    conn.execute("UPDATE insights SET topic_id = NULL WHERE topic_id IS NOT NULL")
+
+
+def assign_topics(conn) -> int:
+    """
+    Assign every insight without a topic_id to a topic, updating centroids,
+    term counts and the per-day counts. Runs as a post-write hook after the
+    vector index, and re-clusters from scratch if the embedding model changed.
+    """
+    if embed("") is None:   # no embedding model fitted yet
+        return 0
+    model_id = _meta(conn, "model_id")
+    if _meta(conn, "topics_model") != model_id:
+        _reset_topics(conn)
+        conn.execute("INSERT OR REPLACE INTO vector_meta (key, value) VALUES ('topics_model', ?)", (model_id,))
+
+    centroids = None
+    assigned = 0
+    while True:
+        rows = conn.execute("""
+            SELECT i.id, i.source, i.title, COALESCE(b.clean_text, b.content), i.published_ts
+            FROM (SELECT id, source, title, published_ts FROM insights WHERE topic_id IS NULL ORDER BY id LIMIT ?) i
+            LEFT JOIN insight_content b ON b.id = i.id
+            ORDER BY i.id
+        """, (ASSIGN_BATCH,)).fetchall()
+        if not rows:
+            return assigned
+        if centroids is None:
+            centroids = _Centroids(conn)
+        now = int(time.time())
+        updates = []
+        counts = Counter()
+        for insight_id, source, title, text, published_ts in rows:
+            text = decompress_text(text)
+            vec = embed(doc_text(title, text))
+            if not np.any(vec):
+                updates.append((UNCLUSTERED, insight_id))
+                continue
+            i, score = centroids.best(vec)
+            if i is None or score < TOPIC_THRESHOLD:
+                i = centroids.add(conn, vec, now)
+            centroids.join(i, vec, _terms(title, text))
+            topic_id = centroids.ids[i]
+            updates.append((topic_id, insight_id))
+            counts[(topic_id, (published_ts or now) // 86400, source)] += 1
+        centroids.save(conn, now)
+        conn.executemany("UPDATE insights SET topic_id = ? WHERE id = ?", updates)
+        conn.executemany("""
+            INSERT INTO topic_counts (topic_id, day, source, n) VALUES (?, ?, ?, ?)
+            ON CONFLICT(topic_id, day, source) DO UPDATE SET n = n + excluded.n
+        """, [(t, d, s, n) for (t, d, s), n in counts.items()])
+        assigned += len(rows)
+
+
+def unassign_changed(conn, changes: list) -> int:
+    """
+    Take insights whose body was replaced out of their topic (content hook):
+    the old text's vector and terms leave the centroid, the insight leaves
+    the per-day counts, and topic_id goes back to NULL for assign_topics.
+    """
+    if embed("") is None:
+        return 0
+    now = int(time.time())
+    removed = 0
+    for change in changes:
+        row = conn.execute("""
+            SELECT t.id, t.centroid, t.size, t.terms FROM insights i JOIN topics t ON t.id = i.topic_id
+            WHERE i.id = ?
+        """, (change["id"],)).fetchone()
+        conn.execute("UPDATE insights SET topic_id = NULL WHERE id = ?", (change["id"],))
+        if row is None:     # not assigned yet, or UNCLUSTERED
+            continue
+        topic_id, centroid, size, terms = row
+        sums = np.frombuffer(centroid, dtype=np.float32) - embed(doc_text(change["title"], change["old_text"]))
+        terms = Counter(json.loads(terms))
+        terms.subtract(_terms(change["title"], change["old_text"]))
+        conn.execute(
+            "UPDATE topics SET centroid = ?, size = ?, terms = ?, updated_at = ? WHERE id = ?",
+            (sums.tobytes(), max(size - 1, 0), json.dumps(dict(+terms)), now, topic_id),
+        )
+        conn.execute(
+            "UPDATE topic_counts SET n = n - 1 WHERE topic_id = ? AND day = ? AND source = ? AND n > 0",
+            (topic_id, (change["published_ts"] or now) // 86400, change["source"]),
+        )
+        removed += 1
+    return removed
+
+
+def ensure_topics():
+    """Cluster insights stored before the topic engine (or the embedding model) existed."""
+    conn = get_conn()
+    try:
+        with conn:
+            count = assign_topics(conn)
+        if count:
+            log.info(f"🗂️ Assigned topics for {count} insights")
+    finally:
+        conn.close()
+
+
+def _window_counts(conn, start_ts: int, end_ts: int) -> Dict[int, Counter]:
+    per_topic = {}
+    for topic_id, source, n in conn.execute("""
+        SELECT topic_id, source, SUM(n) FROM topic_counts
+        WHERE day >= ? AND day <= ? AND topic_id != ?
+        GROUP BY topic_id, source
+    """, (start_ts // 86400, (end_ts - 1) // 86400, UNCLUSTERED)):
+        per_topic.setdefault(topic_id, Counter())[source] = n
+    return per_topic
+
+
+def topics_in_window(start_ts: int, end_ts: int, limit: int = 20, min_count: int = 2) -> List[Dict]:
+    """
+    Largest topics by insights published in [start_ts, end_ts), with their
+    terms, per-source counts, the count in the preceding window of the same
+    length, and a few recent example insights. Windows are whole UTC days.
+    """
+    with read_conn() as conn:
+        return _topics_in_window(conn, start_ts, end_ts, limit, min_count)
+
+
+def _topics_in_window(conn, start_ts: int, end_ts: int, limit: int, min_count: int) -> List[Dict]:
+    current = _window_counts(conn, start_ts, end_ts)
+    ranked = sorted(
+        ((sum(c.values()), topic_id) for topic_id, c in current.items() if sum(c.values()) >= min_count),
+        reverse=True,
+    )[:limit]
+    if not ranked:
+        return []
+    previous = _window_counts(conn, 2 * start_ts - end_ts, start_ts)
+    ids = [topic_id for _, topic_id in ranked]
+    info = {
+        row[0]: row[1:]
+        for row in conn.execute(
+            "SELECT id, size, terms, created_at FROM topics WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(ids),),
+        )
+    }
+    topics = []
+    for count, topic_id in ranked:
+        size, terms, created_at = info.get(topic_id, (0, "{}", None))
+        examples = conn.execute("""
+            SELECT id, source, title, url, published_at FROM insights
+            WHERE topic_id = ? AND published_ts >= ? AND published_ts < ?
+            ORDER BY published_ts DESC LIMIT 3
+        """, (topic_id, start_ts, end_ts)).fetchall()
+        top_terms = [term for term, _ in Counter(json.loads(terms)).most_common(TOP_TERMS)]
+        topics.append({
+            "id": topic_id,
+            "label": ", ".join(top_terms[:3]),
+            "terms": top_terms,
+            "count": count,
+            "previous_count": sum(previous.get(topic_id, Counter()).values()),
+            "sources": dict(current[topic_id].most_common()),
+            "total_size": size,
+            "created_at": created_at,
+            "examples": [
+                {"id": e[0], "source": e[1], "title": e[2], "url": e[3], "published_at": e[4]}
+                for e in examples
+            ],
+        })
+    return topics
+
+
+register_post_write_hook(assign_topics)
+register_content_hook(unassign_changed)
+
+
+@router.get("/topics")
+def list_topics(
+    days: int = Query(7, ge=1, le=365, description="Window length ending now, ignored when start_date is set"),
+    start_date: Optional[str] = Query(None, description="YYYY-MM-DD or ISO 8601"),
+    end_date: Optional[str] = Query(None, description="YYYY-MM-DD or ISO 8601"),
+    limit: int = Query(20, ge=1, le=100),
+    min_count: int = Query(2, ge=1),
+):
+    start_ts, end_ts = parse_date_range(start_date, end_date)
+    if end_ts is None:
+        end_ts = int(time.time())
+    if start_ts is None:
+        start_ts = end_ts - days * 86400
+    return {"topics": topics_in_window(start_ts, end_ts, limit, min_count)}
@@ -0,0 +1,258 @@
+# insightlens/backend/vectors.py
+
+import logging
+import os
+import re
+import uuid
+import zlib
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .db import DB_PATH, get_conn, register_post_write_hook, register_content_hook
+from .text import decompress_text
+
+log = logging.getLogger(__name__)
+
+# Offline LSA embeddings: hashed TF-IDF features reduced by a truncated SVD
+# fitted on a sample of the corpus. Row i of the vector file is insights.id i.
+VECTOR_DIR = Path(os.getenv("INSIGHTLENS_VECTOR_DIR", str(DB_PATH.parent / "vectors")))
+HASH_DIM = 2 ** 15
+VECTOR_DIM = int(os.getenv("INSIGHTLENS_VECTOR_DIM", "128"))
+FIT_SAMPLE = int(os.getenv("INSIGHTLENS_VECTOR_FIT_SAMPLE", "20000"))
+MIN_FIT_DOCS = 200
+SCAN_CHUNK_ROWS = 1 << 16
+INDEX_BATCH = 1000
+
+_WORD_RE = re.compile(r"\w\w+", re.UNICODE)
+_lock = threading.RLock()
+_model = None   # (components (HASH_DIM x VECTOR_DIM), idf (HASH_DIM,))
+_stale_warned = False
+
+
+def _model_path() -> Path:
+    return VECTOR_DIR / "model.npz"
+
+def _vectors_path() -> Path:
+    return VECTOR_DIR / "vectors.f32"
+
+
+def _features(text: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Hashed unigram + bigram counts, log-scaled: (indices, weights) with unique indices."""
+    words = [w.lower() for w in _WORD_RE.findall(text or "")]
+    tokens = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    if not tokens:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    hashed = np.fromiter((zlib.crc32(t.encode("utf-8")) for t in tokens), dtype=np.int64, count=len(tokens)) % HASH_DIM
+    idx, counts = np.unique(hashed, return_counts=True)
+    return idx, np.log1p(counts).astype(np.float32)
+
+
+def doc_text(title: str, clean_text: str) -> str:
+    # Title twice: it is the densest description of what the item is about
+    return f"{title or ''} {title or ''} {(clean_text or '')[:5000]}"
+
+
+def fit_model(conn, sample: int = FIT_SAMPLE, seed: int = 0) -> bool:
+    """Fit IDF weights and an LSA projection on a sample of stored insights (randomized SVD)."""
+    # Sample first, so only the sampled bodies are decompressed
+    rows = conn.execute("""
+        SELECT i.title, COALESCE(b.clean_text, b.content)
+        FROM (SELECT id, title FROM insights ORDER BY random() LIMIT ?) i
+        LEFT JOIN insight_content b ON b.id = i.id
+    """, (sample,)).fetchall()
+    if len(rows) < MIN_FIT_DOCS:
+        return False
+    docs = [_features(doc_text(title, decompress_text(text))) for title, text in rows]
+
+    df = np.zeros(HASH_DIM, dtype=np.float32)
+    for idx, _ in docs:
+        df[idx] += 1
+    idf = (np.log((1 + len(docs)) / (1 + df)) + 1).astype(np.float32)
+
+    # Randomized range finder over the sparse TF-IDF rows, then an exact SVD
+    # of the small (k x HASH_DIM) projection
+    k = min(VECTOR_DIM + 16, len(docs))
+    rng = np.random.default_rng(seed)
+    omega = rng.standard_normal((HASH_DIM, k)).astype(np.float32)
+    y = np.zeros((len(docs), k), dtype=np.float32)
+    for i, (idx, weights) in enumerate(docs):
+        y[i] = (weights * idf[idx]) @ omega[idx]
+    q, _ = np.linalg.qr(y)
+    b = np.zeros((k, HASH_DIM), dtype=np.float32)
+    for i, (idx, weights) in enumerate(docs):
+        b[:, idx] += np.outer(q[i], weights * idf[idx])
+    _, _, vt = np.linalg.svd(b, full_matrices=False)
+
+    dim = min(VECTOR_DIM, vt.shape[0])
+    components = np.zeros((HASH_DIM, VECTOR_DIM), dtype=np.float32)
+    components[:, :dim] = vt[:dim].T
+    VECTOR_DIR.mkdir(parents=True, exist_ok=True)
+    global _model
+    # Under the lock index_pending writes with, so no batch lands in the old file
+    # between the unlink and the model switch
+    with _lock:
+        np.savez(_model_path(), components=components, idf=idf)
+        # Vectors from an older model live in a different space: re-embed everything.
+        # model_id lets consumers (backend.topics) notice the switch too.
+        _vectors_path().unlink(missing_ok=True)
+        conn.execute(
+            "INSERT OR REPLACE INTO vector_meta (key, value) VALUES ('indexed_upto', '0'), ('model_id', ?)",
+            (uuid.uuid4().hex,),
+        )
+        _model = (components, idf)
+    log.info(f"🧮 Fitted {VECTOR_DIM}-d text embedding on {len(docs)} insights")
+    return True
+
+
+def _load_model():
+    """
+    The fitted model, None when there is none yet. A saved model of another
+    shape than HASH_DIM x VECTOR_DIM (INSIGHTLENS_VECTOR_DIM changed) counts
+    as none, so ensure_index() fits a new one and re-embeds everything.
+    """
+    global _model, _stale_warned
+    with _lock:
+        if _model is None and _model_path().exists():
+            data = np.load(_model_path())
+            if data["components"].shape != (HASH_DIM, VECTOR_DIM):
+                if not _stale_warned:
+                    log.warning(
+                        f"⚠️ Saved embedding model is {data['components'].shape[1]}-d but "
+                        f"INSIGHTLENS_VECTOR_DIM is {VECTOR_DIM}, it will be refitted"
+                    )
+                    _stale_warned = True
+                return None
+            _model = (data["components"], data["idf"])
+        return _model
+
+
+def embed(text: str) -> Optional[np.ndarray]:
+    model = _load_model()
+    if model is None:
+        return None
+    components, idf = model
+    idx, weights = _features(text)
+    vec = (weights * idf[idx]) @ components[idx] if len(idx) else np.zeros(VECTOR_DIM, dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    return (vec / norm).astype(np.float32) if norm > 0 else vec.astype(np.float32)
+
+
+# -------------------------------
+# Memory-mapped vector store
+# -------------------------------
+def _row_count() -> int:
+    path = _vectors_path()
+    return path.stat().st_size // (VECTOR_DIM * 4) if path.exists() else 0
+
+def _write_vectors(ids: List[int], vectors: np.ndarray):
+    """Write rows at their insight ids, growing the file (by doubling) as needed."""
+    path = _vectors_path()
+    VECTOR_DIR.mkdir(parents=True, exist_ok=True)
+    needed = max(ids) + 1
+    rows = _row_count()
+    if needed > rows:
+        with open(path, "ab") as f:
+            f.truncate(max(needed, rows * 2, 1024) * VECTOR_DIM * 4)
+        rows = _row_count()
+    store = np.memmap(path, dtype=np.float32, mode="r+", shape=(rows, VECTOR_DIM))
+    store[ids] = vectors
+    store.flush()
+    del store
+
+
+def _indexed_upto(conn) -> int:
+    row = conn.execute("SELECT value FROM vector_meta WHERE key = 'indexed_upto'").fetchone()
+    return int(row[0]) if row else 0
+
+def index_pending(conn) -> int:
+    """
+    Embed every insight with an id above the indexed_upto mark. Runs as a
+    post-write hook of the insert pipeline, so new rows are searchable as
+    soon as they are committed. No-op until a model has been fitted.
+    """
+    if _load_model() is None:
+        return 0
+    upto = _indexed_upto(conn)
+    total = 0
+    with _lock:
+        while True:
+            rows = conn.execute("""
+                SELECT i.id, i.title, COALESCE(b.clean_text, b.content)
+                FROM insights i LEFT JOIN insight_content b ON b.id = i.id
+                WHERE i.id > ? ORDER BY i.id LIMIT ?
+            """, (upto, INDEX_BATCH)).fetchall()
+            if not rows:
+                break
+            ids = [r[0] for r in rows]
+            _write_vectors(ids, np.stack([embed(doc_text(title, decompress_text(text))) for _, title, text in rows]))
+            upto = ids[-1]
+            total += len(rows)
+            conn.execute("INSERT OR REPLACE INTO vector_meta (key, value) VALUES ('indexed_upto', ?)", (str(upto),))
+    return total
+
+def reindex_changed(conn, changes: list) -> int:
+    """
+    Re-embed insights whose body was replaced after index_pending covered
+    them (content hook); rows above the mark are embedded by index_pending.
+    """
+    if _load_model() is None:
+        return 0
+    upto = _indexed_upto(conn)
+    latest = {change["id"]: change for change in changes if change["id"] <= upto}
+    if not latest:
+        return 0
+    with _lock:
+        _write_vectors(
+            list(latest),
+            np.stack([embed(doc_text(change["title"], change["new_text"])) for change in latest.values()]),
+        )
+    return len(latest)
+
+def ensure_index():
+    """Fit the model if there is none yet and catch the vector file up with the table."""
+    conn = get_conn()
+    try:
+        with conn:
+            if _load_model() is None and not fit_model(conn):
+                return
+            count = index_pending(conn)
+        if count:
+            log.info(f"🧮 Embedded {count} insights")
+    finally:
+        conn.close()
+
+
+def nearest(query: str, k: int) -> List[Tuple[int, float]]:
+    """
+    Brute-force cosine top-k over the memory-mapped matrix, scanned in chunks
+    so only SCAN_CHUNK_ROWS rows are resident at a time. Returns (id, score).
+    """
+    q = embed(query)
+    rows = _row_count()
+    if q is None or rows == 0 or not np.any(q):
+        return []
+    try:
+        store = np.memmap(_vectors_path(), dtype=np.float32, mode="r", shape=(rows, VECTOR_DIM))
+    except FileNotFoundError:   # a refit just dropped the file
+        return []
+    best_ids = np.empty(0, dtype=np.int64)
+    best_scores = np.empty(0, dtype=np.float32)
+    for start in range(0, rows, SCAN_CHUNK_ROWS):
+        scores = store[start:start + SCAN_CHUNK_ROWS] @ q
+        take = min(k, len(scores))
+        top = np.argpartition(-scores, take - 1)[:take]
+        best_ids = np.concatenate([best_ids, top + start])
+        best_scores = np.concatenate([best_scores, scores[top]])
+        if len(best_ids) > k:
+            keep = np.argpartition(-best_scores, k - 1)[:k]
+            best_ids, best_scores = best_ids[keep], best_scores[keep]
+    order = np.argsort(-best_scores)
+    # Unindexed rows and id gaps are all-zero and score 0
+    return [(int(best_ids[i]), float(best_scores[i])) for i in order if best_scores[i] > 0]
+
+
+register_post_write_hook(index_pending)
+register_content_hook(reindex_changed)
@@ -0,0 +1,50 @@
+# insightlens/bench/corpus.py
+
+import random
+
+# Small tech-news vocabulary; words are drawn with a Zipf-like skew so that
+# FTS queries hit both common and rare terms, much like the real corpus.
+COMPANIES = [
+    "OpenAI", "Anthropic", "Google", "Microsoft", "Meta", "Nvidia", "Apple", "Amazon",
+    "Stripe", "Shopify", "Salesforce", "Databricks", "Snowflake", "Mistral", "Cohere", "Perplexity",
+]
+TOPICS = [
+    "AI agents", "LLM inference", "open source models", "SaaS pricing", "startup funding",
+    "chip export rules", "data centers", "cybersecurity breach", "e-commerce growth",
+    "fintech regulation", "developer tools", "cloud costs", "robotics", "quantum computing",
+    "layoffs", "IPO market", "AI regulation", "search ads", "edge computing", "battery supply",
+]
+VERBS = ["launches", "raises", "acquires", "cuts", "expands", "delays", "unveils", "partners with", "sues", "doubles down on"]
+FILLER = (
+    "the company said in a statement that customers and investors are watching the market "
+    "closely as competition grows analysts expect revenue margins users enterprise pricing "
+    "platform demand quarter growth deal team product launch rollout strategy report"
+).split()
+SOURCES = ["newsapi", "gdelt", "google_rss", "reddit", "youtube_search", "youtube_trending"]
+
+# Queries used by the search benchmark: plain terms, AND-ed terms, phrases,
+# prefixes and a hyphenated term that takes the quoted-terms fallback path.
+QUERIES = [
+    "Nvidia", "startup funding", "\"AI agents\"", "OpenAI OR Anthropic", "regulation",
+    "cloud costs", "robot*", "e-commerce", "Stripe acquires", "quantum",
+]
+
+
+def _zipf_weights(n: int) -> list:
+    # P(i) ~ 1/(i+1)
+    return [1.0 / (i + 1) for i in range(n)]
+
+_COMPANY_WEIGHTS = _zipf_weights(len(COMPANIES))
+_TOPIC_WEIGHTS = _zipf_weights(len(TOPICS))
+
+
+def synthetic_item(rng: random.Random):
+    """(title, text) for one synthetic news item."""
+    company = rng.choices(COMPANIES, _COMPANY_WEIGHTS)[0]
+    topic = rng.choices(TOPICS, _TOPIC_WEIGHTS)[0]
+    title = f"{company} {rng.choice(VERBS)} {topic}"
+    words = [rng.choice(FILLER) for _ in range(rng.randint(30, 120))]
+    # Mention another company and the topic again somewhere in the body
+    words.insert(rng.randrange(len(words)), rng.choices(COMPANIES, _COMPANY_WEIGHTS)[0])
+    words.insert(rng.randrange(len(words)), topic)
+    return title, f"{company} {topic}: " + " ".join(words) + "."
@@ -0,0 +1,318 @@
+# insightlens/bench/run.py
+"""
+Offline benchmarks: ingestion throughput against local upstream stubs,
+search latency and prompt-build time on synthetic databases.
+
+    python -m bench.run                                  # 10k-row DB
+    python -m bench.run --rows 10000 1000000 10000000
+    python -m bench.run --latency-ms 80 --jitter-ms 40 --error-rate 0.05
+    python -m bench.run --compare bench/results/20250101-120000.json
+
+Synthetic databases are kept in bench/data/ and reused between runs.
+Results go to bench/results/<timestamp>.json. Each phase runs in its own
+process because the backend reads its configuration (DB path, upstream
+overrides) at import time.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import platform
+import subprocess
+import tempfile
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT = BENCH_DIR.parent
+DATA_DIR = BENCH_DIR / "data"
+RESULTS_DIR = BENCH_DIR / "results"
+
+# kwargs of backend.jobs.INGEST_SOURCES that set the page size
+PAGE_SIZE_KWARGS = {
+    "google_rss": "max_items",
+    "newsapi": "page_size",
+    "reddit": "limit",
+    "youtube_trending": "max_results",
+    "youtube_search": "max_results",
+    "gdelt": "max_records",
+}
+
+
+def percentiles(samples_ms: list) -> dict:
+    ordered = sorted(samples_ms)
+    n = len(ordered)
+    if not n:
+        return {"n": 0}
+
+    def rank(p):
+        return round(ordered[min(n - 1, max(0, math.ceil(p / 100 * n) - 1))], 3)
+
+    return {"n": n, "mean": round(sum(ordered) / n, 3), "p50": rank(50), "p95": rank(95), "p99": rank(99)}
+
+
+def _timed(fn, iterations: int, warmup: int = 3) -> dict:
+    """Latency percentiles (ms) of fn(i) over `iterations` calls."""
+    for i in range(warmup):
+        fn(i)
+    samples = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - started) * 1000)
+    return percentiles(samples)
+
+
+def _start_stub(args):
+    from .stubs import UpstreamStub
+
+    stub = UpstreamStub(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        replay_dir=args.replay_dir, seed=args.seed, items=args.page_size,
+    ).start()
+    os.environ["INSIGHTLENS_UPSTREAM_OVERRIDES"] = stub.overrides()
+    return stub
+
+
+def _lift_rate_limits(stub):
+    from backend.ingest import http_client
+
+    http_client.HOST_LIMITS[stub.base_url.split("://", 1)[1]] = (1e6, 1_000_000)
+
+
+# -------------------------------
+# Phases (run in child processes)
+# -------------------------------
+def phase_ingest(args) -> dict:
+    stub = _start_stub(args)
+    import main
+    from backend.db import get_conn
+    from backend.jobs import INGEST_SOURCES
+
+    if not args.keep_rate_limits:
+        _lift_rate_limits(stub)
+    for name, (_, kwargs) in INGEST_SOURCES.items():
+        kwargs[PAGE_SIZE_KWARGS[name]] = args.page_size
+
+    def count():
+        conn = get_conn()
+        n = conn.execute("SELECT COUNT(*) FROM insights").fetchone()[0]
+        conn.close()
+        return n
+
+    main.run_ingestion()   # warm-up: schema, first crawl, embedding model fit
+    rounds = []
+    before = count()
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        round_started = time.perf_counter()
+        round_before = count()
+        main.run_ingestion()
+        rounds.append({"rows": count() - round_before, "seconds": round(time.perf_counter() - round_started, 3)})
+    seconds = time.perf_counter() - started
+    rows = count() - before
+    stub.stop()
+    return {
+        "rounds": rounds,
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_s": round(rows / seconds, 1) if seconds else None,
+        "stub_requests": stub.requests,
+        "stub_errors": stub.errors,
+    }
+
+
+def phase_search(args) -> dict:
+    stub = _start_stub(args)
+    from .synth import build_synthetic_db
+    from .corpus import QUERIES
+
+    build_s = build_synthetic_db(args.rows, args.seed)
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from backend.search import search_insights, next_cursor, router
+    from backend.llm import plan_prompt
+
+    if not args.keep_rate_limits:
+        _lift_rate_limits(stub)
+
+    def query(i):
+        return QUERIES[i % len(QUERIES)]
+
+    month_ago = time.strftime("%Y-%m-%d", time.gmtime(time.time() - 30 * 86400))
+    first_page = search_insights("", 20)
+    cursor = next_cursor(first_page, 20)
+    results = {
+        "rows": args.rows,
+        "build_s": round(build_s, 1),
+        "search_insights.relevance": _timed(lambda i: search_insights(query(i), 20), args.iterations),
+        "search_insights.date": _timed(lambda i: search_insights(query(i), 20, sort="date"), args.iterations),
+        "search_insights.date_range": _timed(
+            lambda i: search_insights(query(i), 20, start_date=month_ago), args.iterations
+        ),
+        "search_insights.browse": _timed(lambda i: search_insights("", 20), args.iterations),
+        "search_insights.browse_page2": _timed(lambda i: search_insights("", 20, cursor=cursor), args.iterations),
+    }
+    if args.semantic:
+        from backend.vectors import ensure_index
+
+        ensure_index()
+        for mode in ("semantic", "hybrid"):
+            results[f"search_insights.{mode}"] = _timed(
+                lambda i: search_insights(query(i), 20, mode=mode), args.iterations
+            )
+
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+    results["/search"] = _timed(
+        lambda i: client.get("/search", params={"query": query(i), "limit": 20, "budget": args.budget}),
+        args.http_iterations, warmup=1,
+    )
+
+    candidates = {q: search_insights(q, 20) for q in QUERIES}
+    results["plan_prompt"] = _timed(lambda i: plan_prompt(query(i), candidates[query(i)]), args.iterations)
+    stub.stop()
+    return results
+
+
+# -------------------------------
+# Orchestration
+# -------------------------------
+def _child_env(db_path: Path, vector_dir: Path) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "INSIGHTLENS_DB_PATH": str(db_path),
+        "INSIGHTLENS_VECTOR_DIR": str(vector_dir),
+        "INSIGHTLENS_TRANSCRIPTS": "0",
+        "INSIGHTLENS_CACHE_PERSIST": "0",
+        "INSIGHTLENS_SCHEDULER": "0",
+        # Stubs accept any key; never reach a real LLM from a benchmark
+        "NEWS_API_KEY": "bench",
+        "YOUTUBE_API_KEY": "bench",
+        "OPENAI_API_KEY": "",
+        "OPENROUTER_API_KEY": "",
+    })
+    env.setdefault("INSIGHTLENS_HTTP_BACKOFF_S", "0.05")
+    return env
+
+
+def _run_phase(phase: str, env: dict, argv: list, extra: list) -> dict:
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        result_file = f.name
+    try:
+        cmd = [sys.executable, "-m", "bench.run", "--phase", phase, "--result-file", result_file] + argv + extra
+        subprocess.run(cmd, cwd=ROOT, env=env, check=True)
+        with open(result_file) as f:
+            return json.load(f)
+    finally:
+        os.unlink(result_file)
+
+
+def _flatten(data: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(previous: dict, current: dict):
+    old = _flatten({k: previous.get(k, {}) for k in ("ingest", "search")})
+    new = _flatten({k: current.get(k, {}) for k in ("ingest", "search")})
+    print(f"\n{'metric':<60} {'before':>12} {'after':>12} {'change':>9}")
+    for key in sorted(new.keys() & old.keys()):
+        if key.endswith((".n", ".rows", ".build_s", "stub_requests", "stub_errors")):
+            continue
+        change = f"{(new[key] - old[key]) / old[key] * 100:+.1f}%" if old[key] else "-"
+        print(f"{key:<60} {old[key]:>12} {new[key]:>12} {change:>9}")
+
+
+def _shared_argv(args) -> list:
+    argv = [
+        "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+        "--error-rate", str(args.error_rate), "--page-size", str(args.page_size),
+        "--seed", str(args.seed), "--iterations", str(args.iterations),
+        "--http-iterations", str(args.http_iterations), "--budget", str(args.budget),
+        "--rounds", str(args.rounds),
+    ]
+    if args.replay_dir:
+        argv += ["--replay-dir", args.replay_dir]
+    if args.semantic:
+        argv.append("--semantic")
+    if args.keep_rate_limits:
+        argv.append("--keep-rate-limits")
+    return argv
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="InsightLens offline benchmarks")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000], help="Synthetic DB sizes for the search phase")
+    parser.add_argument("--skip-ingest", action="store_true")
+    parser.add_argument("--skip-search", action="store_true")
+    parser.add_argument("--rounds", type=int, default=5, help="Ingestion runs to time after a warm-up run")
+    parser.add_argument("--page-size", type=int, default=100, help="Items per upstream response")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stub responses that are 429/503")
+    parser.add_argument("--replay-dir", help="Serve recorded payloads from this directory instead of synthetic ones")
+    parser.add_argument("--keep-rate-limits", action="store_true", help="Keep the HTTP client's per-host rate limits")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--http-iterations", type=int, default=50)
+    parser.add_argument("--budget", type=float, default=2.0, help="/search federated fetch budget (s)")
+    parser.add_argument("--semantic", action="store_true", help="Also index vectors and time semantic/hybrid search")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Result file, default bench/results/<timestamp>.json")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    parser.add_argument("--phase", choices=["ingest", "search"], help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.phase:
+        if args.phase == "ingest":
+            result = phase_ingest(args)
+        else:
+            args.rows = args.rows[0]
+            result = phase_search(args)
+        with open(args.result_file, "w") as f:
+            json.dump(result, f)
+        return
+
+    report = {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip() or None,
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("phase", "result_file", "out", "compare")},
+    }
+    shared = _shared_argv(args)
+    if not args.skip_ingest:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = _child_env(Path(tmp) / "ingest.db", Path(tmp) / "vectors")
+            report["ingest"] = _run_phase("ingest", env, shared, [])
+        print(f"📈 Ingestion: {report['ingest']['rows_per_s']} rows/s")
+    if not args.skip_search:
+        report["search"] = {}
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        for rows in args.rows:
+            env = _child_env(DATA_DIR / f"synthetic_{rows}.db", DATA_DIR / f"vectors_{rows}")
+            report["search"][str(rows)] = _run_phase("search", env, shared, ["--rows", str(rows)])
+            relevance = report["search"][str(rows)]["search_insights.relevance"]
+            print(f"📈 Search @ {rows} rows: p50 {relevance['p50']} ms, p99 {relevance['p99']} ms")
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"📝 Results written to {out}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# insightlens/bench/stubs.py
+
+import json
+import time
+import random
+import threading
+import urllib.parse
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+from xml.sax.saxutils import escape
+
+from .corpus import synthetic_item
+
+# Upstream hosts the stub answers for (see INSIGHTLENS_UPSTREAM_OVERRIDES)
+UPSTREAM_HOSTS = ["newsapi.org", "api.gdeltproject.org", "news.google.com", "www.reddit.com", "www.googleapis.com"]
+DEFAULT_ITEMS = 10
+# NewsAPI totalResults, large enough for any backfill the benchmarks run
+STUB_TOTAL_RESULTS = 100000
+
+
+class UpstreamStub:
+    """
+    One local HTTP server standing in for NewsAPI, GDELT, Google News RSS,
+    Reddit JSON and the YouTube Data API. Every response carries fresh
+    synthetic items with increasing timestamps, so incremental crawls keep
+    finding new rows; with `replay_dir`, recorded payloads named after the
+    service (newsapi.json, gdelt.json, google_rss.xml, reddit.json,
+    youtube_videos.json, youtube_search.json) are served instead.
+    Responses hold as many items as the request asks for (pageSize,
+    maxResults, ...), or `items` when it doesn't, and carry pagination
+    tokens (Reddit `after`, YouTube nextPageToken, NewsAPI totalResults)
+    for backfills; the stub never runs out of pages. Latency is latency_ms ±
+    jitter_ms; error_rate of requests get a 503 (every other one a 429 with
+    Retry-After: 0).
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0, jitter_ms: float = 0,
+                 error_rate: float = 0.0, replay_dir: Optional[str] = None, seed: int = 0,
+                 items: int = DEFAULT_ITEMS):
+        self.items = items
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.replay_dir = Path(replay_dir) if replay_dir else None
+        self.requests = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counter = 0
+        # Items are dated one second apart starting 30 days ago
+        self._epoch = int(time.time()) - 30 * 86400
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def overrides(self) -> str:
+        """Value for INSIGHTLENS_UPSTREAM_OVERRIDES."""
+        return ",".join(f"{host}={self.base_url}" for host in UPSTREAM_HOSTS)
+
+    def start(self) -> "UpstreamStub":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="upstream-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # -------------------------------
+    # Request handling
+    # -------------------------------
+    def _items(self, n: int) -> list:
+        """n fresh (id, title, text, epoch) tuples, newest first."""
+        with self._lock:
+            start = self._counter
+            self._counter += n
+            items = [(i, *synthetic_item(self._rng), self._epoch + i) for i in range(start, start + n)]
+        return items[::-1]
+
+    def _handle(self, request: BaseHTTPRequestHandler):
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+                errors = self.errors
+        time.sleep(delay)
+        if fail:
+            if errors % 2:
+                request.send_response(503)
+            else:
+                request.send_response(429)
+                request.send_header("Retry-After", "0")
+            request.send_header("Content-Length", "0")
+            request.end_headers()
+            return
+
+        parts = urllib.parse.urlsplit(request.path)
+        params = {k: v[0] for k, v in urllib.parse.parse_qs(parts.query).items()}
+        route = self._route(parts.path)
+        if route is None:
+            request.send_response(404)
+            request.send_header("Content-Length", "0")
+            request.end_headers()
+            return
+        service, build = route
+        body, content_type = self._replay(service)
+        if body is None:
+            body, content_type = build(params, parts.path)
+        request.send_response(200)
+        request.send_header("Content-Type", content_type)
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+    def _route(self, path: str):
+        if path.startswith("/v2/"):
+            return "newsapi", self._newsapi
+        if path.startswith("/api/v2/doc"):
+            return "gdelt", self._gdelt
+        if path.startswith("/rss"):
+            return "google_rss", self._rss
+        if path.startswith("/r/") and path.endswith(".json"):
+            return "reddit", self._reddit
+        if path.startswith("/youtube/v3/videos"):
+            return "youtube_videos", self._youtube_videos
+        if path.startswith("/youtube/v3/search"):
+            return "youtube_search", self._youtube_search
+        return None
+
+    def _replay(self, service: str):
+        if self.replay_dir is None:
+            return None, None
+        for suffix, content_type in ((".json", "application/json"), (".xml", "application/rss+xml")):
+            path = self.replay_dir / f"{service}{suffix}"
+            if path.exists():
+                return path.read_bytes(), content_type
+        return None, None
+
+    @staticmethod
+    def _json(payload) -> tuple:
+        return json.dumps(payload).encode("utf-8"), "application/json"
+
+    @staticmethod
+    def _iso(epoch: int) -> str:
+        return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(epoch))
+
+    def _newsapi(self, params, path):
+        items = self._items(int(params.get("pageSize", self.items)))
+        return self._json({"status": "ok", "totalResults": STUB_TOTAL_RESULTS, "articles": [
+            {"title": title, "url": f"https://news.example.com/{i}", "description": text, "publishedAt": self._iso(ts)}
+            for i, title, text, ts in items
+        ]})
+
+    def _gdelt(self, params, path):
+        items = self._items(int(params.get("maxrecords", self.items)))
+        return self._json({"articles": [
+            {"title": title, "url": f"https://gdelt.example.com/{i}", "language": "English",
+             "seendate": time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(ts))}
+            for i, title, text, ts in items
+        ]})
+
+    def _rss(self, params, path):
+        items = self._items(self.items)
+        entries = "".join(
+            f"<item><title>{escape(title)}</title><link>https://rss.example.com/{i}</link>"
+            f"<description>{escape(text)}</description><pubDate>{formatdate(ts, usegmt=True)}</pubDate></item>"
+            for i, title, text, ts in items
+        )
+        body = f'<?xml version="1.0"?><rss version="2.0"><channel><title>stub</title>{entries}</channel></rss>'
+        return body.encode("utf-8"), "application/rss+xml"
+
+    def _reddit(self, params, path):
+        items = self._items(int(params.get("limit", self.items)))
+        subreddit = path.split("/")[2]
+        return self._json({"data": {"after": f"t3_{items[-1][0]}" if items else None, "children": [
+            {"data": {"title": title, "permalink": f"/r/{subreddit}/comments/{i}/", "selftext": text, "created_utc": float(ts)}}
+            for i, title, text, ts in items
+        ]}})
+
+    def _youtube_videos(self, params, path):
+        items = self._items(int(params.get("maxResults", self.items)))
+        return self._json({"items": [
+            {"id": f"stub{i:07d}", "snippet": {"title": title, "description": text, "publishedAt": self._iso(ts)}}
+            for i, title, text, ts in items
+        ]})
+
+    def _youtube_search(self, params, path):
+        items = self._items(int(params.get("maxResults", self.items)))
+        return self._json({"nextPageToken": f"page{items[-1][0]}" if items else None, "items": [
+            {"id": {"videoId": f"stub{i:07d}"}, "snippet": {"title": title, "description": text, "publishedAt": self._iso(ts)}}
+            for i, title, text, ts in items
+        ]})
@@ -1,5 +1,14 @@
-import sqlite3
-conn = sqlite3.connect("data/insightlens.db")
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from backend.db import get_conn, load_content
+
+# Bodies are compressed and only decompressed with --content
+show_content = "--content" in sys.argv[1:]
+conn = get_conn()
 for row in conn.execute("SELECT * FROM insights"):
     print(row)
-conn.close()
\ No newline at end of file
+    if show_content:
+        print(load_content([row[0]], ("content",), conn).get(row[0], {}).get("content"))
+conn.close()
@@ -1,46 +1,95 @@
 # backend/main.py
 import os
-from fastapi import FastAPI
+import sys
+import time
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
-from backend.db import init_db
-from backend.ingest.news import fetch_newsapi
-from backend.ingest.rss import fetch_google_news_rss
-from backend.ingest.reddit import fetch_reddit
-from backend.ingest.youtube import fetch_youtube_trending, fetch_youtube_search
-from backend.ingest.gdelt import fetch_gdelt
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # brotli-asgi is optional; gzip alone covers every client
+    BrotliMiddleware = None
+
+from backend.logs import configure_logging
+configure_logging()
+
+from backend.db import init_db, flush_writes, close_writer
+from backend.jobs import run_sources, scheduler, router as jobs_router
+from backend.crawl import CRAWL_PLAN, load_plan, run_plan, crawl_scheduler
+from backend.ingest.youtube import wait_for_transcripts
+from backend.vectors import ensure_index
 from backend.search import router as search_router
+from backend.topics import ensure_topics, router as topics_router
+from backend.rollups import ensure_rollups, router as rollups_router
+from backend.archive import archive_insights, check_archive_support, router as archive_router
+from backend.metrics import REQUEST_SECONDS, router as metrics_router
+from backend.responses import FastJSONResponse
+
+log = logging.getLogger("insightlens")
+
+# Responses smaller than this go out uncompressed
+COMPRESS_MIN_BYTES = int(os.getenv("INSIGHTLENS_COMPRESS_MIN_BYTES", "1000"))
 
 # -------------------------------
 # Ingestion logic
 # -------------------------------
 def run_ingestion():
-    print("🔧 Initializing DB…")
+    log.info("🔧 Initializing DB…")
     init_db()
+    check_archive_support()
 
-    # 🔹 Google News RSS (no key)
-    fetch_google_news_rss(topic=None, region="IN:en", max_items=10)
-
-    # 🔹 NewsAPI
-    fetch_newsapi(query="SaaS OR startup OR AI", language="en", page_size=10)
-
-    # 🔹 Reddit
-    fetch_reddit(subreddit="technology", sort="hot", limit=10)
-
-    # 🔹 YouTube
-    fetch_youtube_trending(region_code="US", max_results=10)
-    fetch_youtube_search(query="AI news", max_results=10)
-
-    # 🔹 GDELT
-    fetch_gdelt(query="SaaS OR startup OR technology OR finance", max_records=10)
+    if CRAWL_PLAN:
+        # 🔹 Every due task of the crawl plan, on a worker pool (see backend.crawl)
+        job = run_plan(load_plan(CRAWL_PLAN))
+    else:
+        # 🔹 Google News RSS, NewsAPI, Reddit, YouTube, GDELT (see backend.jobs.INGEST_SOURCES)
+        job = run_sources()
+    # YouTube transcripts are filled in after the metadata, let them land too
+    wait_for_transcripts()
+    flush_writes()
+    ensure_index()
+    ensure_topics()
+    ensure_rollups()
+    # Move what aged past INSIGHTLENS_ARCHIVE_AFTER_DAYS to Parquet (off by default)
+    archive_insights()
 
-    print("✅ Ingestion complete.")
+    log.info(f"✅ Ingestion complete in {job['duration_ms']} ms.", extra={"duration_ms": job["duration_ms"]})
+    return job
 
 
 # -------------------------------
 # FastAPI App
 # -------------------------------
-app = FastAPI(title="InsightLens API", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Search reads the FTS index and cache tables, make sure they exist
+    init_db()
+    # Search and analytics read the Parquet archive too, refuse to start without pyarrow if there is one
+    check_archive_support()
+    # Fit the embedding model on first start, embed and cluster rows it hasn't seen
+    ensure_index()
+    ensure_topics()
+    ensure_rollups()
+    # With a crawl plan, its task intervals replace the per-source schedule
+    active_scheduler = crawl_scheduler if CRAWL_PLAN else scheduler
+    if os.getenv("INSIGHTLENS_SCHEDULER", "0") == "1":
+        active_scheduler.start()
+    yield
+    active_scheduler.stop()
+    # Commit anything still sitting in the write-behind queue
+    close_writer()
+
+app = FastAPI(title="InsightLens API", version="0.1.0", lifespan=lifespan, default_response_class=FastJSONResponse)
+
+# Search payloads are mostly text and shrink several-fold; streamed NDJSON
+# chunks are flushed one by one, so events still arrive as they are produced
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESS_MIN_BYTES, gzip_fallback=True)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESS_MIN_BYTES, compresslevel=5)
 
 # Allow frontend connections
 app.add_middleware(
@@ -51,19 +100,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Route templates (/ingest/{job_id}) keep the label set small; streaming
+        # responses are timed until their headers are sent
+        route = request.scope.get("route")
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method, route=getattr(route, "path", "unmatched"), status=status,
+        )
+
 # Health check
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
 
-# Ingestion trigger (manual via API)
-@app.post("/ingest")
-def ingest_data():
-    run_ingestion()
-    return {"status": "ingestion complete"}
-
-# Attach search routes
+# Attach ingestion job routes (POST /ingest, GET /ingest/{job_id}), search, topic, alert, analytics and metrics routes
+app.include_router(jobs_router)
 app.include_router(search_router)
+app.include_router(topics_router)
+app.include_router(rollups_router)
+app.include_router(archive_router)
+app.include_router(metrics_router)
 
 
 # -------------------------------
@@ -74,7 +139,14 @@ if __name__ == "__main__":
     if topic:
         from backend.ingest.rss import fetch_google_news_rss
         init_db()
-        fetch_google_news_rss(topic=topic, region="IN:en", max_items=10)
-        print("✅ Topic-specific RSS fetch complete.")
+        try:
+            fetch_google_news_rss(topic=topic, region="IN:en", max_items=10)
+        except Exception as e:
+            # Fetchers raise on upstream failures; report it like run_sources does and fail the script
+            log.error(f"❌ Topic-specific RSS fetch failed: {e}")
+            sys.exit(1)
+        finally:
+            flush_writes()
+        log.info("✅ Topic-specific RSS fetch complete.")
     else:
         run_ingestion()